@@ -17,19 +17,39 @@ from aws_cdk import (
 from .utils import gen_name, get_params, filter_kwargs, generate_output
 from .network import fetch_vpc, get_private_subnet_ids  # noqa401
 from .lambdas import Function, PipLayers  # noqa401
-from .dynamodb import Table  # noqa401
+from .dynamodb import Table, CapacityPolicy, ScheduledCapacity  # noqa401
+from .dynamodb_access_patterns import AccessPattern, plan_key_schema  # noqa401
 from .sqs import Queue  # noqa401
-from .s3 import Bucket  # noqa401
+from .s3 import Bucket, KeyScheme  # noqa401
 from .sns import Topic  # noqa401
-from .cloudfront import Website  # noqa401
+from .cloudfront import (
+    Website,
+    WebsiteDeployment,
+    api_cache_policy,
+    api_origin_request_policy,
+)  # noqa401
 from .stack import AlabStack  # noqa401
 from .ssm import StringParameter  # noqa401
-from .redshift import RedshiftServerless, RedshiftCluster, Redshift  # noqa401
+from .redshift import (
+    RedshiftServerless,
+    RedshiftCluster,
+    Redshift,
+    WlmConfiguration,
+    WlmQueue,
+    QueryMonitoringRule,
+    NodeSizing,
+    suggest_node_sizing,
+    ServerlessCapacity,
+    ServerlessUsageLimit,
+)  # noqa401
+from .redshift_ingestion import RedshiftIngestion  # noqa401
+from .redshift_views import MaterializedView, MaterializedViewRefresher  # noqa401
 from .billing import BillingAlert  # noqa401
 from .backup import BackupPlan  # noqa401
 from .api import (
     ApiDomain,
     DataIngestionApi,
+    HttpServiceIntegration,
     add_arecord,
     add_certificate,
     fetch_hosted_zone,
@@ -66,12 +86,31 @@ class Rule(aws_events.Rule):
 
 
 class RestApi(aws_apigateway.RestApi):
-    def __init__(self, scope: Construct, id: str, **kwargs):
+    def __init__(
+        self,
+        scope: Construct,
+        id: str,
+        *,
+        cache_cluster_size: str = None,
+        cache_data_encrypted: bool = True,
+        throttling_rate_limit: float = None,
+        throttling_burst_limit: int = None,
+        **kwargs,
+    ):
         """
         Creates a RestApi with some sensible defaults.
 
         defaults:
         - rest_api_name -> gen_name(scope, id) if not set
+
+        - cache_cluster_size: e.g. "0.5" (GB), creates a cache cluster for the
+          stage. Caching is then enabled per method, see add_method_settings()
+          and ResourceWithLambda.
+        - cache_data_encrypted: encrypt cached responses.
+        - throttling_rate_limit, throttling_burst_limit: requests per second,
+          and burst, for all methods of the stage.
+
+        These are ignored if deploy_options is set.
         """
         kwargs.setdefault("rest_api_name", gen_name(scope, id))
 
@@ -81,13 +120,61 @@ class RestApi(aws_apigateway.RestApi):
             aws_apigateway.StageOptions(
                 logging_level=aws_apigateway.MethodLoggingLevel.INFO,
                 metrics_enabled=True,
+                cache_cluster_enabled=cache_cluster_size is not None,
+                cache_cluster_size=cache_cluster_size,
+                cache_data_encrypted=(
+                    cache_data_encrypted if cache_cluster_size else None
+                ),
+                throttling_rate_limit=throttling_rate_limit,
+                throttling_burst_limit=throttling_burst_limit,
             ),
         )
 
         super().__init__(scope, id, **kwargs)
+        self.cache_data_encrypted = cache_data_encrypted
 
         generate_output(self, id, self.url)
 
+    def add_method_settings(
+        self,
+        resource_path: str,
+        http_method: str,
+        *,
+        cache_ttl: Duration = None,
+        throttling_rate_limit: float = None,
+        throttling_burst_limit: int = None,
+    ) -> None:
+        """
+        Set caching and throttling for a method of the deployment stage.
+
+        - resource_path: e.g. "/orders/{id}", as in IResource.path.
+        - http_method: e.g. "GET", "ANY" or "*" for all methods.
+        - cache_ttl: cache responses for this long (up to 1 hour), needs a
+          cache_cluster_size. Responses are cached per path and the cache key
+          parameters of the method, not per caller.
+        - throttling_rate_limit, throttling_burst_limit: override the stage
+          limits for this method.
+        """
+        if cache_ttl is not None and cache_ttl.to_seconds() > 3600:
+            raise ValueError(
+                f"{type(self).__name__}('{self.node.id}'): cache_ttl is at most 1 hour."
+            )
+        # The path is "/" followed by the resource path with slashes encoded
+        # as ~1, e.g. "/~1orders~1{id}", or "/" for the root resource
+        path = resource_path.strip("/")
+        encoded_path = "/~1" + path.replace("/", "~1") if path else "/"
+        setting = aws_apigateway.CfnStage.MethodSettingProperty(
+            resource_path=encoded_path,
+            http_method="*" if http_method == "ANY" else http_method,
+            caching_enabled=cache_ttl is not None,
+            cache_ttl_in_seconds=int(cache_ttl.to_seconds()) if cache_ttl else None,
+            cache_data_encrypted=self.cache_data_encrypted if cache_ttl else None,
+            throttling_rate_limit=throttling_rate_limit,
+            throttling_burst_limit=throttling_burst_limit,
+        )
+        cfn_stage: aws_apigateway.CfnStage = self.deployment_stage.node.default_child
+        cfn_stage.method_settings = [*(cfn_stage.method_settings or []), setting]
+
 
 class ResourceWithLambda(Construct):
     """
@@ -110,6 +197,10 @@ class ResourceWithLambda(Construct):
             "application/json": '{ "statusCode": "200" }'
         },
         resource_add_child: bool = True,
+        cache_ttl: Duration = None,
+        cache_key_parameters: Sequence[str] = None,
+        throttling_rate_limit: float = None,
+        throttling_burst_limit: int = None,
         **kwargs,
     ):
         """
@@ -132,6 +223,16 @@ class ResourceWithLambda(Construct):
         method_ -> will be sent to add_method()
 
         integration_ -> will be sent to the integration constructor
+
+        Caching and throttling of the method, see RestApi.add_method_settings():
+
+        * cache_ttl: cache responses for this long.
+
+        * cache_key_parameters: request parameters that are part of the cache key,
+          e.g. ["method.request.querystring.page"]. Add
+          "method.request.header.Authorization" if responses differ per caller.
+
+        * throttling_rate_limit, throttling_burst_limit: override the stage limits.
         """
         super().__init__(scope, f"{id}_ResourceWithLambda")
         kwargs = get_params(locals())
@@ -157,6 +258,13 @@ class ResourceWithLambda(Construct):
         handler = Function(scope, f"{id}", description=description, **lambda_kwargs)
         self.handler = handler
 
+        if cache_key_parameters:
+            integration_kwargs.setdefault("cache_key_parameters", cache_key_parameters)
+            # Cache key parameters must be declared on the method request
+            method_kwargs["request_parameters"] = {
+                **{p: False for p in cache_key_parameters},
+                **method_kwargs.get("request_parameters", {}),
+            }
         self.integration = aws_apigateway.LambdaIntegration(
             self.handler, **integration_kwargs
         )
@@ -166,10 +274,27 @@ class ResourceWithLambda(Construct):
         else:
             self.resource = parent_resource
         self.method = self.resource.add_method(verb, self.integration, **method_kwargs)
+
+        if any(
+            v is not None
+            for v in [cache_ttl, throttling_rate_limit, throttling_burst_limit]
+        ):
+            api = self.resource.api
+            if not isinstance(api, RestApi):
+                raise ValueError(
+                    f"{type(self).__name__}('{id}'): caching and throttling need an alabcdk RestApi."
+                )
+            api.add_method_settings(
+                self.resource.path,
+                verb,
+                cache_ttl=cache_ttl,
+                throttling_rate_limit=throttling_rate_limit,
+                throttling_burst_limit=throttling_burst_limit,
+            )
         CfnOutput(
             self,
             f"{id}_url",
-            value=f"{id}:: {self.resource.url} -- {verb}",
+            value=f"{id}:: {self.resource.api.url_for_path(self.resource.path)} -- {verb}",
             description=f"url for {id}",
         )
 
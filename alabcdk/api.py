@@ -1,7 +1,11 @@
-from typing import Optional
+from typing import Callable, Dict, Optional, Sequence
 from aws_cdk import (
     Stack,
     aws_certificatemanager as acm,
+    aws_events as events,
+    aws_iam as iam,
+    aws_kinesis as kinesis,
+    aws_sqs as sqs,
     aws_lambda as lambda_,
     aws_route53 as route53,
     aws_route53_targets as route53_targets,
@@ -107,6 +111,134 @@ class ApiDomain(Construct):
         )
 
 
+class HttpServiceIntegration(api_gw2.HttpRouteIntegration):
+    """
+    HTTP API integration writing requests directly to an AWS service, without
+    a Lambda function in between. Create with sqs(), kinesis() or
+    eventbridge(). HTTP APIs have no Firehose integration, put records on a
+    Kinesis stream that is the source of the delivery stream instead.
+
+    Parameters are mapped from the request with selection expressions, e.g.
+    "$request.body", "$request.header.x-device-id" or "$context.requestId".
+    Extra parameters of the service action are given in parameters, e.g.
+    {"MessageAttributes": ...} for SQS.
+    """
+
+    def __init__(
+        self,
+        id: str,
+        *,
+        subtype: api_gw2.HttpIntegrationSubtype,
+        parameters: Dict[str, str],
+        grant: Callable[[iam.IGrantable], None],
+    ) -> None:
+        super().__init__(id)
+        self._id = id
+        self.subtype = subtype
+        self.parameters = parameters
+        self._grant = grant
+
+    def bind(
+        self, *, route: api_gw2.IHttpRoute, scope: Construct
+    ) -> api_gw2.HttpRouteIntegrationConfig:
+        role = iam.Role(
+            scope,
+            f"{self._id}-role",
+            assumed_by=iam.ServicePrincipal("apigateway.amazonaws.com"),
+        )
+        self._grant(role)
+        mapping = api_gw2.ParameterMapping()
+        for key, value in self.parameters.items():
+            mapping.custom(key, value)
+        return api_gw2.HttpRouteIntegrationConfig(
+            type=api_gw2.HttpIntegrationType.AWS_PROXY,
+            subtype=self.subtype,
+            credentials=api_gw2.IntegrationCredentials.from_role(role),
+            parameter_mapping=mapping,
+            # Service integrations only support version 1.0
+            payload_format_version=api_gw2.PayloadFormatVersion.VERSION_1_0,
+        )
+
+    @classmethod
+    def sqs(
+        cls,
+        id: str,
+        queue: sqs.IQueue,
+        *,
+        message_body: str = "$request.body",
+        message_group_id: str = None,
+        parameters: Dict[str, str] = None,
+    ) -> "HttpServiceIntegration":
+        """
+        Send the request to queue. FIFO queues need message_group_id, e.g.
+        "$request.header.x-device-id", and deduplicate on content or on
+        parameters["MessageDeduplicationId"].
+        """
+        mapped = {"QueueUrl": queue.queue_url, "MessageBody": message_body}
+        if message_group_id:
+            mapped["MessageGroupId"] = message_group_id
+        return cls(
+            id,
+            subtype=api_gw2.HttpIntegrationSubtype.SQS_SEND_MESSAGE,
+            parameters={**mapped, **(parameters or {})},
+            grant=queue.grant_send_messages,
+        )
+
+    @classmethod
+    def kinesis(
+        cls,
+        id: str,
+        stream: kinesis.IStream,
+        *,
+        partition_key: str = "$context.requestId",
+        data: str = "$request.body",
+        parameters: Dict[str, str] = None,
+    ) -> "HttpServiceIntegration":
+        """
+        Put the request on stream. The default partition_key spreads records
+        evenly over the shards; use e.g. a header to keep records in order.
+        """
+        return cls(
+            id,
+            subtype=api_gw2.HttpIntegrationSubtype.KINESIS_PUT_RECORD,
+            parameters={
+                "StreamName": stream.stream_name,
+                "PartitionKey": partition_key,
+                "Data": data,
+                **(parameters or {}),
+            },
+            grant=stream.grant_write,
+        )
+
+    @classmethod
+    def eventbridge(
+        cls,
+        id: str,
+        *,
+        detail_type: str,
+        source: str,
+        event_bus: events.IEventBus = None,
+        detail: str = "$request.body",
+        parameters: Dict[str, str] = None,
+    ) -> "HttpServiceIntegration":
+        """
+        Put the request as an event on event_bus, defaults to the default bus.
+        detail must be a JSON object.
+        """
+        mapped = {"Detail": detail, "DetailType": detail_type, "Source": source}
+        if event_bus is not None:
+            mapped["EventBusName"] = event_bus.event_bus_name
+            grant = event_bus.grant_put_events_to
+        else:
+            grant = events.EventBus.grant_all_put_events
+        return cls(
+            id,
+            subtype=api_gw2.HttpIntegrationSubtype.EVENTBRIDGE_PUT_EVENTS,
+            parameters={**mapped, **(parameters or {})},
+            grant=grant,
+        )
+
+
 class DataIngestionApi(Construct):
     def __init__(
         self,
@@ -120,6 +252,7 @@ class DataIngestionApi(Construct):
         domain_name: str = None,
     ) -> None:
         super().__init__(scope, construct_id)
+        self._authorizers = {}
 
         if api_domain is not None:
             domain_mapping = get_domain_mapping_options(
@@ -153,6 +286,32 @@ class DataIngestionApi(Construct):
             self.url = self._api.default_stage.url
         generate_output(self, f"{id}_url", self.url)
 
+    @property
+    def http_api(self) -> api_gw2.HttpApi:
+        return self._api
+
+    def _authorizer(
+        self,
+        auth_name: Optional[str],
+        auth_handler: Optional[lambda_.IFunction],
+    ) -> api_gw2.IHttpRouteAuthorizer:
+        if auth_handler is None:
+            return api_gw2.HttpNoneAuthorizer()
+        # One authorizer per handler, shared between routes: the authorizers
+        # are bound in the scope of the api, a new one per route would clash
+        # with the first on its construct id. The first keeps the name
+        # "authorizer", later handlers get "authorizer1", ...
+        key = (auth_name, auth_handler.node.path)
+        if key not in self._authorizers:
+            self._authorizers[key] = _authorizers.HttpLambdaAuthorizer(
+                gen_name(self, f"authorizer{len(self._authorizers) or ''}"),
+                authorizer_name=auth_name,
+                handler=auth_handler,
+                identity_source=["$request.header.Authorization"],
+                response_types=[_authorizers.HttpLambdaResponseType.SIMPLE],
+            )
+        return self._authorizers[key]
+
     def add_ingestion_path_new_data(
         self,
         path: str,
@@ -160,21 +319,36 @@ class DataIngestionApi(Construct):
         auth_name: Optional[str] = None,
         auth_handler: Optional[lambda_.IFunction] = None,
     ) -> None:
-        authorizer = api_gw2.HttpNoneAuthorizer
-        if auth_handler is not None:
-            authorizer = _authorizers.HttpLambdaAuthorizer(
-                gen_name(self, "authorizer"),
-                authorizer_name=auth_name,
-                handler=auth_handler,
-                identity_source=["$request.header.Authorization"],
-                response_types=[_authorizers.HttpLambdaResponseType.SIMPLE],
-            )
         integration = _api_integrations.HttpLambdaIntegration(
             "integration-path", integration_fn
         )
         self._api.add_routes(
             path=path,
             methods=[api_gw2.HttpMethod.POST],
-            authorizer=authorizer,
+            authorizer=self._authorizer(auth_name, auth_handler),
+            integration=integration,
+        )
+
+    def add_service_ingestion_path(
+        self,
+        path: str,
+        integration: HttpServiceIntegration,
+        auth_name: Optional[str] = None,
+        auth_handler: Optional[lambda_.IFunction] = None,
+        methods: Sequence[api_gw2.HttpMethod] = (api_gw2.HttpMethod.POST,),
+    ) -> None:
+        """
+        Route path directly to a service, see HttpServiceIntegration, e.g.
+
+            api.add_service_ingestion_path(
+                "/events", HttpServiceIntegration.sqs("events", queue)
+            )
+
+        Use add_ingestion_path_new_data() for payloads that need transformation.
+        """
+        self._api.add_routes(
+            path=path,
+            methods=list(methods),
+            authorizer=self._authorizer(auth_name, auth_handler),
             integration=integration,
         )
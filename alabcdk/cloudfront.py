@@ -1,6 +1,12 @@
+from typing import Dict, List, Sequence, Union
 from constructs import Construct
 from aws_cdk import (
+    CustomResource,
     Duration,
+    Size,
+    Stack,
+    aws_apigateway,
+    aws_apigatewayv2_alpha,
     aws_iam,
     aws_route53,
     aws_route53_targets,
@@ -8,12 +14,181 @@ from aws_cdk import (
     aws_cloudfront,
     aws_cloudfront_origins,
     aws_s3,
+    aws_s3_assets,
+    custom_resources,
 )
+from .api import DataIngestionApi
+from .cloudfront_functions import (
+    header_snippet,
+    precompressed_snippet,
+    query_string_snippet,
+    spa_rewrite_snippet,
+    viewer_request_function,
+)
+from .lambdas import Function, runtime_code
 from .s3 import Bucket
 from .utils import gen_name, get_params, filter_kwargs, generate_output
 
 
+def _query_string_behavior(query_strings: Sequence[str], behavior):
+    if not query_strings:
+        return behavior.none()
+    if list(query_strings) == ["*"]:
+        return behavior.all()
+    return behavior.allow_list(*query_strings)
+
+
+def _allow_list_behavior(names: Sequence[str], behavior):
+    return behavior.allow_list(*names) if names else behavior.none()
+
+
+def api_cache_policy(
+    scope: Construct,
+    id: str,
+    *,
+    default_ttl: Duration = Duration.seconds(60),
+    max_ttl: Duration = Duration.hours(1),
+    headers: Sequence[str] = (),
+    query_strings: Sequence[str] = (),
+    cookies: Sequence[str] = (),
+) -> aws_cloudfront.CachePolicy:
+    """
+    Cache policy for an API route, caching responses for default_ttl unless
+    the API sets Cache-Control, keyed on (and forwarding) only the given
+    headers, query strings (["*"] for all) and cookies.
+    Add "Authorization" to headers to cache authorized responses per user.
+    """
+    return aws_cloudfront.CachePolicy(
+        scope,
+        id,
+        cache_policy_name=gen_name(scope, id),
+        default_ttl=default_ttl,
+        min_ttl=Duration.seconds(0),
+        max_ttl=max_ttl,
+        header_behavior=_allow_list_behavior(
+            headers, aws_cloudfront.CacheHeaderBehavior
+        ),
+        query_string_behavior=_query_string_behavior(
+            query_strings, aws_cloudfront.CacheQueryStringBehavior
+        ),
+        cookie_behavior=_allow_list_behavior(
+            cookies, aws_cloudfront.CacheCookieBehavior
+        ),
+        enable_accept_encoding_brotli=True,
+        enable_accept_encoding_gzip=True,
+    )
+
+
+def api_origin_request_policy(
+    scope: Construct,
+    id: str,
+    *,
+    headers: Sequence[str] = (),
+    query_strings: Sequence[str] = ("*",),
+    cookies: Sequence[str] = (),
+) -> aws_cloudfront.OriginRequestPolicy:
+    """
+    Origin request policy forwarding only the given headers, query strings
+    (["*"] for all) and cookies to the API, beyond those in the cache policy.
+    The Host header must not be forwarded to API Gateway.
+    """
+    return aws_cloudfront.OriginRequestPolicy(
+        scope,
+        id,
+        origin_request_policy_name=gen_name(scope, id),
+        header_behavior=_allow_list_behavior(
+            headers, aws_cloudfront.OriginRequestHeaderBehavior
+        ),
+        query_string_behavior=_query_string_behavior(
+            query_strings, aws_cloudfront.OriginRequestQueryStringBehavior
+        ),
+        cookie_behavior=_allow_list_behavior(
+            cookies, aws_cloudfront.OriginRequestCookieBehavior
+        ),
+    )
+
+
 class Website(Construct):
+    def behavior_options(self, **kwargs) -> dict:
+        """
+        Behavior options with the defaults of the distribution: HTTPS,
+        compression and the response_headers_policy of the Website.
+        """
+        kwargs.setdefault(
+            "viewer_protocol_policy",
+            aws_cloudfront.ViewerProtocolPolicy.REDIRECT_TO_HTTPS,
+        )
+        kwargs.setdefault("compress", True)
+        kwargs.setdefault("response_headers_policy", self.response_headers_policy)
+        return kwargs
+
+    def behavior(
+        self, origin: aws_cloudfront.IOrigin, **kwargs
+    ) -> aws_cloudfront.BehaviorOptions:
+        return aws_cloudfront.BehaviorOptions(
+            origin=origin, **self.behavior_options(**kwargs)
+        )
+
+    def add_backend(
+        self,
+        path_pattern: str,
+        api: Union[
+            aws_apigateway.RestApiBase, aws_apigatewayv2_alpha.HttpApi, DataIngestionApi
+        ],
+        *,
+        cache_policy: aws_cloudfront.ICachePolicy = aws_cloudfront.CachePolicy.CACHING_DISABLED,
+        origin_request_policy: aws_cloudfront.IOriginRequestPolicy = aws_cloudfront.OriginRequestPolicy.ALL_VIEWER_EXCEPT_HOST_HEADER,
+        route_cache_policies: Dict[str, aws_cloudfront.ICachePolicy] = None,
+    ) -> aws_cloudfront.IOrigin:
+        """
+        Serve api from the distribution under path_pattern, e.g. "/api/*".
+
+        The frontend then calls the API on its own origin, so browsers send
+        no CORS preflight requests. The full path is forwarded, so the API
+        must have its routes under the same path, e.g. /api/orders.
+
+        - cache_policy: for path_pattern, defaults to no caching.
+        - origin_request_policy: what is forwarded to the API, beyond what is
+          in the cache policy. Defaults to everything but the Host header;
+          use api_origin_request_policy() to forward only what is needed.
+        - route_cache_policies: cache policies for more specific paths, e.g.
+          {"/api/products/*": api_cache_policy(self, "products", default_ttl=Duration.minutes(5))}.
+
+        Note that the error responses of the Website (the SPA fallback) apply
+        to all behaviors, including API 403 and 404 responses. Use spa_routing
+        to avoid them.
+        """
+        if self.distribution is None:
+            raise ValueError(
+                f"{type(self).__name__}('{self.node.id}'): backends need a distribution, set domain_name."
+            )
+        if isinstance(api, DataIngestionApi):
+            api = api.http_api
+        if isinstance(api, aws_apigateway.RestApiBase):
+            origin = aws_cloudfront_origins.RestApiOrigin(api)
+        else:
+            stack = Stack.of(self)
+            origin = aws_cloudfront_origins.HttpOrigin(
+                f"{api.api_id}.execute-api.{stack.region}.{stack.url_suffix}"
+            )
+
+        # Behaviors are matched in the order they are added, most specific first
+        for pattern, policy in {
+            **(route_cache_policies or {}),
+            path_pattern: cache_policy,
+        }.items():
+            self.distribution.add_behavior(
+                pattern,
+                origin,
+                **self.behavior_options(
+                    viewer_protocol_policy=aws_cloudfront.ViewerProtocolPolicy.HTTPS_ONLY,
+                    allowed_methods=aws_cloudfront.AllowedMethods.ALLOW_ALL,
+                    cache_policy=policy,
+                    origin_request_policy=origin_request_policy,
+                ),
+            )
+        return origin
+
     def __init__(
         self,
         scope: Construct,
@@ -27,12 +202,66 @@ class Website(Construct):
         hosted_zone_id: str = None,
         # backend: aws_apigateway.IRestApi = None,
         web_bucket_name: str = None,
+        cache_policy: aws_cloudfront.ICachePolicy = aws_cloudfront.CachePolicy.CACHING_OPTIMIZED,
+        path_cache_policies: Dict[str, aws_cloudfront.ICachePolicy] = None,
+        origin_shield_region: str = None,
+        response_headers_policy: aws_cloudfront.IResponseHeadersPolicy = None,
+        error_response_ttl: Duration = Duration.seconds(60),
+        precompressed_encodings: Sequence[str] = None,
+        spa_routing: bool = False,
+        query_string_allow_list: Sequence[str] = None,
+        header_normalizations: Dict[str, Sequence[str]] = None,
+        edge_lambdas: Sequence[aws_cloudfront.EdgeLambda] = None,
         **kwargs,
     ) -> None:
-        super().__init__(scope, id, **kwargs)
+        """
+        Creates a bucket for web content, served through CloudFront if
+        domain_name is set.
+
+        Distribution settings:
+        - cache_policy: of the default behavior.
+        - path_cache_policies: cache policies for path patterns, e.g.
+          {"/config.json": aws_cloudfront.CachePolicy.CACHING_DISABLED}.
+        - origin_shield_region: region of an Origin Shield in front of the
+          bucket, to raise the cache hit ratio. Use the region of the bucket.
+        - response_headers_policy: added to all behaviors, e.g.
+          aws_cloudfront.ResponseHeadersPolicy.SECURITY_HEADERS.
+        - error_response_ttl: how long the index_document served for 403
+          and 404 (the SPA fallback) is cached.
+        - precompressed_encodings: ["gzip"], serve the .gz sibling of
+          compressible files to viewers accepting gzip, see
+          cloudfront_functions.precompressed_snippet(). Missing siblings are
+          created by WebsiteDeployment. "br" is not supported, as the
+          deployment cannot create .br files, and a missing sibling would be
+          served as an error (or as the index document with spa_routing).
+          Brotli is still served through the compress setting of behaviors.
+        - spa_routing: rewrite paths without extension to index_document at
+          the edge, instead of through 403/404 error responses, which then
+          are not added. Deep links are then cached like the index document.
+        - query_string_allow_list: drop all other query string parameters.
+        - header_normalizations: e.g. {"accept-language": ["en", "sv"]},
+          reduce headers to a few values, for headers in the cache policy.
+        - edge_lambdas: Lambda@Edge functions, for what CloudFront Functions
+          cannot do (e.g. network calls or origin events).
+
+        The options above apply to the bucket behaviors, and those done by
+        CloudFront Functions are generated into one viewer request function,
+        see cloudfront_functions.
+
+        The bucket is private and read through Origin Access Control.
+
+        Behaviors compress responses (Brotli and Gzip) and the distribution
+        serves HTTP/2 and HTTP/3, unless overridden with cf_http_version.
+        Arguments prefixed with s3_ are sent to the Bucket and arguments
+        prefixed with cf_ to the Distribution.
+        """
+        super().__init__(scope, id)
         index_document = index_document or "index.html"
         error_document = error_document or index_document
         web_bucket_name = web_bucket_name or "webcontent"
+        self.index_document = index_document
+        self.distribution: aws_cloudfront.Distribution = None
+        self.origin: aws_cloudfront.IOrigin = None
         kwargs = get_params(locals())
         s3_kwargs = filter_kwargs(kwargs, "s3_")
         cf_kwargs = filter_kwargs(kwargs, "cf_")
@@ -40,6 +269,30 @@ class Website(Construct):
         cf_kwargs.setdefault("price_class", aws_cloudfront.PriceClass.PRICE_CLASS_100)
         cf_kwargs.setdefault("comment", f"CDN for {id}/{gen_name(self, 'distro')}")
         cf_kwargs.setdefault("default_root_object", f"{index_document}")
+        cf_kwargs.setdefault("http_version", aws_cloudfront.HttpVersion.HTTP2_AND_3)
+        self.response_headers_policy = response_headers_policy
+        self.precompressed_encodings = list(precompressed_encodings or [])
+        unsupported = set(self.precompressed_encodings) - {"gzip"}
+        if unsupported:
+            raise ValueError(
+                f"Unsupported precompressed_encodings {sorted(unsupported)}, only 'gzip' is supported."
+            )
+        self.viewer_request_snippets: List[str] = []
+        if query_string_allow_list is not None:
+            self.viewer_request_snippets.append(
+                query_string_snippet(query_string_allow_list)
+            )
+        for header, values in (header_normalizations or {}).items():
+            self.viewer_request_snippets.append(header_snippet(header, values))
+        if spa_routing:
+            self.viewer_request_snippets.append(spa_rewrite_snippet(index_document))
+        # Last, so it also applies to the index document of the SPA rewrite
+        if self.precompressed_encodings:
+            self.viewer_request_snippets.append(
+                precompressed_snippet(
+                    self.precompressed_encodings, index_document=index_document
+                )
+            )
 
         if domain_name and not hosted_zone_id:
             raise ValueError(
@@ -48,7 +301,7 @@ class Website(Construct):
 
         # routing_rules = []
         error_responses = []
-        for error_code in ["403", "404"]:
+        for error_code in [] if spa_routing else ["403", "404"]:
             # routing_rules.append(
             #     aws_s3.RoutingRule(
             #         condition=aws_s3.RoutingRuleCondition(
@@ -62,7 +315,7 @@ class Website(Construct):
                     http_status=int(error_code),
                     response_page_path=f"/{index_document}",
                     response_http_status=200,
-                    ttl=Duration.seconds(0),
+                    ttl=error_response_ttl,
                 )
             )
 
@@ -107,38 +360,86 @@ class Website(Construct):
             )
         )
 
-        oai = aws_cloudfront.OriginAccessIdentity(
+        oac = aws_cloudfront.CfnOriginAccessControl(
             self,
-            gen_name(self, "cf_oai"),
-            comment=f"Origin Access Identity for {gen_name(self, id)}.",
+            "oac",
+            origin_access_control_config=aws_cloudfront.CfnOriginAccessControl.OriginAccessControlConfigProperty(
+                name=gen_name(self, "oac")[-64:],
+                origin_access_control_origin_type="s3",
+                signing_behavior="always",
+                signing_protocol="sigv4",
+            ),
         )
-
-        statement = aws_iam.PolicyStatement(
-            resources=[self.bucket.arn_for_objects("*")],
-            actions=["s3:GetObject"],
-            principals=[
-                aws_iam.CanonicalUserPrincipal(
-                    oai.cloud_front_origin_access_identity_s3_canonical_user_id
-                )
-            ],
+        # S3Origin only supports Origin Access Identity, so the S3 origin is
+        # declared as an HttpOrigin and changed to use OAC below
+        self.origin = aws_cloudfront_origins.HttpOrigin(
+            self.bucket.bucket_regional_domain_name,
+            origin_shield_region=origin_shield_region,
         )
-
-        self.bucket.add_to_resource_policy(statement)
-
+        s3_function_associations = []
+        if self.viewer_request_snippets:
+            s3_function_associations.append(
+                aws_cloudfront.FunctionAssociation(
+                    function=viewer_request_function(
+                        self, "viewer_request", self.viewer_request_snippets
+                    ),
+                    event_type=aws_cloudfront.FunctionEventType.VIEWER_REQUEST,
+                )
+            )
         self.distribution = aws_cloudfront.Distribution(
             self,
             gen_name(self, "cdn"),
-            default_behavior=aws_cloudfront.BehaviorOptions(
-                origin=aws_cloudfront_origins.S3Origin(
-                    self.bucket, origin_access_identity=oai
-                ),
-                viewer_protocol_policy=aws_cloudfront.ViewerProtocolPolicy.REDIRECT_TO_HTTPS,
+            default_behavior=self.behavior(
+                self.origin,
+                cache_policy=cache_policy,
+                function_associations=s3_function_associations,
+                edge_lambdas=edge_lambdas,
             ),
+            additional_behaviors={
+                path: self.behavior(
+                    self.origin,
+                    cache_policy=policy,
+                    function_associations=s3_function_associations,
+                    edge_lambdas=edge_lambdas,
+                )
+                for path, policy in (path_cache_policies or {}).items()
+            },
             domain_names=[domain_name],
             error_responses=error_responses,
             certificate=self.certificate,
             **cf_kwargs,
         )
+        cfn_distribution: aws_cloudfront.CfnDistribution = (
+            self.distribution.node.default_child
+        )
+        # The bucket is the first origin
+        cfn_distribution.add_property_override(
+            "DistributionConfig.Origins.0.OriginAccessControlId", oac.attr_id
+        )
+        cfn_distribution.add_property_override(
+            "DistributionConfig.Origins.0.S3OriginConfig.OriginAccessIdentity", ""
+        )
+        cfn_distribution.add_property_deletion_override(
+            "DistributionConfig.Origins.0.CustomOriginConfig"
+        )
+        self.bucket.add_to_resource_policy(
+            aws_iam.PolicyStatement(
+                resources=[self.bucket.arn_for_objects("*")],
+                actions=["s3:GetObject"],
+                principals=[aws_iam.ServicePrincipal("cloudfront.amazonaws.com")],
+                conditions={
+                    "StringEquals": {
+                        "AWS:SourceArn": Stack.of(self).format_arn(
+                            service="cloudfront",
+                            region="",
+                            resource="distribution",
+                            resource_name=self.distribution.distribution_id,
+                        )
+                    }
+                },
+            )
+        )
+
         generate_output(self, "CDNUrl", self.distribution.distribution_domain_name)
         generate_output(self, "CDN_ID", self.distribution.distribution_id)
 
@@ -158,3 +459,98 @@ class Website(Construct):
                 aws_route53_targets.CloudFrontTarget(self.distribution)
             ),
         )
+
+
+class WebsiteDeployment(Construct):
+    """
+    Deploys a website build to the bucket of a Website, incrementally.
+
+    Only files whose content hash differs from the last deployment are
+    uploaded, hashed assets get an immutable Cache-Control and the index
+    document no-cache, and only changed paths are invalidated in the
+    distribution. Missing precompressed siblings are created for the
+    precompressed_encodings of website. See alabcdk_runtime.website_deploy, which can also be run
+    from the command line.
+    """
+
+    def __init__(
+        self,
+        scope: Construct,
+        id: str,
+        *,
+        website: Website,
+        source: str,
+        default_cache_control: str = None,
+        prune: bool = False,
+        hashed_asset_pattern: str = None,
+        **kwargs,
+    ) -> None:
+        """
+        - source: directory with the build, e.g. "frontend/dist".
+        - default_cache_control: Cache-Control of files that are neither
+          hashed assets nor HTML, defaults to one hour.
+        - prune: delete files no longer in the build. Off by default, so
+          clients running the previous version can still load its assets.
+        - hashed_asset_pattern: regular expression matching the paths of
+          hashed assets, cached as immutable and never invalidated. Defaults
+          to website_deploy.HASHED_ASSET, which matches hashes like
+          main.3f2a9c1b.js and index-BfXk3a9Q.js.
+
+        Arguments prefixed with lambda_ are sent to the deployment Function.
+        """
+        super().__init__(scope, id)
+        kwargs = get_params(locals())
+        lambda_kwargs = filter_kwargs(kwargs, "lambda_")
+        lambda_kwargs.setdefault("timeout", Duration.minutes(15))
+        lambda_kwargs.setdefault("memory_size", 1024)
+        lambda_kwargs.setdefault("ephemeral_storage_size", Size.gibibytes(2))
+
+        asset = aws_s3_assets.Asset(self, f"{id}_source", path=source)
+        self.handler = Function(
+            self,
+            f"{id}_deployer",
+            code=runtime_code(),
+            handler="alabcdk_runtime.website_deploy.handler",
+            **lambda_kwargs,
+        )
+        asset.grant_read(self.handler)
+        website.bucket.grant_read_write(self.handler)
+
+        properties = {
+            "SourceBucket": asset.s3_bucket_name,
+            "SourceKey": asset.s3_object_key,
+            "Bucket": website.bucket.bucket_name,
+            "IndexDocument": website.index_document,
+            "Prune": str(prune).lower(),
+        }
+        if default_cache_control:
+            properties["DefaultCacheControl"] = default_cache_control
+        if hashed_asset_pattern:
+            properties["HashedAssetPattern"] = hashed_asset_pattern
+        if website.precompressed_encodings:
+            properties["Precompress"] = ",".join(website.precompressed_encodings)
+        if website.distribution is not None:
+            properties["DistributionId"] = website.distribution.distribution_id
+            self.handler.add_to_role_policy(
+                aws_iam.PolicyStatement(
+                    actions=["cloudfront:CreateInvalidation"],
+                    resources=[
+                        Stack.of(self).format_arn(
+                            service="cloudfront",
+                            region="",
+                            resource="distribution",
+                            resource_name=website.distribution.distribution_id,
+                        )
+                    ],
+                )
+            )
+
+        provider = custom_resources.Provider(
+            self, f"{id}_provider", on_event_handler=self.handler
+        )
+        self.deployment = CustomResource(
+            self,
+            f"{id}_deployment",
+            service_token=provider.service_token,
+            properties=properties,
+        )
@@ -0,0 +1,194 @@
+"""
+Generates the viewer request CloudFront Function of Website from snippets,
+each modifying the request in turn.
+
+Run generated code locally with run_viewer_request(), which needs node:
+
+    code = viewer_request_code([spa_rewrite_snippet("index.html")])
+    run_viewer_request(code, "/orders/12")["uri"]  # "/index.html"
+"""
+
+import json
+import shutil
+import subprocess
+from typing import Dict, Sequence
+from constructs import Construct
+from aws_cdk import aws_cloudfront
+from alabcdk_runtime.website_deploy import COMPRESSIBLE_EXTENSIONS
+from .utils import gen_name
+
+# Accept-Encoding values and the suffix of the precompressed siblings
+_ENCODING_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+
+def precompressed_snippet(
+    encodings: Sequence[str] = ("br", "gzip"),
+    extensions: Sequence[str] = COMPRESSIBLE_EXTENSIONS,
+    index_document: str = "index.html",
+) -> str:
+    """
+    Rewrite requests for compressible files to the precompressed sibling
+    (app.js -> app.js.br) of the first of encodings the viewer accepts.
+    Every compressible file must have a sibling for every encoding.
+    """
+    unknown = set(encodings) - set(_ENCODING_SUFFIXES)
+    if unknown:
+        raise ValueError(f"Unsupported encodings: {sorted(unknown)}")
+    suffixes = ", ".join(f"['{e}', '{_ENCODING_SUFFIXES[e]}']" for e in encodings)
+    extension_map = ", ".join(f"'{e}': true" for e in extensions)
+    return f"""
+    // Serve precompressed siblings
+    (function () {{
+        var uri = request.uri;
+        if (uri.charAt(uri.length - 1) === '/') {{
+            uri += '{index_document}';
+        }}
+        var dot = uri.lastIndexOf('.');
+        if (dot < uri.lastIndexOf('/') || !{{{extension_map}}}[uri.substring(dot + 1)]) {{
+            return;
+        }}
+        var header = request.headers['accept-encoding'];
+        var accepted = header ? header.value : '';
+        var encodings = [{suffixes}];
+        for (var i = 0; i < encodings.length; i++) {{
+            if (accepted.indexOf(encodings[i][0]) !== -1) {{
+                request.uri = uri + encodings[i][1];
+                return;
+            }}
+        }}
+    }})();"""
+
+
+def spa_rewrite_snippet(
+    index_document: str = "index.html", exclude_prefixes: Sequence[str] = ()
+) -> str:
+    """
+    Rewrite paths whose last segment has no extension (client side routes,
+    e.g. /orders/12) to the index document, so deep links are served from
+    the cache without an origin error. Paths under exclude_prefixes are kept.
+    """
+    excluded = json.dumps(list(exclude_prefixes))
+    return f"""
+    // Serve the index document for client side routes
+    (function () {{
+        var uri = request.uri;
+        var excluded = {excluded};
+        for (var i = 0; i < excluded.length; i++) {{
+            if (uri.indexOf(excluded[i]) === 0) {{
+                return;
+            }}
+        }}
+        if (uri.substring(uri.lastIndexOf('/') + 1).indexOf('.') === -1) {{
+            request.uri = '/{index_document}';
+        }}
+    }})();"""
+
+
+def query_string_snippet(allow_list: Sequence[str] = ()) -> str:
+    """
+    Drop query string parameters not in allow_list and sort the rest, so
+    irrelevant parameters (e.g. utm_source) do not fragment the cache.
+    """
+    allowed = json.dumps(sorted(allow_list))
+    return f"""
+    // Keep only allowed query string parameters, sorted
+    (function () {{
+        var allowed = {allowed};
+        var querystring = {{}};
+        for (var i = 0; i < allowed.length; i++) {{
+            if (request.querystring[allowed[i]] !== undefined) {{
+                querystring[allowed[i]] = request.querystring[allowed[i]];
+            }}
+        }}
+        request.querystring = querystring;
+    }})();"""
+
+
+def header_snippet(header: str, values: Sequence[str]) -> str:
+    """
+    Normalize header to the first of values found in it, or to values[0],
+    e.g. header_snippet("accept-language", ["en", "sv"]) maps
+    "sv-SE,sv;q=0.9,en;q=0.8" to "sv". Use for headers in the cache key.
+    """
+    if not values:
+        raise ValueError(f"No values to normalize header '{header}' to.")
+    header = header.lower()
+    return f"""
+    // Normalize {header}
+    (function () {{
+        var values = {json.dumps(list(values))};
+        var header = request.headers[{json.dumps(header)}];
+        var parts = header ? header.value.toLowerCase().split(',') : [];
+        var value = values[0];
+        search: for (var i = 0; i < parts.length; i++) {{
+            var part = parts[i].split(';')[0].trim();
+            for (var j = 0; j < values.length; j++) {{
+                if (part.indexOf(values[j].toLowerCase()) === 0) {{
+                    value = values[j];
+                    break search;
+                }}
+            }}
+        }}
+        request.headers[{json.dumps(header)}] = {{value: value}};
+    }})();"""
+
+
+def viewer_request_code(snippets: Sequence[str]) -> str:
+    """
+    Compose snippets into one viewer request handler. A behavior can only
+    have one viewer request function, so everything done at viewer request
+    must go into the same function. Snippets modify request in order.
+    """
+    return (
+        "function handler(event) {\n"
+        "    var request = event.request;"
+        + "".join(snippets)
+        + "\n    return request;\n}\n"
+    )
+
+
+def viewer_request_function(
+    scope: Construct, id: str, snippets: Sequence[str]
+) -> aws_cloudfront.Function:
+    return aws_cloudfront.Function(
+        scope,
+        id,
+        function_name=gen_name(scope, id, clean_string=True)[-64:],
+        code=aws_cloudfront.FunctionCode.from_inline(viewer_request_code(snippets)),
+        comment="Viewer request rewrites",
+    )
+
+
+def run_viewer_request(
+    code: str,
+    uri: str,
+    *,
+    headers: Dict[str, str] = None,
+    querystring: Dict[str, str] = None,
+    method: str = "GET",
+) -> dict:
+    """
+    Run the handler in code with node, for a request built from the
+    arguments, and return the resulting request, e.g.
+    {"uri": ..., "headers": {"accept-encoding": {"value": "br"}}, ...}.
+    """
+    node = shutil.which("node")
+    if node is None:
+        raise RuntimeError("node is needed to run CloudFront Functions locally.")
+    event = {
+        "version": "1.0",
+        "context": {"eventType": "viewer-request"},
+        "viewer": {"ip": "127.0.0.1"},
+        "request": {
+            "method": method,
+            "uri": uri,
+            "headers": {k.lower(): {"value": v} for k, v in (headers or {}).items()},
+            "querystring": {k: {"value": v} for k, v in (querystring or {}).items()},
+            "cookies": {},
+        },
+    }
+    script = f"{code}\nconsole.log(JSON.stringify(handler({json.dumps(event)})));\n"
+    result = subprocess.run(
+        [node, "-e", script], capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout)
@@ -1,13 +1,123 @@
-from typing import Sequence
+from dataclasses import dataclass, field
+from typing import Dict, List, Literal, Sequence, Tuple
+from .dynamodb_access_patterns import (
+    AccessPattern,
+    IndexPlan,
+    plan_key_schema,
+    accessor_module_source,
+)
+from .lambdas import Function, runtime_code
+from .network import get_private_subnet_ids
+from .s3 import Bucket
+from .sqs import Queue
 from .utils import (
     gen_name,
     get_params,
+    filter_kwargs,
     remove_params,
     stage_based_removal_policy,
     generate_output,
 )
 from constructs import Construct
-from aws_cdk import aws_iam, aws_lambda, aws_dynamodb
+from aws_cdk import (
+    Annotations,
+    Duration,
+    Stack,
+    aws_applicationautoscaling,
+    aws_dax,
+    aws_ec2,
+    aws_iam,
+    aws_lambda,
+    aws_lambda_event_sources,
+    aws_dynamodb,
+    aws_s3,
+    aws_sqs,
+)
+
+# (min, max) capacity units per stage for provisioned tables
+_stage_to_capacity = {"PROD": (5, 200), "TEST": (1, 20), "DEV": (1, 10)}
+_DEFAULT_CAPACITY = (1, 10)
+_stage_to_dax_nodes = {"PROD": 3, "TEST": 1, "DEV": 1}
+_DAX_PORT = 9111  # TLS
+# DynamoDB type codes of key attribute types
+_attribute_type_codes = {
+    aws_dynamodb.AttributeType.STRING: "S",
+    aws_dynamodb.AttributeType.NUMBER: "N",
+    aws_dynamodb.AttributeType.BINARY: "B",
+}
+_DAX_READ_ACTIONS = [
+    "dax:GetItem",
+    "dax:BatchGetItem",
+    "dax:Query",
+    "dax:Scan",
+    "dax:ConditionCheckItem",
+]
+_DAX_WRITE_ACTIONS = [
+    "dax:PutItem",
+    "dax:UpdateItem",
+    "dax:DeleteItem",
+    "dax:BatchWriteItem",
+    "dax:ConditionCheckItem",
+]
+
+
+@dataclass
+class ScheduledCapacity:
+    """
+    Capacity bounds applied at a scheduled time, e.g. before a nightly batch
+    job. schedule is a cron expression like "0 1 * * ? *" (UTC).
+    Bounds left as None are not changed.
+    """
+
+    name: str
+    schedule: str
+    min_read: int = None
+    max_read: int = None
+    min_write: int = None
+    max_write: int = None
+
+
+@dataclass
+class CapacityPolicy:
+    """
+    Capacity mode and scaling of a Table and all of its global secondary
+    indexes.
+
+    - mode: "on_demand" (PAY_PER_REQUEST) or "provisioned".
+    - min_read, max_read, min_write, max_write: bounds for target tracking
+      auto scaling. Default to stage-based values.
+    - target_utilization_percent: utilization auto scaling aims for.
+    - scheduled: scheduled changes to the bounds.
+    """
+
+    mode: Literal["on_demand", "provisioned"] = "on_demand"
+    min_read: int = None
+    max_read: int = None
+    min_write: int = None
+    max_write: int = None
+    target_utilization_percent: int = 70
+    scheduled: List[ScheduledCapacity] = field(default_factory=list)
+
+    @classmethod
+    def on_demand(cls) -> "CapacityPolicy":
+        return cls(mode="on_demand")
+
+    @classmethod
+    def provisioned(cls, **kwargs) -> "CapacityPolicy":
+        return cls(mode="provisioned", **kwargs)
+
+    def bounds(self, stage: str) -> Tuple[int, int, int, int]:
+        """Return (min_read, max_read, min_write, max_write) for stage."""
+        low, high = _stage_to_capacity.get(stage, _DEFAULT_CAPACITY)
+        result = (
+            self.min_read or low,
+            self.max_read or high,
+            self.min_write or low,
+            self.max_write or high,
+        )
+        if result[0] > result[1] or result[2] > result[3]:
+            raise ValueError(f"Minimum capacity exceeds maximum capacity: {result}.")
+        return result
 
 
 class Table(aws_dynamodb.Table):
@@ -20,50 +130,501 @@ class Table(aws_dynamodb.Table):
 
     Parameters (extra and those with changed behaviour):
     - table_name (str): gen_name(scope, id) if not set
+    - capacity_policy (CapacityPolicy): billing mode and auto scaling for the
+      table and every global secondary index. Cannot be combined with
+      billing_mode, read_capacity or write_capacity.
+    - dax (bool): put a DAX cluster in front of the table. Configured with
+      arguments prefixed with dax_, see define_dax(). Functions passed in
+      readers, writers and readers_writers get access to the cluster and its
+      endpoint in the environment variable {env_var_name}_DAX_ENDPOINT.
+      Those functions must be in dax_vpc.
+    - access_patterns (Sequence[AccessPattern]): derive partition/sort key and
+      secondary indexes from the ways the table is read, see
+      plan_key_schema(). Cannot be combined with partition_key or sort_key.
+      Risky patterns are reported as warnings at synth time.
+    - attribute_types (Dict[str, AttributeType]): types of the key attributes
+      in access_patterns, STRING if not set.
+    - access_patterns_module (str): path to write a Python module with the key
+      schema for handlers to, see accessor_module_source().
+    - time_to_live_attribute (str): attribute holding the expiry time (epoch
+      seconds) of items.
+    - archive_expired_items (bool): write items removed by TTL to archive_bucket,
+      as gzipped JSON lines partitioned by expiry date (the
+      time_to_live_attribute of the items). Enables the stream with old
+      images if stream is not set.
+    - archive_bucket (IBucket): defaults to a new Bucket "{id}_archive".
+    - archive_dead_letter_queue (IQueue): receives references to stream
+      batches the archive failed to write, defaults to a new Queue
+      "{id}_archive_dlq". TTL has already deleted these items, so they must
+      be archived from the stream (kept 24 hours) before they are lost.
     """
 
-    def grant_access(self, *, grantees, grantfunc, env_var_name) -> None:
+    def grant_access(
+        self, *, grantees, grantfunc, env_var_name, dax_actions=None
+    ) -> None:
         for grantee in grantees:
             grantfunc(grantee)
             if isinstance(grantee, aws_lambda.Function):
                 grantee.add_environment(env_var_name, self.table_name)
+            if self.dax_cluster is not None:
+                self.grant_dax(grantee, dax_actions, env_var_name)
+
+    def grant_dax(
+        self, grantee: aws_iam.IGrantable, actions: Sequence[str], env_var_name: str
+    ) -> None:
+        """
+        Grant grantee actions on the DAX cluster. Functions also get the
+        endpoint in {env_var_name}_DAX_ENDPOINT, and must be in the VPC of
+        the cluster to reach it.
+        """
+        if isinstance(grantee, aws_lambda.Function) and not self._in_dax_vpc(grantee):
+            raise ValueError(
+                f"{type(self).__name__}('{self.node.id}'): {grantee.node.path} must be in the VPC of the DAX cluster to use it."
+            )
+        aws_iam.Grant.add_to_principal(
+            grantee=grantee,
+            actions=actions,
+            resource_arns=[self.dax_cluster.attr_arn],
+        )
+        if isinstance(grantee, aws_lambda.Function):
+            grantee.add_environment(
+                f"{env_var_name}_DAX_ENDPOINT",
+                self.dax_cluster.attr_cluster_discovery_endpoint_url,
+            )
+            self.dax_security_group.connections.allow_from(
+                grantee, aws_ec2.Port.tcp(_DAX_PORT), "DAX clients"
+            )
+
+    def _in_dax_vpc(self, fn: aws_lambda.Function) -> bool:
+        if not fn.is_bound_to_vpc:
+            return False
+        stack = Stack.of(self)
+        if Stack.of(fn) is not stack:
+            # Subnets are referenced across stacks, assume the right VPC
+            return True
+        vpc = self.dax_vpc
+        vpc_subnets = [
+            stack.resolve(subnet.subnet_id)
+            for subnet in vpc.public_subnets
+            + vpc.private_subnets
+            + vpc.isolated_subnets
+        ]
+        fn_subnets = stack.resolve(fn.node.default_child.vpc_config)["subnetIds"]
+        return any(subnet in vpc_subnets for subnet in fn_subnets)
+
+    def define_dax(
+        self,
+        *,
+        vpc: aws_ec2.IVpc,
+        node_type: str = "dax.t3.small",
+        replication_factor: int = None,
+        subnet_ids: Sequence[str] = None,
+        security_groups: Sequence[aws_ec2.ISecurityGroup] = None,
+    ) -> aws_dax.CfnCluster:
+        """
+        Create a DAX cluster for the table.
+
+        - vpc: the cluster is placed in its private subnets, unless subnet_ids is set.
+        - node_type: e.g. "dax.t3.small" or "dax.r5.large".
+        - replication_factor: number of nodes, defaults to 3 in PROD and 1 otherwise.
+        - security_groups: in addition to the one created for the cluster, which
+          allows access from functions in the VPC that are granted access.
+        """
+        role = aws_iam.Role(
+            self,
+            "dax-role",
+            assumed_by=aws_iam.ServicePrincipal("dax.amazonaws.com"),
+        )
+        self.grant_read_write_data(role)
+
+        self.dax_vpc = vpc
+        self.dax_security_group = aws_ec2.SecurityGroup(
+            self,
+            "dax-sg",
+            vpc=vpc,
+            description=f"Security Group for DAX in front of {self.node.id}",
+        )
+        subnet_group = aws_dax.CfnSubnetGroup(
+            self,
+            "dax-subnets",
+            subnet_ids=subnet_ids or get_private_subnet_ids(vpc),
+            description=f"Subnets for DAX in front of {self.node.id}",
+        )
+        stage = getattr(Stack.of(self), "stage", None)
+        cluster = aws_dax.CfnCluster(
+            self,
+            "dax",
+            iam_role_arn=role.role_arn,
+            node_type=node_type,
+            replication_factor=replication_factor or _stage_to_dax_nodes.get(stage, 1),
+            subnet_group_name=subnet_group.ref,
+            security_group_ids=[self.dax_security_group.security_group_id]
+            + [sg.security_group_id for sg in security_groups or []],
+            sse_specification=aws_dax.CfnCluster.SSESpecificationProperty(
+                sse_enabled=True
+            ),
+            cluster_endpoint_encryption_type="TLS",
+        )
+        # The role needs its policy before DAX validates it
+        cluster.node.add_dependency(role)
+        return cluster
+
+    def apply_capacity_policy(self, scale_read, scale_write, index_name: str = None):
+        policy = self.capacity_policy
+        min_read, max_read, min_write, max_write = self._capacity_bounds
+        for scale, kind, low, high in [
+            (scale_read, "read", min_read, max_read),
+            (scale_write, "write", min_write, max_write),
+        ]:
+            scalable = scale(min_capacity=low, max_capacity=high)
+            scalable.scale_on_utilization(
+                target_utilization_percent=policy.target_utilization_percent
+            )
+            for scheduled in policy.scheduled:
+                bounds = {
+                    "min_capacity": getattr(scheduled, f"min_{kind}"),
+                    "max_capacity": getattr(scheduled, f"max_{kind}"),
+                }
+                bounds = {k: v for (k, v) in bounds.items() if v is not None}
+                if not bounds:
+                    continue
+                scalable.scale_on_schedule(
+                    f"{scheduled.name}-{kind}"
+                    + ("" if index_name is None else f"-{index_name}"),
+                    schedule=aws_applicationautoscaling.Schedule.expression(
+                        f"cron({scheduled.schedule})"
+                    ),
+                    **bounds,
+                )
+
+    def add_global_secondary_index(self, **kwargs) -> None:
+        """
+        Add a global secondary index. With a provisioned capacity_policy the
+        index gets the same capacity bounds and scaling as the table.
+        """
+        bounds = getattr(self, "_capacity_bounds", None)
+        if bounds:
+            kwargs.setdefault("read_capacity", bounds[0])
+            kwargs.setdefault("write_capacity", bounds[2])
+        super().add_global_secondary_index(**kwargs)
+        if bounds:
+            index_name = kwargs["index_name"]
+            self.apply_capacity_policy(
+                lambda **b: self.auto_scale_global_secondary_index_read_capacity(
+                    index_name, **b
+                ),
+                lambda **b: self.auto_scale_global_secondary_index_write_capacity(
+                    index_name, **b
+                ),
+                index_name,
+            )
+
+    def add_stream_processor(
+        self,
+        handler: aws_lambda.IFunction,
+        *,
+        batch_size: int = 100,
+        max_batching_window: Duration = None,
+        parallelization_factor: int = 1,
+        tumbling_window: Duration = None,
+        filters: Sequence[dict] = None,
+        report_batch_item_failures: bool = True,
+        bisect_batch_on_error: bool = True,
+        retry_attempts: int = 3,
+        max_record_age: Duration = None,
+        dead_letter_queue: aws_sqs.IQueue = None,
+        starting_position: aws_lambda.StartingPosition = aws_lambda.StartingPosition.TRIM_HORIZON,
+    ) -> aws_lambda_event_sources.DynamoEventSource:
+        """
+        Process the table's stream with handler. The table must be created
+        with stream set.
+
+        - batch_size, max_batching_window: records per invocation (1-10000) and
+          how long to wait for a batch to fill (up to 5 minutes).
+        - parallelization_factor: concurrent batches per shard (1-10).
+          Ordering is kept per partition key.
+        - tumbling_window: aggregate over windows of this length (up to 15 minutes).
+        - filters: event filter patterns, e.g. {"eventName": ["INSERT"]}.
+          Records not matching any pattern never invoke handler.
+        - report_batch_item_failures: handler returns the failed records, see
+          alabcdk_runtime.batch.process_batch(), and only those are retried.
+        - bisect_batch_on_error, retry_attempts, max_record_age: retry behaviour.
+        - dead_letter_queue: receives references to records that failed all
+          retries, e.g. an alabcdk Queue.
+        """
+        if self.table_stream_arn is None:
+            raise ValueError(
+                f"{type(self).__name__}('{self.node.id}'): set 'stream' on the table to add a stream processor."
+            )
+        if not 1 <= parallelization_factor <= 10:
+            raise ValueError(
+                f"parallelization_factor must be between 1 and 10, got {parallelization_factor}."
+            )
+        source = aws_lambda_event_sources.DynamoEventSource(
+            self,
+            starting_position=starting_position,
+            batch_size=batch_size,
+            max_batching_window=max_batching_window,
+            parallelization_factor=parallelization_factor,
+            tumbling_window=tumbling_window,
+            filters=[aws_lambda.FilterCriteria.filter(f) for f in filters or []],
+            report_batch_item_failures=report_batch_item_failures,
+            bisect_batch_on_error=bisect_batch_on_error,
+            retry_attempts=retry_attempts,
+            max_record_age=max_record_age,
+            on_failure=(
+                None
+                if dead_letter_queue is None
+                else aws_lambda_event_sources.SqsDlq(dead_letter_queue)
+            ),
+        )
+        handler.add_event_source(source)
+        return source
+
+    def define_archive(
+        self,
+        bucket: aws_s3.IBucket,
+        dead_letter_queue: aws_sqs.IQueue,
+        time_to_live_attribute: str,
+    ) -> Function:
+        archiver = Function(
+            self,
+            f"{self.node.id}_archive",
+            code=runtime_code(),
+            handler="alabcdk_runtime.dynamodb_archive.handler",
+            timeout=Duration.minutes(5),
+            memory_size=512,
+        )
+        archiver.add_environment("ARCHIVE_BUCKET", bucket.bucket_name)
+        archiver.add_environment("ARCHIVE_PREFIX", f"{self.node.id}/")
+        archiver.add_environment("TTL_ATTRIBUTE", time_to_live_attribute)
+        bucket.grant_put(archiver)
+        self.add_stream_processor(
+            archiver,
+            batch_size=1000,
+            max_batching_window=Duration.minutes(5),
+            # Split failing batches down to the failing item, and keep the
+            # items that still fail, as TTL has already deleted them
+            bisect_batch_on_error=True,
+            retry_attempts=10,
+            dead_letter_queue=dead_letter_queue,
+            # Only deletes made by the TTL process
+            filters=[
+                {
+                    "eventName": ["REMOVE"],
+                    "userIdentity": {
+                        "type": ["Service"],
+                        "principalId": ["dynamodb.amazonaws.com"],
+                    },
+                }
+            ],
+        )
+        return archiver
+
+    def _index_projection(self, index: IndexPlan) -> dict:
+        if index.projection is None:
+            return {"projection_type": aws_dynamodb.ProjectionType.ALL}
+        keys = {
+            index.partition_key,
+            index.sort_key,
+            self.access_plan.table.partition_key,
+            self.access_plan.table.sort_key,
+        }
+        non_key_attributes = [a for a in index.projection if a not in keys]
+        if not non_key_attributes:
+            return {"projection_type": aws_dynamodb.ProjectionType.KEYS_ONLY}
+        return {
+            "projection_type": aws_dynamodb.ProjectionType.INCLUDE,
+            "non_key_attributes": non_key_attributes,
+        }
+
+    def apply_access_plan(self, attribute_types: dict) -> None:
+        for warning in self.access_plan.warnings:
+            Annotations.of(self).add_warning(warning)
+
+        def attribute(name: str) -> aws_dynamodb.Attribute:
+            if name is None:
+                return None
+            return aws_dynamodb.Attribute(
+                name=name,
+                type=attribute_types.get(name, aws_dynamodb.AttributeType.STRING),
+            )
+
+        for index in self.access_plan.indexes:
+            if index.kind == "lsi":
+                self.add_local_secondary_index(
+                    index_name=index.name,
+                    sort_key=attribute(index.sort_key),
+                    **self._index_projection(index),
+                )
+            else:
+                self.add_global_secondary_index(
+                    index_name=index.name,
+                    partition_key=attribute(index.partition_key),
+                    sort_key=attribute(index.sort_key),
+                    **self._index_projection(index),
+                )
 
     def __init__(
         self,
         scope: Construct,
         id: str,
         *,
-        partition_key=aws_dynamodb.Attribute(
-            name="id", type=aws_dynamodb.AttributeType.STRING
-        ),
+        partition_key: aws_dynamodb.Attribute = None,
         point_in_time_recovery=True,
         readers: Sequence[aws_iam.IGrantable] = None,
         writers: Sequence[aws_iam.IGrantable] = None,
         readers_writers: Sequence[aws_iam.IGrantable] = None,
         env_var_name: str = None,
-        **kwargs
+        capacity_policy: CapacityPolicy = None,
+        dax: bool = False,
+        access_patterns: Sequence[AccessPattern] = None,
+        attribute_types: Dict[str, aws_dynamodb.AttributeType] = None,
+        access_patterns_module: str = None,
+        archive_expired_items: bool = False,
+        archive_bucket: aws_s3.IBucket = None,
+        archive_dead_letter_queue: aws_sqs.IQueue = None,
+        **kwargs,
     ):
         kwargs = get_params(locals())
+        dax_kwargs = filter_kwargs(kwargs, "dax_")
+        remove_params(kwargs, [f"dax_{k}" for k in dax_kwargs])
 
         kwargs.setdefault("table_name", gen_name(scope, id))
         kwargs.setdefault("removal_policy", stage_based_removal_policy(scope))
-        remove_params(kwargs, ["env_var_name", "readers", "writers", "readers_writers"])
+        remove_params(
+            kwargs,
+            [
+                "env_var_name",
+                "readers",
+                "writers",
+                "readers_writers",
+                "capacity_policy",
+                "dax",
+                "access_patterns",
+                "attribute_types",
+                "access_patterns_module",
+                "archive_expired_items",
+                "archive_bucket",
+                "archive_dead_letter_queue",
+            ],
+        )
+
+        if archive_expired_items:
+            if not kwargs.get("time_to_live_attribute"):
+                raise ValueError(
+                    f"{type(self).__name__}('{id}'): archive_expired_items requires time_to_live_attribute."
+                )
+            kwargs.setdefault("stream", aws_dynamodb.StreamViewType.OLD_IMAGE)
+            if kwargs["stream"] not in [
+                aws_dynamodb.StreamViewType.OLD_IMAGE,
+                aws_dynamodb.StreamViewType.NEW_AND_OLD_IMAGES,
+            ]:
+                raise ValueError(
+                    f"{type(self).__name__}('{id}'): archive_expired_items requires a stream with old images."
+                )
+
+        attribute_types = attribute_types or {}
+        self.access_plan = None
+        if access_patterns:
+            if kwargs.get("partition_key") or kwargs.get("sort_key"):
+                raise ValueError(
+                    f"{type(self).__name__}('{id}'): access_patterns cannot be combined with partition_key or sort_key."
+                )
+            self.access_plan = plan_key_schema(access_patterns)
+            kwargs["partition_key"] = aws_dynamodb.Attribute(
+                name=self.access_plan.table.partition_key,
+                type=attribute_types.get(
+                    self.access_plan.table.partition_key,
+                    aws_dynamodb.AttributeType.STRING,
+                ),
+            )
+            if self.access_plan.table.sort_key:
+                kwargs["sort_key"] = aws_dynamodb.Attribute(
+                    name=self.access_plan.table.sort_key,
+                    type=attribute_types.get(
+                        self.access_plan.table.sort_key,
+                        aws_dynamodb.AttributeType.STRING,
+                    ),
+                )
+        elif kwargs.get("partition_key") is None:
+            kwargs["partition_key"] = aws_dynamodb.Attribute(
+                name="id", type=aws_dynamodb.AttributeType.STRING
+            )
+
+        capacity_bounds = None
+        if capacity_policy is not None:
+            conflicting = {"billing_mode", "read_capacity", "write_capacity"} & set(
+                kwargs
+            )
+            if conflicting:
+                raise ValueError(
+                    f"{type(self).__name__}('{id}'): capacity_policy cannot be combined with {sorted(conflicting)}."
+                )
+            if capacity_policy.mode == "on_demand":
+                kwargs["billing_mode"] = aws_dynamodb.BillingMode.PAY_PER_REQUEST
+            else:
+                capacity_bounds = capacity_policy.bounds(
+                    getattr(Stack.of(scope), "stage", None)
+                )
+                kwargs["billing_mode"] = aws_dynamodb.BillingMode.PROVISIONED
+                kwargs["read_capacity"] = capacity_bounds[0]
+                kwargs["write_capacity"] = capacity_bounds[2]
 
         super().__init__(scope, id, **kwargs)
+        self.capacity_policy = capacity_policy
+        self._capacity_bounds = capacity_bounds
+        if capacity_bounds:
+            self.apply_capacity_policy(
+                self.auto_scale_read_capacity, self.auto_scale_write_capacity
+            )
+        self.dax_cluster = self.define_dax(**dax_kwargs) if dax else None
+
+        self.archive_bucket = None
+        self.archive_dead_letter_queue = None
+        if archive_expired_items:
+            self.archive_bucket = archive_bucket or Bucket(scope, f"{id}_archive")
+            self.archive_dead_letter_queue = archive_dead_letter_queue or Queue(
+                scope, f"{id}_archive_dlq", retention_period=Duration.days(14)
+            )
+            self.define_archive(
+                self.archive_bucket,
+                self.archive_dead_letter_queue,
+                kwargs["time_to_live_attribute"],
+            )
+
         env_var_name = env_var_name or id
+        if self.access_plan is not None:
+            self.apply_access_plan(attribute_types)
+            if access_patterns_module:
+                with open(access_patterns_module, "w") as f:
+                    f.write(
+                        accessor_module_source(
+                            self.access_plan,
+                            access_patterns,
+                            table_env_var=env_var_name,
+                            attribute_types={
+                                k: _attribute_type_codes[v]
+                                for (k, v) in attribute_types.items()
+                            },
+                        )
+                    )
         generate_output(self, env_var_name, self.table_name)
         self.grant_access(
             grantees=readers or [],
             grantfunc=self.grant_read_data,
             env_var_name=env_var_name,
+            dax_actions=_DAX_READ_ACTIONS,
         )
         self.grant_access(
             grantees=writers or [],
             grantfunc=self.grant_write_data,
             env_var_name=env_var_name,
+            dax_actions=_DAX_WRITE_ACTIONS,
         )
         self.grant_access(
             grantees=readers_writers or [],
             grantfunc=self.grant_read_write_data,
             env_var_name=env_var_name,
+            dax_actions=sorted(set(_DAX_READ_ACTIONS + _DAX_WRITE_ACTIONS)),
         )
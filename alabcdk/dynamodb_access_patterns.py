@@ -0,0 +1,246 @@
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Literal, Optional, Sequence
+
+# DynamoDB limits
+_MAX_LSIS = 5
+_MAX_GSIS = 20
+# Below this many distinct partition key values a partition easily gets hot
+_HOT_PARTITION_CARDINALITY = 100
+
+_python_types = {"S": "str", "N": "int", "B": "bytes"}
+
+
+@dataclass
+class AccessPattern:
+    """
+    A way the application reads a table.
+
+    - name: identifies the pattern, also used to name indexes.
+    - partition_key: attribute the pattern looks items up by.
+    - sort_key: attribute the pattern sorts or filters item collections by.
+    - operation: "get" for single items, "query" for item collections, "scan"
+      for patterns without a key (to be avoided).
+    - projection: attributes the pattern reads. None reads all attributes,
+      an empty list only the keys.
+    - partition_key_cardinality: expected number of distinct partition key
+      values, used to warn about hot partitions.
+    """
+
+    name: str
+    partition_key: str = None
+    sort_key: str = None
+    operation: Literal["get", "query", "scan"] = "query"
+    projection: Optional[List[str]] = None
+    partition_key_cardinality: int = None
+
+
+@dataclass
+class IndexPlan:
+    name: Optional[str]
+    kind: Literal["table", "lsi", "gsi"]
+    partition_key: str
+    sort_key: Optional[str]
+    projection: Optional[List[str]]
+    patterns: List[str] = field(default_factory=list)
+
+
+@dataclass
+class KeySchemaPlan:
+    table: IndexPlan
+    indexes: List[IndexPlan]
+    warnings: List[str]
+
+    def index_for(self, pattern: str) -> Optional[IndexPlan]:
+        for plan in [self.table] + self.indexes:
+            if pattern in plan.patterns:
+                return plan
+        return None
+
+
+def _merge_projection(a: Optional[List[str]], b: Optional[List[str]]):
+    if a is None or b is None:
+        return None
+    return sorted(set(a) | set(b))
+
+
+def plan_key_schema(patterns: Sequence[AccessPattern]) -> KeySchemaPlan:
+    """
+    Derive the table key and the secondary indexes needed to serve patterns.
+
+    The first pattern that is not a scan defines the table key. Patterns with
+    the table's partition key and no sort key, or the table's sort key, are
+    served by the table. Patterns with the table's partition key but another
+    sort key get a local secondary index (while available), all others a
+    global secondary index. Patterns with identical keys share an index.
+
+    :raises ValueError: if no pattern can define the table key, or patterns
+        are inconsistent.
+    """
+    warnings = []
+    names = [p.name for p in patterns]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Access pattern names must be unique: {names}.")
+    keyed = []
+    for p in patterns:
+        if p.operation == "scan":
+            warnings.append(
+                f"Access pattern '{p.name}' needs a Scan. Consider giving it a partition key."
+            )
+        elif p.partition_key is None:
+            raise ValueError(
+                f"Access pattern '{p.name}': operation '{p.operation}' needs a partition_key."
+            )
+        else:
+            keyed.append(p)
+        if (
+            p.partition_key_cardinality is not None
+            and p.partition_key_cardinality < _HOT_PARTITION_CARDINALITY
+        ):
+            warnings.append(
+                f"Access pattern '{p.name}': partition key '{p.partition_key}' has only "
+                f"~{p.partition_key_cardinality} distinct values, which risks hot partitions. "
+                "Consider a more selective key or write sharding."
+            )
+    if not keyed:
+        raise ValueError("At least one access pattern needs a partition_key.")
+
+    primary = keyed[0]
+    table = IndexPlan(
+        name=None,
+        kind="table",
+        partition_key=primary.partition_key,
+        sort_key=primary.sort_key,
+        projection=None,
+    )
+    indexes: List[IndexPlan] = []
+    for p in keyed:
+        keys = (p.partition_key, p.sort_key)
+        # Patterns without a sort key query the table's item collections
+        if p.partition_key == table.partition_key and p.sort_key in (
+            None,
+            table.sort_key,
+        ):
+            table.patterns.append(p.name)
+            continue
+        existing = [i for i in indexes if (i.partition_key, i.sort_key) == keys]
+        if existing:
+            existing[0].patterns.append(p.name)
+            existing[0].projection = _merge_projection(
+                existing[0].projection, p.projection
+            )
+            continue
+        lsi_count = len([i for i in indexes if i.kind == "lsi"])
+        is_lsi = (
+            p.partition_key == table.partition_key
+            and p.sort_key is not None
+            and table.sort_key is not None
+            and lsi_count < _MAX_LSIS
+        )
+        if p.operation == "get":
+            warnings.append(
+                f"Access pattern '{p.name}' reads a single item through an index, "
+                "which needs a Query since index keys are not unique."
+            )
+        indexes.append(
+            IndexPlan(
+                name=re.sub(r"[^a-zA-Z0-9_.-]", "_", p.name),
+                kind="lsi" if is_lsi else "gsi",
+                partition_key=p.partition_key,
+                sort_key=p.sort_key,
+                projection=p.projection,
+                patterns=[p.name],
+            )
+        )
+    gsi_count = len([i for i in indexes if i.kind == "gsi"])
+    if gsi_count > _MAX_GSIS:
+        raise ValueError(
+            f"The access patterns need {gsi_count} global secondary indexes, at most {_MAX_GSIS} are allowed."
+        )
+    return KeySchemaPlan(table=table, indexes=indexes, warnings=warnings)
+
+
+def _class_name(name: str) -> str:
+    return "".join(part.capitalize() for part in re.split(r"[^a-zA-Z0-9]+", name))
+
+
+def accessor_module_source(
+    plan: KeySchemaPlan,
+    patterns: Sequence[AccessPattern],
+    *,
+    table_env_var: str,
+    attribute_types: Dict[str, str] = None,
+) -> str:
+    """
+    Python source for a module giving handlers typed access to the key schema.
+    Every pattern becomes a class with the index name, the key attribute names
+    and a query_args() function producing the arguments for Table.query()
+    (boto3 resource API).
+
+    attribute_types maps attribute names to "S", "N" or "B", default "S".
+    """
+    attribute_types = attribute_types or {}
+
+    def py_type(attribute: str) -> str:
+        return _python_types[attribute_types.get(attribute, "S")]
+
+    def literal(value: Optional[str]) -> str:
+        return "None" if value is None else f'"{value}"'
+
+    lines = [
+        '"""',
+        "Key schema and access patterns of a DynamoDB table.",
+        "",
+        "Generated by alabcdk from the access_patterns of the Table, do not edit.",
+        '"""',
+        "import os",
+        "from typing import Optional",
+        "",
+        f"TABLE_NAME_ENV = {literal(table_env_var)}",
+        f"PARTITION_KEY = {literal(plan.table.partition_key)}",
+        f"SORT_KEY = {literal(plan.table.sort_key)}",
+        "",
+        "",
+        "def table_name() -> str:",
+        "    return os.environ[TABLE_NAME_ENV]",
+    ]
+    for p in patterns:
+        index = plan.index_for(p.name)
+        lines += ["", "", f"class {_class_name(p.name)}:"]
+        if index is None:
+            lines += [
+                f'    """{p.name}: requires a Scan."""',
+                "",
+                "    INDEX_NAME = None",
+            ]
+            continue
+        pk, sk = index.partition_key, index.sort_key
+        signature = f"partition: {py_type(pk)}"
+        if sk is not None:
+            signature += f", sort: Optional[{py_type(sk)}] = None"
+        lines += [
+            f'    """{p.name}: {p.operation} on {index.name or "the table"}."""',
+            "",
+            f"    INDEX_NAME = {literal(index.name)}",
+            f"    PARTITION_KEY = {literal(pk)}",
+            f"    SORT_KEY = {literal(sk)}",
+            "",
+            "    @classmethod",
+            f"    def query_args(cls, {signature}) -> dict:",
+            "        result = {",
+            '            "KeyConditionExpression": "#pk = :pk",',
+            '            "ExpressionAttributeNames": {"#pk": cls.PARTITION_KEY},',
+            '            "ExpressionAttributeValues": {":pk": partition},',
+            "        }",
+        ]
+        if sk is not None:
+            lines += [
+                "        if sort is not None:",
+                '            result["KeyConditionExpression"] += " AND #sk = :sk"',
+                '            result["ExpressionAttributeNames"]["#sk"] = cls.SORT_KEY',
+                '            result["ExpressionAttributeValues"][":sk"] = sort',
+            ]
+        if index.name is not None:
+            lines += ['        result["IndexName"] = cls.INDEX_NAME']
+        lines += ["        return result"]
+    return "\n".join(lines) + "\n"
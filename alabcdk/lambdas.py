@@ -5,9 +5,11 @@ import tempfile
 import subprocess
 import shutil
 import glob
+from functools import lru_cache
 from typing import List, Optional
 from constructs import Construct
-from aws_cdk import Duration, aws_lambda, aws_logs
+from aws_cdk import Duration, Stack, aws_lambda, aws_logs
+import alabcdk_runtime
 from .utils import gen_name, get_params, generate_output, setup_logger
 
 logger = setup_logger(name="alabcdk")
@@ -15,6 +17,65 @@ _stage_to_loglevel = {"PROD": "INFO", "TEST": "DEBUG", "DEV": "DEBUG"}
 
 
 _DEFAULT_LAMBDA_LOGLEVEL = "DEBUG"
+_RUNTIME_LAYER_ID = "alabcdk_runtime_layer"
+
+
+@lru_cache(maxsize=None)
+def _stage_runtime(subdir: str) -> str:
+    """
+    Copy the alabcdk_runtime package to a staging directory, placed under
+    subdir, and return the staging directory.
+    """
+    staging_dir = pathlib.Path(tempfile.mkdtemp())
+    shutil.copytree(
+        os.path.dirname(alabcdk_runtime.__file__),
+        staging_dir / subdir / "alabcdk_runtime",
+        ignore=shutil.ignore_patterns("__pycache__", "*.pyc"),
+    )
+    return str(staging_dir)
+
+
+def runtime_code() -> aws_lambda.Code:
+    """
+    Code asset containing the alabcdk_runtime package, for functions whose
+    handler lives in alabcdk_runtime, e.g. "alabcdk_runtime.redshift_copy.handler".
+    """
+    return aws_lambda.Code.from_asset(_stage_runtime(""))
+
+
+def runtime_layer(scope: Construct) -> aws_lambda.LayerVersion:
+    """
+    Layer making alabcdk_runtime importable from your own handlers.
+    Only one layer is created per stack.
+    """
+    stack = Stack.of(scope)
+    layer = stack.node.try_find_child(_RUNTIME_LAYER_ID)
+    if layer is None:
+        layer = aws_lambda.LayerVersion(
+            stack,
+            _RUNTIME_LAYER_ID,
+            code=aws_lambda.Code.from_asset(_stage_runtime("python")),
+            compatible_runtimes=[
+                aws_lambda.Runtime.PYTHON_3_11,
+                aws_lambda.Runtime.PYTHON_3_12,
+            ],
+            layer_version_name=gen_name(stack, _RUNTIME_LAYER_ID),
+            description="Runtime helpers from alabcdk",
+        )
+    return layer
+
+
+def add_runtime_layer(fn: aws_lambda.IFunction) -> None:
+    """
+    Add runtime_layer() to fn, unless already added. Functions not defined in
+    this app (imported ones) are left alone.
+    """
+    if not isinstance(fn, aws_lambda.Function):
+        return
+    if getattr(fn, "_alabcdk_runtime_layer", False):
+        return
+    fn.add_layers(runtime_layer(fn))
+    fn._alabcdk_runtime_layer = True
 
 
 class Function(aws_lambda.Function):
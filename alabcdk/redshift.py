@@ -1,3 +1,6 @@
+import json
+import math
+from dataclasses import dataclass, field
 from constructs import Construct
 
 import aws_cdk as cdk
@@ -6,15 +9,387 @@ from aws_cdk import (
     aws_ec2,
     aws_iam,
     aws_kms as kms,
+    aws_lambda,
     aws_redshift,
     aws_redshiftserverless,
     aws_redshift_alpha as redshift,
+    custom_resources,
 )
-from typing import List, Literal
+from typing import Dict, List, Literal, Optional
 
 from .utils import gen_name
 from .aws_cloud_resources import redshift_port_number
 
+# See https://docs.aws.amazon.com/redshift/latest/dg/cm-c-wlm-query-monitoring-rules.html
+_QMR_METRICS = [
+    "query_cpu_time",
+    "query_blocks_read",
+    "scan_row_count",
+    "query_execution_time",
+    "query_queue_time",
+    "query_cpu_usage_percent",
+    "query_temp_blocks_to_disk",
+    "segment_execution_time",
+    "cpu_skew",
+    "io_skew",
+    "join_row_count",
+    "nested_loop_join_row_count",
+    "return_row_count",
+    "spectrum_scan_row_count",
+    "spectrum_scan_size_mb",
+]
+_WLM_PRIORITIES = ["lowest", "low", "normal", "high", "highest"]
+
+RedshiftNodeType = Literal[
+    "dc2.large", "dc2.8xlarge", "ra3.xlplus", "ra3.4xlarge", "ra3.16xlarge"
+]
+
+
+@dataclass(frozen=True)
+class _NodeSpec:
+    min_nodes: int
+    max_nodes: int
+    managed_storage: bool
+    # Sizing heuristics, not hard limits: compressed data per node that still
+    # performs well and concurrent queries a node handles without queueing.
+    data_tb_per_node: float
+    queries_per_node: float
+
+
+# See https://docs.aws.amazon.com/redshift/latest/mgmt/working-with-clusters.html#working-with-clusters-overview
+_NODE_SPECS = {
+    "dc2.large": _NodeSpec(1, 32, False, 0.16, 1),
+    "dc2.8xlarge": _NodeSpec(2, 128, False, 2.56, 4),
+    "ra3.xlplus": _NodeSpec(1, 32, True, 4, 2),
+    "ra3.4xlarge": _NodeSpec(2, 64, True, 16, 4),
+    "ra3.16xlarge": _NodeSpec(2, 128, True, 64, 15),
+}
+
+
+@dataclass
+class NodeSizing:
+    node_type: RedshiftNodeType
+    number_of_nodes: int
+
+    @property
+    def cluster_type(self) -> Literal["single-node", "multi-node"]:
+        return "single-node" if self.number_of_nodes == 1 else "multi-node"
+
+
+def validate_node_count(node_type: RedshiftNodeType, number_of_nodes: int) -> None:
+    if node_type not in _NODE_SPECS:
+        raise ValueError(
+            f"Unknown Redshift node type '{node_type}', expected one of {list(_NODE_SPECS)}."
+        )
+    spec = _NODE_SPECS[node_type]
+    if not spec.min_nodes <= number_of_nodes <= spec.max_nodes:
+        raise ValueError(
+            f"{node_type} supports {spec.min_nodes}-{spec.max_nodes} nodes, got {number_of_nodes}."
+        )
+
+
+def suggest_node_sizing(
+    *,
+    data_volume_tb: float,
+    concurrency: int = 5,
+    growth_factor: float = 2.0,
+    node_types: List[RedshiftNodeType] = None,
+) -> NodeSizing:
+    """
+    Suggest node type and count for an expected (compressed) data volume and
+    number of concurrent queries.
+
+    The smallest node type that fits is chosen, as long as the cluster can
+    still grow by growth_factor through elastic resize without changing node
+    type. Defaults to RA3 node types, where storage scales independently
+    of compute. Raises ValueError if no node type can hold the data volume
+    and concurrency within its maximum number of nodes.
+
+    Example:
+    >>>suggest_node_sizing(data_volume_tb=10, concurrency=10)
+    NodeSizing(node_type='ra3.xlplus', number_of_nodes=5)
+    """
+    node_types = node_types or ["ra3.xlplus", "ra3.4xlarge", "ra3.16xlarge"]
+    if data_volume_tb < 0 or concurrency < 1:
+        raise ValueError("data_volume_tb must be >= 0 and concurrency >= 1.")
+
+    candidates = []
+    for node_type in node_types:
+        spec = _NODE_SPECS[node_type]
+        nodes = max(
+            spec.min_nodes,
+            math.ceil(data_volume_tb / spec.data_tb_per_node),
+            math.ceil(concurrency / spec.queries_per_node),
+        )
+        if nodes > spec.max_nodes:
+            continue
+        candidates.append(NodeSizing(node_type, nodes))
+        if nodes * growth_factor <= spec.max_nodes:
+            return candidates[-1]
+    if not candidates:
+        raise ValueError(
+            f"No node type of {node_types} holds {data_volume_tb} TB and {concurrency} concurrent queries."
+        )
+    # Nothing leaves room to grow, use the largest node type that fits.
+    return candidates[-1]
+
+
+@dataclass
+class QueryMonitoringRule:
+    """
+    A WLM query monitoring rule.
+
+    predicates is a list of (metric_name, operator, value) tuples, e.g.
+    [("query_execution_time", ">", 120)]. All predicates must match for the
+    action to trigger. action_priority is only used with action
+    "change_query_priority".
+    """
+
+    name: str
+    predicates: List[tuple]
+    action: Literal["log", "hop", "abort", "change_query_priority"] = "log"
+    action_priority: Optional[str] = None
+
+    def render(self) -> dict:
+        result = {
+            "rule_name": self.name,
+            "predicate": [
+                {"metric_name": metric, "operator": operator, "value": value}
+                for (metric, operator, value) in self.predicates
+            ],
+            "action": self.action,
+        }
+        if self.action_priority is not None:
+            result["value"] = self.action_priority
+        return result
+
+
+@dataclass
+class WlmQueue:
+    """
+    A WLM queue. The last queue in a WlmConfiguration is the default queue
+    and may not have any user or query groups.
+
+    memory_percent and concurrency are only valid for manual WLM, priority
+    only for automatic WLM.
+    """
+
+    name: str
+    user_groups: List[str] = field(default_factory=list)
+    query_groups: List[str] = field(default_factory=list)
+    memory_percent: Optional[int] = None
+    concurrency: Optional[int] = None
+    priority: Optional[str] = None
+    concurrency_scaling: Literal["off", "auto"] = "off"
+    timeout_ms: Optional[int] = None
+    rules: List[QueryMonitoringRule] = field(default_factory=list)
+
+    def render(self, auto_wlm: bool) -> dict:
+        result = {
+            "name": self.name,
+            "user_group": self.user_groups,
+            "user_group_wild_card": int(any("*" in g for g in self.user_groups)),
+            "query_group": self.query_groups,
+            "query_group_wild_card": int(any("*" in g for g in self.query_groups)),
+            "concurrency_scaling": self.concurrency_scaling,
+            "rules": [rule.render() for rule in self.rules],
+        }
+        if auto_wlm:
+            result["auto_wlm"] = True
+            result["priority"] = self.priority or "normal"
+        else:
+            if self.concurrency is not None:
+                result["query_concurrency"] = self.concurrency
+            if self.memory_percent is not None:
+                result["memory_percent_to_use"] = self.memory_percent
+            if self.timeout_ms is not None:
+                result["max_execution_time"] = self.timeout_ms
+        return result
+
+
+@dataclass
+class WlmConfiguration:
+    """
+    Workload management and concurrency scaling settings for a provisioned
+    Redshift cluster. Rendered into a cluster parameter group.
+
+    See https://docs.aws.amazon.com/redshift/latest/mgmt/workload-mgmt-config.html
+
+    - queues: the last queue is the default queue.
+    - auto_wlm: let Redshift manage memory and concurrency, using queue priorities.
+    - short_query_acceleration: route short queries to a dedicated space.
+    - max_concurrency_scaling_clusters: upper bound of transient clusters used
+      by queues with concurrency_scaling="auto".
+    - parameters: additional parameter group settings, e.g.
+      {"enable_user_activity_logging": "true"}.
+    """
+
+    queues: List[WlmQueue] = field(
+        default_factory=lambda: [WlmQueue(name="Default queue")]
+    )
+    auto_wlm: bool = True
+    short_query_acceleration: bool = True
+    max_concurrency_scaling_clusters: int = 1
+    parameters: dict = field(default_factory=dict)
+
+    def validate(self) -> List[str]:
+        """Return a list of problems with the configuration, empty if valid."""
+        errors = []
+        if not self.queues:
+            errors.append("At least one (default) queue is required.")
+            return errors
+        if len(self.queues) > 8:
+            errors.append(f"At most 8 queues are allowed, got {len(self.queues)}.")
+
+        names = [q.name for q in self.queues]
+        if len(set(names)) != len(names):
+            errors.append(f"Queue names must be unique: {names}.")
+
+        default_queue = self.queues[-1]
+        if default_queue.user_groups or default_queue.query_groups:
+            errors.append(
+                f"The last queue ('{default_queue.name}') is the default queue and cannot have user or query groups."
+            )
+
+        if not 0 <= self.max_concurrency_scaling_clusters <= 10:
+            errors.append(
+                "max_concurrency_scaling_clusters must be between 0 and 10, "
+                f"got {self.max_concurrency_scaling_clusters}."
+            )
+
+        rule_count = 0
+        for q in self.queues:
+            prefix = f"Queue '{q.name}'"
+            if self.auto_wlm:
+                if q.memory_percent is not None or q.concurrency is not None:
+                    errors.append(
+                        f"{prefix}: memory_percent and concurrency cannot be set with auto_wlm."
+                    )
+                if q.priority is not None and q.priority not in _WLM_PRIORITIES:
+                    errors.append(
+                        f"{prefix}: priority must be one of {_WLM_PRIORITIES}, got '{q.priority}'."
+                    )
+            else:
+                if q.priority is not None:
+                    errors.append(f"{prefix}: priority requires auto_wlm.")
+                if q.concurrency is not None and not 1 <= q.concurrency <= 50:
+                    errors.append(
+                        f"{prefix}: concurrency must be between 1 and 50, got {q.concurrency}."
+                    )
+                if q.memory_percent is not None and not 1 <= q.memory_percent <= 100:
+                    errors.append(
+                        f"{prefix}: memory_percent must be between 1 and 100, got {q.memory_percent}."
+                    )
+
+            rule_names = [r.name for r in q.rules]
+            if len(set(rule_names)) != len(rule_names):
+                errors.append(f"{prefix}: rule names must be unique: {rule_names}.")
+            rule_count += len(q.rules)
+            for rule in q.rules:
+                rule_prefix = f"{prefix}, rule '{rule.name}'"
+                if not 1 <= len(rule.predicates) <= 3:
+                    errors.append(f"{rule_prefix}: needs between 1 and 3 predicates.")
+                for predicate in rule.predicates:
+                    if len(predicate) != 3:
+                        errors.append(
+                            f"{rule_prefix}: predicate {predicate} must be (metric, operator, value)."
+                        )
+                        continue
+                    metric, operator, _ = predicate
+                    if metric not in _QMR_METRICS:
+                        errors.append(f"{rule_prefix}: unknown metric '{metric}'.")
+                    if operator not in [">", "<", "="]:
+                        errors.append(f"{rule_prefix}: unknown operator '{operator}'.")
+                if rule.action == "hop" and self.auto_wlm:
+                    errors.append(f"{rule_prefix}: action 'hop' requires manual WLM.")
+                if rule.action == "change_query_priority":
+                    if not self.auto_wlm:
+                        errors.append(
+                            f"{rule_prefix}: action 'change_query_priority' requires auto_wlm."
+                        )
+                    if rule.action_priority not in _WLM_PRIORITIES:
+                        errors.append(
+                            f"{rule_prefix}: action_priority must be one of {_WLM_PRIORITIES}."
+                        )
+
+        if rule_count > 25:
+            errors.append(
+                f"At most 25 query monitoring rules are allowed, got {rule_count}."
+            )
+
+        if not self.auto_wlm:
+            memory = sum(q.memory_percent or 0 for q in self.queues)
+            if memory > 100:
+                errors.append(
+                    f"Total memory_percent must not exceed 100, got {memory}."
+                )
+            concurrency = sum(q.concurrency or 5 for q in self.queues)
+            if concurrency > 50:
+                errors.append(
+                    f"Total concurrency of manual queues must not exceed 50, got {concurrency}."
+                )
+        return errors
+
+    def wlm_json(self) -> str:
+        queues = [q.render(self.auto_wlm) for q in self.queues]
+        if self.short_query_acceleration:
+            queues.append({"short_query_queue": True})
+        return json.dumps(queues)
+
+    def render_parameters(self) -> dict:
+        return {
+            "wlm_json_configuration": self.wlm_json(),
+            "max_concurrency_scaling_clusters": str(
+                self.max_concurrency_scaling_clusters
+            ),
+            **self.parameters,
+        }
+
+
+@dataclass
+class ServerlessUsageLimit:
+    """
+    Limit on RPU hours used by a serverless workgroup per period.
+
+    See https://docs.aws.amazon.com/redshift/latest/mgmt/serverless-workgroup-max-rpu.html
+    """
+
+    rpu_hours: int
+    period: Literal["daily", "weekly", "monthly"] = "monthly"
+    breach_action: Literal["log", "emit-metric", "deactivate"] = "log"
+
+
+@dataclass
+class ServerlessCapacity:
+    """
+    Capacity settings for a serverless workgroup, typically one per stage.
+
+    base_capacity is the RPUs used for queries, max_capacity the upper bound
+    when scaling for load.
+    """
+
+    base_capacity: int = 32
+    max_capacity: Optional[int] = None
+    usage_limits: List[ServerlessUsageLimit] = field(default_factory=list)
+
+    def validate(self) -> List[str]:
+        errors = []
+        if not 8 <= self.base_capacity <= 512 or self.base_capacity % 8:
+            errors.append(
+                f"base_capacity must be a multiple of 8 between 8 and 512, got {self.base_capacity}."
+            )
+        if self.max_capacity is not None and (
+            self.max_capacity < self.base_capacity or self.max_capacity % 8
+        ):
+            errors.append(
+                "max_capacity must be a multiple of 8 and at least base_capacity, "
+                f"got {self.max_capacity}."
+            )
+        for limit in self.usage_limits:
+            if limit.rpu_hours < 1:
+                errors.append(f"Usage limit must be at least 1 RPU hour, got {limit}.")
+        return errors
+
 
 class RedshiftBase(Construct):
     def __init__(
@@ -58,6 +433,10 @@ class RedshiftBase(Construct):
         self.redshift_role.apply_removal_policy(cdk.RemovalPolicy.DESTROY)
         self.vpc = self._define_vpc(vpc)
 
+        # Set by subclasses, see grant_data_api()
+        self.data_api_environment: Dict[str, str] = {}
+        self.data_api_secret = None
+
         self.client_group = self.define_default_redshift_client_group()
         self.security_group = self.define_security_group(
             ingress_peers_sg=([self.client_group] + client_security_groups),
@@ -105,6 +484,56 @@ class RedshiftBase(Construct):
     #         secret_object_value=set_secret if password is not None else None)
     #     return cluster_secret
 
+    def grant_data_api(self, grantee: aws_iam.IGrantable) -> None:
+        """
+        Allow grantee to run statements through the Redshift Data API.
+        Functions also get the REDSHIFT_* environment variables read by
+        alabcdk_runtime.redshift_data.DataApi.from_env().
+        """
+        aws_iam.Grant.add_to_principal(
+            grantee=grantee,
+            actions=[
+                "redshift-data:ExecuteStatement",
+                "redshift-data:BatchExecuteStatement",
+                "redshift-data:DescribeStatement",
+                "redshift-data:GetStatementResult",
+                "redshift-data:CancelStatement",
+                "redshift:GetClusterCredentials",
+                "redshift-serverless:GetCredentials",
+            ],
+            resource_arns=["*"],
+        )
+        if self.data_api_secret is not None:
+            self.data_api_secret.grant_read(grantee)
+        if isinstance(grantee, aws_lambda.Function):
+            for key, value in self.data_api_environment.items():
+                grantee.add_environment(key, value)
+
+    def define_parameter_group(
+        self, wlm: WlmConfiguration
+    ) -> aws_redshift.CfnClusterParameterGroup:
+        errors = wlm.validate()
+        if errors:
+            raise ValueError(
+                f"{type(self).__name__}('{self.node.id}'): invalid WLM configuration: "
+                + " ".join(errors)
+            )
+
+        result = aws_redshift.CfnClusterParameterGroup(
+            self,
+            gen_name(self, "redshift-parameter-group"),
+            description=f"Parameter group for Redshift in stack {cdk.Stack.of(self).stack_name}",
+            parameter_group_family="redshift-1.0",
+            parameters=[
+                aws_redshift.CfnClusterParameterGroup.ParameterProperty(
+                    parameter_name=name, parameter_value=value
+                )
+                for (name, value) in wlm.render_parameters().items()
+            ],
+        )
+        result.apply_removal_policy(cdk.RemovalPolicy.DESTROY)
+        return result
+
     def _define_vpc(self, vpc: aws_ec2.Vpc = None):
         if vpc is not None:
             return vpc
@@ -179,8 +608,30 @@ class Redshift(RedshiftBase):
         cluster_type: Literal["single-node", "multi-node"] = "multi-node",
         number_of_nodes: int = 2,
         preferred_maintenance_window: str = "Wed:02:00-Wed:03:00",
+        wlm: WlmConfiguration = None,
+        node_type: RedshiftNodeType = None,
+        expected_data_volume_tb: float = None,
+        expected_concurrency: int = 5,
+        elastic_resize: bool = False,
+        availability_zone_relocation: bool = False,
         **kwargs,
     ):
+        """
+        Creates a provisioned Redshift cluster.
+
+        - wlm: workload management and concurrency scaling settings. If set, a
+          cluster parameter group is created and attached to the cluster.
+        - node_type: defaults to "dc2.large", or to the suggestion from
+          suggest_node_sizing() if expected_data_volume_tb is set.
+        - expected_data_volume_tb, expected_concurrency: size the cluster using
+          suggest_node_sizing(). Overrides cluster_type and number_of_nodes.
+          Changing the expectations later changes the node count, see
+          elastic_resize.
+        - elastic_resize: resize elastically instead of the classic resize
+          when number_of_nodes changes.
+        - availability_zone_relocation: let the cluster be relocated to
+          another availability zone, RA3 node types only.
+        """
         super().__init__(
             scope,
             id,
@@ -197,6 +648,25 @@ class Redshift(RedshiftBase):
             if admin_password is None
             else SecretValue.unsafe_plain_text(admin_password)
         )
+        self.sizing = None
+        if expected_data_volume_tb is not None:
+            self.sizing = suggest_node_sizing(
+                data_volume_tb=expected_data_volume_tb,
+                concurrency=expected_concurrency,
+                node_types=None if node_type is None else [node_type],
+            )
+            node_type = self.sizing.node_type
+            number_of_nodes = self.sizing.number_of_nodes
+            cluster_type = self.sizing.cluster_type
+        node_type = node_type or "dc2.large"
+        validate_node_count(
+            node_type, 1 if cluster_type == "single-node" else number_of_nodes
+        )
+        if availability_zone_relocation and not _NODE_SPECS[node_type].managed_storage:
+            raise ValueError(
+                f"{type(self).__name__}('{id}'): availability_zone_relocation requires an RA3 node type, got {node_type}."
+            )
+
         type_of_cluster = (
             redshift.ClusterType.SINGLE_NODE
             if cluster_type == "single-node"
@@ -218,7 +688,7 @@ class Redshift(RedshiftBase):
             roles=[self.redshift_role],
             encrypted=True,
             encryption_key=encryption_key,
-            node_type=redshift.NodeType.DC2_LARGE,
+            node_type=redshift.NodeType[node_type.upper().replace(".", "_")],
             number_of_nodes=None if cluster_type == "single-node" else number_of_nodes,
             security_groups=[self.security_group],
             preferred_maintenance_window=preferred_maintenance_window,
@@ -226,9 +696,30 @@ class Redshift(RedshiftBase):
         self.cluster.apply_removal_policy(cdk.RemovalPolicy.DESTROY)
         encryption_key.grant_encrypt_decrypt(self.redshift_role)
 
+        self.data_api_secret = self.cluster.secret
+        self.data_api_environment = {
+            "REDSHIFT_CLUSTER_IDENTIFIER": self.cluster.cluster_name,
+            "REDSHIFT_DATABASE": db_name,
+        }
+        if self.data_api_secret is not None:
+            self.data_api_environment["REDSHIFT_SECRET_ARN"] = (
+                self.data_api_secret.secret_arn
+            )
+        else:
+            self.data_api_environment["REDSHIFT_DB_USER"] = master_username
+
         # Workaround that CDK does not set the proper KMS key ARN
         cluster_resource: aws_redshift.CfnCluster = self.cluster.node.default_child
         cluster_resource.kms_key_id = encryption_key.key_arn
+        if elastic_resize:
+            cluster_resource.classic = False
+        if availability_zone_relocation:
+            cluster_resource.availability_zone_relocation = True
+
+        self.parameter_group = None
+        if wlm is not None:
+            self.parameter_group = self.define_parameter_group(wlm)
+            cluster_resource.cluster_parameter_group_name = self.parameter_group.ref
 
 
 class RedshiftCluster(RedshiftBase):
@@ -263,13 +754,14 @@ class RedshiftCluster(RedshiftBase):
         id: str,
         *,
         vpc: aws_ec2.Vpc = None,
-        ec2_instance_type: str,
+        ec2_instance_type: RedshiftNodeType,
         cluster_type: str,
         number_of_nodes: int,
         db_name: str,
         master_username: str,
         admin_password: str = None,
         encryption_key: kms.IKey = None,
+        wlm: WlmConfiguration = None,
         **kwargs,
     ):
         super().__init__(
@@ -281,6 +773,11 @@ class RedshiftCluster(RedshiftBase):
             **kwargs,
         )
 
+        validate_node_count(
+            ec2_instance_type, 1 if cluster_type == "single-node" else number_of_nodes
+        )
+        self.parameter_group = None if wlm is None else self.define_parameter_group(wlm)
+
         # Subnet Group for Cluster
         redshift_cluster_subnet_group = aws_redshift.CfnClusterSubnetGroup(
             self,
@@ -307,6 +804,9 @@ class RedshiftCluster(RedshiftBase):
             iam_roles=[self.redshift_role.role_arn],
             node_type=ec2_instance_type,
             cluster_subnet_group_name=redshift_cluster_subnet_group.ref,
+            cluster_parameter_group_name=(
+                None if self.parameter_group is None else self.parameter_group.ref
+            ),
             vpc_security_group_ids=[self.security_group.security_group_id],
             publicly_accessible=True,
             encrypted=encryption_key is not None,
@@ -314,6 +814,12 @@ class RedshiftCluster(RedshiftBase):
         )
         self.cluster.apply_removal_policy(cdk.RemovalPolicy.DESTROY)
 
+        self.data_api_environment = {
+            "REDSHIFT_CLUSTER_IDENTIFIER": self.cluster.ref,
+            "REDSHIFT_DATABASE": db_name,
+            "REDSHIFT_DB_USER": master_username,
+        }
+
 
 class RedshiftServerless(RedshiftBase):
     def define_vpc(self):
@@ -347,9 +853,29 @@ class RedshiftServerless(RedshiftBase):
         aws_region: str,
         admin_password: str = None,
         base_capacity: int = 32,
+        max_capacity: int = None,
+        usage_limits: List[ServerlessUsageLimit] = None,
+        capacity_profiles: Dict[str, ServerlessCapacity] = None,
         max_query_execution_time: int = 300,
+        config_parameters: Dict[str, str] = None,
+        enhanced_vpc_routing: bool = False,
+        namespace_name: str = None,
+        workgroup_name: str = None,
         **kwargs,
     ):
+        """
+        Creates a Redshift Serverless namespace and workgroup.
+
+        - base_capacity, max_capacity, usage_limits: capacity settings, used
+          unless capacity_profiles has an entry for the stack's stage.
+        - capacity_profiles: ServerlessCapacity keyed by stage, e.g.
+          {"DEV": ServerlessCapacity(base_capacity=8), "PROD": ServerlessCapacity(base_capacity=64)}
+        - config_parameters: additional workgroup parameters, e.g.
+          {"enable_result_cache_for_session": "true", "query_group": "bi"}
+        - namespace_name, workgroup_name: default to gen_name(scope, f"{id}-namespace")
+          and gen_name(scope, f"{id}-workgroup") so several workgroups can
+          coexist in an account.
+        """
         super().__init__(
             scope,
             id,
@@ -359,10 +885,29 @@ class RedshiftServerless(RedshiftBase):
             **kwargs,
         )
 
+        stage = getattr(cdk.Stack.of(self), "stage", None)
+        self.capacity = (capacity_profiles or {}).get(stage) or ServerlessCapacity(
+            base_capacity=base_capacity,
+            max_capacity=max_capacity,
+            usage_limits=usage_limits or [],
+        )
+        errors = self.capacity.validate()
+        if errors:
+            raise ValueError(
+                f"{type(self).__name__}('{id}'): invalid capacity: " + " ".join(errors)
+            )
+
+        namespace_name = namespace_name or gen_name(
+            scope, f"{id}-namespace", all_lower=True, clean_string=True
+        )
+        workgroup_name = workgroup_name or gen_name(
+            scope, f"{id}-workgroup", all_lower=True, clean_string=True
+        )
+
         self.redshift_namespace = aws_redshiftserverless.CfnNamespace(
             self,
             gen_name(self, "DataLakeRedshiftServerlessNamespace"),
-            namespace_name="data-lake-namespace",
+            namespace_name=namespace_name,
             admin_username=master_username,
             admin_user_password=admin_password,
             db_name=db_name,
@@ -373,24 +918,84 @@ class RedshiftServerless(RedshiftBase):
         isolated_subnets = [subnet.subnet_id for subnet in self.vpc.isolated_subnets]
 
         # Set max query execution time. Default to 300 sec
-        config_parameter_property = (
-            aws_redshiftserverless.CfnWorkgroup.ConfigParameterProperty(
-                parameter_key="max_query_execution_time",
-                parameter_value=str(max_query_execution_time),
-            )
-        )
+        parameters = {
+            "max_query_execution_time": str(max_query_execution_time),
+            **(config_parameters or {}),
+        }
 
         self.redshift_workgroup = aws_redshiftserverless.CfnWorkgroup(
             self,
             gen_name(self, "DataLakeRedshiftServerlessWorkgroup"),
-            workgroup_name="data-lake-workgroup",
-            base_capacity=base_capacity,
-            enhanced_vpc_routing=False,
+            workgroup_name=workgroup_name,
+            base_capacity=self.capacity.base_capacity,
+            enhanced_vpc_routing=enhanced_vpc_routing,
             namespace_name=self.redshift_namespace.namespace_name,
             publicly_accessible=False,
             security_group_ids=[self.security_group.security_group_id],
             subnet_ids=isolated_subnets,
-            config_parameters=[config_parameter_property],
+            config_parameters=[
+                aws_redshiftserverless.CfnWorkgroup.ConfigParameterProperty(
+                    parameter_key=key, parameter_value=value
+                )
+                for (key, value) in parameters.items()
+            ],
         )
+        if self.capacity.max_capacity is not None:
+            # Not yet modelled by CfnWorkgroup in our CDK version
+            self.redshift_workgroup.add_property_override(
+                "MaxCapacity", self.capacity.max_capacity
+            )
 
         self.redshift_workgroup.add_depends_on(self.redshift_namespace)
+        self.data_api_environment = {
+            "REDSHIFT_WORKGROUP_NAME": workgroup_name,
+            "REDSHIFT_DATABASE": db_name,
+        }
+
+        for i, limit in enumerate(self.capacity.usage_limits):
+            self.define_usage_limit(f"usage-limit-{i}", limit)
+
+    def define_usage_limit(
+        self, id: str, limit: ServerlessUsageLimit
+    ) -> custom_resources.AwsCustomResource:
+        # CloudFormation has no resource for serverless usage limits
+        workgroup_arn = self.redshift_workgroup.attr_workgroup_workgroup_arn
+        result = custom_resources.AwsCustomResource(
+            self,
+            gen_name(self, id),
+            on_create=custom_resources.AwsSdkCall(
+                service="RedshiftServerless",
+                action="createUsageLimit",
+                parameters={
+                    "resourceArn": workgroup_arn,
+                    "usageType": "serverless-compute",
+                    "amount": limit.rpu_hours,
+                    "period": limit.period,
+                    "breachAction": limit.breach_action,
+                },
+                physical_resource_id=custom_resources.PhysicalResourceId.from_response(
+                    "usageLimit.usageLimitId"
+                ),
+            ),
+            on_update=custom_resources.AwsSdkCall(
+                service="RedshiftServerless",
+                action="updateUsageLimit",
+                parameters={
+                    "usageLimitId": custom_resources.PhysicalResourceIdReference(),
+                    "amount": limit.rpu_hours,
+                    "breachAction": limit.breach_action,
+                },
+            ),
+            on_delete=custom_resources.AwsSdkCall(
+                service="RedshiftServerless",
+                action="deleteUsageLimit",
+                parameters={
+                    "usageLimitId": custom_resources.PhysicalResourceIdReference()
+                },
+            ),
+            policy=custom_resources.AwsCustomResourcePolicy.from_sdk_calls(
+                resources=custom_resources.AwsCustomResourcePolicy.ANY_RESOURCE
+            ),
+        )
+        result.node.add_dependency(self.redshift_workgroup)
+        return result
@@ -0,0 +1,109 @@
+from constructs import Construct
+from aws_cdk import (
+    Duration,
+    aws_s3,
+    aws_s3_notifications,
+)
+
+from .lambdas import Function, runtime_code
+from .redshift import RedshiftBase
+from .sqs import Queue
+from .utils import get_params, filter_kwargs
+
+
+class RedshiftIngestion(Construct):
+    """
+    Loads objects written to a bucket prefix into a Redshift table.
+
+    Object notifications are buffered in SQS and handled in micro batches by
+    a loader function (alabcdk_runtime.redshift_copy), which writes a
+    manifest per batch and runs one COPY per manifest through the Data API.
+    Loaded objects are logged in Redshift, so redelivered messages are not
+    loaded twice.
+    """
+
+    def __init__(
+        self,
+        scope: Construct,
+        id: str,
+        *,
+        redshift: RedshiftBase,
+        bucket: aws_s3.IBucket,
+        table: str,
+        prefix: str = None,
+        suffix: str = None,
+        copy_options: str = "FORMAT AS JSON 'auto'",
+        batch_size: int = 1000,
+        max_batching_window: Duration = Duration.minutes(1),
+        max_batch_bytes: int = 1024**3,
+        max_batch_files: int = 200,
+        max_concurrency: int = 2,
+        manifest_prefix: str = "_manifests/",
+        log_table: str = "public.alabcdk_copy_log",
+        **kwargs,
+    ) -> None:
+        """
+        - redshift: cluster or workgroup to load into.
+        - bucket, prefix, suffix: objects to load. Either prefix or suffix must
+          exclude manifest_prefix, where the manifests are written.
+        - table, copy_options: COPY target and format options, e.g.
+          "FORMAT AS PARQUET" or "FORMAT AS CSV GZIP".
+        - batch_size, max_batching_window: how many notifications, and for how
+          long, SQS collects before invoking the loader.
+        - max_batch_bytes, max_batch_files: limits for a single COPY.
+        - max_concurrency: number of concurrent loaders, i.e. concurrent COPYs.
+
+        Arguments prefixed with lambda_ are sent to the loader Function and
+        arguments prefixed with queue_ to the Queue.
+        """
+        super().__init__(scope, id)
+        kwargs = get_params(locals())
+        lambda_kwargs = filter_kwargs(kwargs, "lambda_")
+        queue_kwargs = filter_kwargs(kwargs, "queue_")
+
+        if suffix is None and manifest_prefix.startswith(prefix or ""):
+            raise ValueError(
+                f"{type(self).__name__}('{id}'): prefix '{prefix}' includes manifest_prefix "
+                f"'{manifest_prefix}', set a different prefix or a suffix."
+            )
+
+        lambda_kwargs.setdefault("timeout", Duration.minutes(5))
+        self.handler = Function(
+            self,
+            f"{id}_loader",
+            code=runtime_code(),
+            handler="alabcdk_runtime.redshift_copy.handler",
+            **lambda_kwargs,
+        )
+        for key, value in {
+            "COPY_TABLE": table,
+            "COPY_OPTIONS": copy_options,
+            "COPY_IAM_ROLE_ARN": redshift.redshift_role.role_arn,
+            "COPY_LOG_TABLE": log_table,
+            "MANIFEST_BUCKET": bucket.bucket_name,
+            "MANIFEST_PREFIX": manifest_prefix,
+            "MAX_BATCH_BYTES": str(max_batch_bytes),
+            "MAX_BATCH_FILES": str(max_batch_files),
+        }.items():
+            self.handler.add_environment(key, value)
+
+        # Redshift reads the manifests with its own role
+        bucket.grant_read(redshift.redshift_role, f"{manifest_prefix}*")
+        bucket.grant_read(self.handler)
+        bucket.grant_put(self.handler, f"{manifest_prefix}*")
+        redshift.grant_data_api(self.handler)
+
+        queue_kwargs.setdefault("dlq_max_receive_count", 5)
+        self.queue = Queue(self, f"{id}_queue", **queue_kwargs)
+
+        bucket.add_event_notification(
+            aws_s3.EventType.OBJECT_CREATED,
+            aws_s3_notifications.SqsDestination(self.queue),
+            aws_s3.NotificationKeyFilter(prefix=prefix, suffix=suffix),
+        )
+        self.queue.add_consumer(
+            self.handler,
+            batch_size=batch_size,
+            max_batching_window=max_batching_window,
+            max_concurrency=max_concurrency,
+        )
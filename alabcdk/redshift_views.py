@@ -0,0 +1,142 @@
+from dataclasses import dataclass, field
+from typing import List, Literal, Sequence
+from constructs import Construct
+from aws_cdk import (
+    Duration,
+    aws_events,
+    aws_events_targets,
+    aws_stepfunctions as sfn,
+    aws_stepfunctions_tasks as sfn_tasks,
+)
+from alabcdk_runtime.redshift_mv import refresh_levels
+
+from .lambdas import Function, runtime_code
+from .redshift import RedshiftBase
+from .utils import gen_name, get_params, filter_kwargs
+
+
+@dataclass
+class MaterializedView:
+    """
+    A materialized view, named "<schema>.<name>".
+
+    - query: the view definition, used by create_statement(). The views
+      are not created by alabcdk, see MaterializedViewRefresher.
+    - depends_on: materialized views this view reads from. They are
+      refreshed first.
+    - refresh: "scheduled" views are refreshed by MaterializedViewRefresher,
+      "auto" views are refreshed (incrementally where possible) by Redshift
+      itself.
+    """
+
+    name: str
+    query: str = None
+    depends_on: List[str] = field(default_factory=list)
+    refresh: Literal["scheduled", "auto"] = "scheduled"
+
+    def create_statement(self) -> str:
+        auto_refresh = "YES" if self.refresh == "auto" else "NO"
+        return f"CREATE MATERIALIZED VIEW {self.name} AUTO REFRESH {auto_refresh} AS {self.query}"
+
+
+class MaterializedViewRefresher(Construct):
+    """
+    Refreshes materialized views on a schedule.
+
+    An EventBridge rule starts a state machine that refreshes the views in
+    dependency order, running independent views in parallel. Views whose
+    base tables have not changed since the last refresh are skipped.
+
+    The views must already exist: they are not created by the construct.
+    Create them with the statements from create_statements(), e.g. in the
+    migrations of the database.
+    """
+
+    def __init__(
+        self,
+        scope: Construct,
+        id: str,
+        *,
+        redshift: RedshiftBase,
+        views: Sequence[MaterializedView],
+        schedule: aws_events.Schedule = aws_events.Schedule.rate(Duration.hours(1)),
+        **kwargs,
+    ) -> None:
+        """
+        - redshift: cluster or workgroup owning the views.
+        - views: all views, including "auto" views, to get dependencies right.
+        - schedule: when to refresh.
+
+        Arguments prefixed with lambda_ are sent to the refresh Function.
+        """
+        super().__init__(scope, id)
+        kwargs = get_params(locals())
+        lambda_kwargs = filter_kwargs(kwargs, "lambda_")
+
+        self.views = list(views)
+        # Auto views are refreshed by Redshift, but order the views around them
+        self.levels = refresh_levels(
+            {v.name: v.depends_on for v in self.views},
+            skip={v.name for v in self.views if v.refresh == "auto"},
+        )
+
+        lambda_kwargs.setdefault("timeout", Duration.minutes(15))
+        self.handler = Function(
+            self,
+            f"{id}_refresh",
+            code=runtime_code(),
+            handler="alabcdk_runtime.redshift_mv.handler",
+            **lambda_kwargs,
+        )
+        redshift.grant_data_api(self.handler)
+
+        definition = sfn.Pass(self, "Start")
+        for i, level in enumerate(self.levels):
+            step = sfn.Parallel(self, f"Level {i}", result_path=sfn.JsonPath.DISCARD)
+            for view in level:
+                step.branch(self._refresh_task(view))
+            definition = definition.next(step)
+
+        self.state_machine = sfn.StateMachine(
+            self,
+            f"{id}_statemachine",
+            state_machine_name=gen_name(scope, id),
+            definition_body=sfn.DefinitionBody.from_chainable(definition),
+        )
+        self.rule = aws_events.Rule(
+            self,
+            f"{id}_schedule",
+            rule_name=gen_name(scope, f"{id}_schedule"),
+            schedule=schedule,
+            targets=[aws_events_targets.SfnStateMachine(self.state_machine)],
+        )
+
+    def _refresh_task(self, view: str) -> sfn_tasks.LambdaInvoke:
+        task = sfn_tasks.LambdaInvoke(
+            self,
+            f"Refresh {view}",
+            lambda_function=self.handler,
+            payload=sfn.TaskInput.from_object({"view": view}),
+            payload_response_only=True,
+        )
+        task.add_retry(
+            errors=["States.ALL"],
+            interval=Duration.seconds(30),
+            max_attempts=2,
+            backoff_rate=2,
+        )
+        return task
+
+    def create_statements(self) -> List[str]:
+        """
+        CREATE statements for all views with a query, in dependency order,
+        to be run by the caller before the first refresh.
+        """
+        by_name = {v.name: v for v in self.views}
+        levels = refresh_levels({v.name: v.depends_on for v in self.views})
+        return [
+            by_name[name].create_statement()
+            for level in levels
+            for name in level
+            if by_name[name].query
+        ]
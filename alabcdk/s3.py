@@ -1,13 +1,93 @@
-from typing import Sequence
+import json
+from typing import List, Literal, Sequence
 from .utils import (
+    filter_kwargs,
     gen_name,
     get_params,
     remove_params,
     stage_based_removal_policy,
+    stage_based_noncurrent_version_expiration,
     generate_output,
 )
+from .lambdas import add_runtime_layer
+from alabcdk_runtime.s3_keys import KeyScheme
 from constructs import Construct
-from aws_cdk import aws_s3, aws_iam, aws_lambda
+from aws_cdk import (
+    Duration,
+    aws_events,
+    aws_events_targets,
+    aws_s3,
+    aws_s3_notifications,
+    aws_iam,
+    aws_lambda,
+)
+
+LifecycleProfile = Literal["hot", "warm", "archive"]
+EventTransport = Literal["sqs", "eventbridge"]
+# detail-type of the EventBridge events matching S3 notification types
+_event_type_to_detail_type = {
+    aws_s3.EventType.OBJECT_CREATED: "Object Created",
+    aws_s3.EventType.OBJECT_REMOVED: "Object Deleted",
+    aws_s3.EventType.OBJECT_RESTORE_COMPLETED: "Object Restore Completed",
+}
+_ABORT_INCOMPLETE_MULTIPART_UPLOAD_AFTER = Duration.days(7)
+
+
+def lifecycle_rules(
+    scope: Construct, profile: LifecycleProfile
+) -> List[aws_s3.LifecycleRule]:
+    """
+    Lifecycle rules for a profile:
+    - hot: data read often, kept in STANDARD.
+    - warm: data with unknown or changing access, moved to INTELLIGENT_TIERING.
+    - archive: data rarely read, moved to INTELLIGENT_TIERING, with the
+      archive tiers enabled by intelligent_tiering_configurations().
+
+    All profiles abort incomplete multipart uploads after 7 days and expire
+    noncurrent versions after stage_based_noncurrent_version_expiration().
+    """
+    if profile not in ("hot", "warm", "archive"):
+        raise ValueError(f"Unknown lifecycle profile: {profile}")
+    rules = [
+        aws_s3.LifecycleRule(
+            id="cleanup",
+            abort_incomplete_multipart_upload_after=_ABORT_INCOMPLETE_MULTIPART_UPLOAD_AFTER,
+            noncurrent_version_expiration=stage_based_noncurrent_version_expiration(
+                scope
+            ),
+        )
+    ]
+    if profile in ("warm", "archive"):
+        rules.append(
+            aws_s3.LifecycleRule(
+                id=f"{profile}-tiering",
+                transitions=[
+                    aws_s3.Transition(
+                        storage_class=aws_s3.StorageClass.INTELLIGENT_TIERING,
+                        transition_after=Duration.days(0),
+                    )
+                ],
+            )
+        )
+    return rules
+
+
+def intelligent_tiering_configurations(
+    profile: LifecycleProfile,
+) -> List[aws_s3.IntelligentTieringConfiguration]:
+    """
+    Intelligent-Tiering configurations for a profile. Only archive opts in to
+    the archive tiers, since restoring from them takes hours.
+    """
+    if profile != "archive":
+        return []
+    return [
+        aws_s3.IntelligentTieringConfiguration(
+            name="archive",
+            archive_access_tier_time=Duration.days(90),
+            deep_archive_access_tier_time=Duration.days(180),
+        )
+    ]
 
 
 class Bucket(aws_s3.Bucket):
@@ -16,6 +96,10 @@ class Bucket(aws_s3.Bucket):
             grantfunc(grantee)
             if isinstance(grantee, aws_lambda.Function):
                 grantee.add_environment(env_var_name, self.bucket_name)
+                if self.key_scheme is not None:
+                    grantee.add_environment(
+                        f"{env_var_name}_KEY_SCHEME", self.key_scheme.to_json()
+                    )
 
     def __init__(
         self,
@@ -27,7 +111,13 @@ class Bucket(aws_s3.Bucket):
         writers: Sequence[aws_iam.IGrantable] = None,
         readers_writers: Sequence[aws_iam.IGrantable] = None,
         env_var_name: str = None,
-        **kwargs
+        lifecycle_profile: LifecycleProfile = None,
+        key_scheme: KeyScheme = None,
+        inventory: bool = False,
+        inventory_format: aws_s3.InventoryFormat = aws_s3.InventoryFormat.PARQUET,
+        inventory_frequency: aws_s3.InventoryFrequency = aws_s3.InventoryFrequency.DAILY,
+        inventory_bucket: aws_s3.IBucket = None,
+        **kwargs,
     ):
         """
         Creates an S3 bucket, using some sensible defaults for security.
@@ -36,6 +126,16 @@ class Bucket(aws_s3.Bucket):
         for a detailed description of parameters.
 
         - :param bucket_name: defaults to gen_name(scope, id) if not set
+        - :param lifecycle_profile: "hot", "warm" or "archive", see lifecycle_rules().
+          The rules and Intelligent-Tiering configurations of the profile are
+          added to lifecycle_rules and intelligent_tiering_configurations.
+        - :param key_scheme: partitioned key layout, see alabcdk_runtime.s3_keys,
+          set in "{env_var_name}_KEY_SCHEME" of readers and writers, which
+          also get runtime_layer() to build keys and enumerate prefixes.
+        - :param inventory: deliver an S3 Inventory report of the current
+          objects, see define_inventory(). Readers get read access to it and
+          its location in "{env_var_name}_INVENTORY", for
+          alabcdk_runtime.s3_inventory.InventoryReader.
         """
         kwargs = get_params(locals())
 
@@ -46,11 +146,42 @@ class Bucket(aws_s3.Bucket):
 
         kwargs.setdefault("bucket_name", bucket_name)
         kwargs.setdefault("removal_policy", stage_based_removal_policy(scope))
-        remove_params(kwargs, ["env_var_name", "readers", "writers", "readers_writers"])
+        remove_params(
+            kwargs,
+            [
+                "env_var_name",
+                "readers",
+                "writers",
+                "readers_writers",
+                "lifecycle_profile",
+                "key_scheme",
+                "inventory",
+                "inventory_format",
+                "inventory_frequency",
+                "inventory_bucket",
+            ],
+        )
+        if lifecycle_profile:
+            kwargs["lifecycle_rules"] = [
+                *(kwargs.get("lifecycle_rules") or []),
+                *lifecycle_rules(scope, lifecycle_profile),
+            ]
+            kwargs["intelligent_tiering_configurations"] = [
+                *(kwargs.get("intelligent_tiering_configurations") or []),
+                *intelligent_tiering_configurations(lifecycle_profile),
+            ]
 
         super().__init__(scope, id, **kwargs)
         env_var_name = env_var_name or id
         generate_output(self, env_var_name, self.bucket_name)
+        self.key_scheme = key_scheme
+        if key_scheme is not None:
+            for grantee in [
+                *(readers or []),
+                *(writers or []),
+                *(readers_writers or []),
+            ]:
+                add_runtime_layer(grantee)
 
         self.grant_access(
             grantees=readers or [], grantfunc=self.grant_read, env_var_name=env_var_name
@@ -65,3 +196,205 @@ class Bucket(aws_s3.Bucket):
             grantfunc=self.grant_read_write,
             env_var_name=env_var_name,
         )
+
+        self.inventory_bucket: aws_s3.IBucket = None
+        if inventory:
+            self.define_inventory(
+                format=inventory_format,
+                frequency=inventory_frequency,
+                destination=inventory_bucket,
+            )
+            self.grant_inventory_read(
+                [*(readers or []), *(readers_writers or [])], env_var_name
+            )
+
+    def define_inventory(
+        self,
+        *,
+        format: aws_s3.InventoryFormat = aws_s3.InventoryFormat.PARQUET,
+        frequency: aws_s3.InventoryFrequency = aws_s3.InventoryFrequency.DAILY,
+        destination: aws_s3.IBucket = None,
+        prefix: str = "inventory",
+        inventory_id: str = "objects",
+    ) -> aws_s3.IBucket:
+        """
+        Deliver an inventory of the current objects, with size, storage class
+        and modification date, to destination. A bucket "{id}_inventory",
+        expiring reports after 30 days, is created if destination is not given.
+
+        Reading the columnar (PARQUET or ORC) report is a bulk read, where
+        listing millions of keys with ListObjectsV2 takes hours.
+        """
+        if destination is None:
+            destination = Bucket(
+                self.stack,
+                f"{self.node.id}_inventory",
+                lifecycle_rules=[aws_s3.LifecycleRule(expiration=Duration.days(30))],
+            )
+        self.add_inventory(
+            destination=aws_s3.InventoryDestination(bucket=destination, prefix=prefix),
+            format=format,
+            frequency=frequency,
+            inventory_id=inventory_id,
+            include_object_versions=aws_s3.InventoryObjectVersion.CURRENT,
+            optional_fields=["Size", "LastModifiedDate", "StorageClass", "ETag"],
+        )
+        self.inventory_bucket = destination
+        # Where S3 delivers the reports, see the s3_inventory module
+        self.inventory_location = {
+            "bucket": destination.bucket_name,
+            "prefix": f"{prefix}/{self.bucket_name}/{inventory_id}/",
+        }
+        return destination
+
+    def grant_inventory_read(
+        self, grantees: Sequence[aws_iam.IGrantable], env_var_name: str
+    ) -> None:
+        for grantee in grantees:
+            self.inventory_bucket.grant_read(grantee)
+            if isinstance(grantee, aws_lambda.Function):
+                grantee.add_environment(
+                    f"{env_var_name}_INVENTORY", json.dumps(self.inventory_location)
+                )
+                add_runtime_layer(grantee)
+
+    def add_event_pipeline(
+        self,
+        id: str,
+        handler: aws_lambda.IFunction,
+        *,
+        transport: EventTransport = "sqs",
+        events: Sequence[aws_s3.EventType] = (aws_s3.EventType.OBJECT_CREATED,),
+        prefix: str = None,
+        suffix: str = None,
+        batch_size: int = 100,
+        max_batching_window: Duration = Duration.seconds(30),
+        max_concurrency: int = None,
+        **kwargs,
+    ):
+        """
+        Invoke handler with batches of object events, instead of once per object.
+
+        Events are buffered in a Queue "{bucket id}_{id}", consumed by handler
+        with batch_size and max_batching_window, see Queue.add_consumer().
+        Parse the events with alabcdk_runtime.s3_events, which handles both
+        transports, and use group_keys_by_prefix() to process objects per prefix.
+
+        - transport: "sqs" sends S3 notifications directly to the queue.
+          "eventbridge" enables EventBridge on the bucket and routes the events
+          through a rule, which allows several pipelines with overlapping
+          filters on the same bucket, something S3 notifications do not.
+        - events: event types to send. Only OBJECT_CREATED, OBJECT_REMOVED and
+          OBJECT_RESTORE_COMPLETED are supported by "eventbridge".
+        - prefix, suffix: filter on the object key.
+
+        handler is granted read access to the filtered objects, and gets runtime_layer().
+        Arguments prefixed with queue_ are sent to the Queue, and dlq_max_receive_count
+        defaults to 5. Returns the Queue.
+        """
+        # Imported here, since sqs imports this module
+        from .sqs import Queue
+
+        queue_kwargs = filter_kwargs(kwargs, "queue_")
+        queue_kwargs.setdefault("dlq_max_receive_count", 5)
+        queue = Queue(self, f"{self.node.id}_{id}", **queue_kwargs)
+
+        if transport == "sqs":
+            for event in events:
+                self.add_event_notification(
+                    event,
+                    aws_s3_notifications.SqsDestination(queue),
+                    aws_s3.NotificationKeyFilter(prefix=prefix, suffix=suffix),
+                )
+        elif transport == "eventbridge":
+            unsupported = [e for e in events if e not in _event_type_to_detail_type]
+            if unsupported:
+                raise ValueError(
+                    f"{type(self).__name__}('{self.node.id}'): {unsupported} not supported with EventBridge."
+                )
+            self.enable_event_bridge_notification()
+            detail = {"bucket": {"name": [self.bucket_name]}}
+            if prefix and suffix:
+                detail["object"] = {"key": [{"wildcard": f"{prefix}*{suffix}"}]}
+            elif prefix:
+                detail["object"] = {"key": [{"prefix": prefix}]}
+            elif suffix:
+                detail["object"] = {"key": [{"suffix": suffix}]}
+            aws_events.Rule(
+                self,
+                f"{id}_rule",
+                event_pattern=aws_events.EventPattern(
+                    source=["aws.s3"],
+                    detail_type=[_event_type_to_detail_type[e] for e in events],
+                    detail=detail,
+                ),
+                targets=[aws_events_targets.SqsQueue(queue)],
+            )
+        else:
+            raise ValueError(f"Unknown transport: {transport}")
+
+        self.grant_read(handler, f"{prefix or ''}*")
+        add_runtime_layer(handler)
+        queue.add_consumer(
+            handler,
+            batch_size=batch_size,
+            max_batching_window=max_batching_window,
+            max_concurrency=max_concurrency,
+        )
+        return queue
+
+
+def payload_bucket(
+    scope: Construct,
+    id: str,
+    *,
+    env_var_name: str,
+    expiration: Duration,
+    writers: Sequence[aws_iam.IGrantable] = None,
+    readers: Sequence[aws_iam.IGrantable] = None,
+) -> Bucket:
+    """
+    Creates the bucket holding offloaded message bodies for a claim-check
+    enabled Queue or Topic, see alabcdk_runtime.claim_check.
+
+    Payloads expire after expiration, which should outlive the retention
+    of the messages pointing at them. The bucket name is set in
+    env_var_name of writers and readers.
+    """
+    return Bucket(
+        scope,
+        id,
+        env_var_name=env_var_name,
+        writers=writers,
+        readers=readers,
+        lifecycle_rules=[
+            aws_s3.LifecycleRule(
+                expiration=expiration,
+                abort_incomplete_multipart_upload_after=Duration.days(1),
+            )
+        ],
+    )
+
+
+def grant_payload_access(
+    bucket: Bucket,
+    grantees: Sequence[aws_iam.IGrantable],
+    *,
+    env_var_name: str,
+    write: bool = False,
+) -> None:
+    """
+    Grant grantees access to the offloaded payloads in bucket, created by
+    payload_bucket(), and add runtime_layer() to read them. Writers may also
+    delete payloads once consumed. Does nothing if bucket is None, i.e. if
+    claim_check is not enabled.
+    """
+    if bucket is None:
+        return
+    bucket.grant_access(
+        grantees=grantees,
+        grantfunc=bucket.grant_read_write if write else bucket.grant_read,
+        env_var_name=env_var_name,
+    )
+    for grantee in grantees:
+        add_runtime_layer(grantee)
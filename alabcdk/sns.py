@@ -1,7 +1,9 @@
-from typing import Sequence, List
+from typing import Dict, Sequence, List
 from .utils import gen_name, generate_output
+from .s3 import Bucket, grant_payload_access, payload_bucket
+from .sqs import Queue
 from constructs import Construct
-from aws_cdk import aws_sns, aws_sns_subscriptions, aws_iam, aws_lambda
+from aws_cdk import Duration, aws_sns, aws_sns_subscriptions, aws_iam, aws_lambda
 
 
 class Topic(aws_sns.Topic):
@@ -10,6 +12,19 @@ class Topic(aws_sns.Topic):
             if isinstance(receiver, aws_lambda.Function):
                 receiver.add_environment(env_var_name, self.topic_arn)
 
+    def grant_payload_access(
+        self, grantees: Sequence[aws_iam.IGrantable], *, write: bool = False
+    ) -> None:
+        """
+        Grant grantees access to offloaded payloads, see s3.grant_payload_access().
+        """
+        grant_payload_access(
+            self.payload_bucket,
+            grantees,
+            env_var_name=self.payload_env_var_name,
+            write=write,
+        )
+
     def __init__(
         self,
         scope: Construct,
@@ -18,13 +33,22 @@ class Topic(aws_sns.Topic):
         env_var_name: str = None,
         subscribers: Sequence[aws_lambda.Function] = None,
         publishers: Sequence[aws_iam.IGrantable] = None,
-        **kwargs
+        claim_check: bool = False,
+        claim_check_expiration: Duration = Duration.days(14),
+        **kwargs,
     ):
         """
         Creates a Topic and optionally adds lambda subscribers.
 
         defaults:
         - topic_name - defaults to gen_name(scope, id) if not set.
+
+        - claim_check: creates the bucket "{id}_payloads" where
+          alabcdk_runtime.claim_check stores messages too large for SNS.
+          Publishers get write access, subscribers read access, and all get
+          the bucket name in "{env_var_name}_PAYLOAD_BUCKET" and runtime_layer().
+          Payloads expire after claim_check_expiration, which should outlive
+          any retries and queues of the subscribers.
         """
         kwargs.setdefault("topic_name", gen_name(scope, id))
         subscribers = subscribers or []
@@ -32,6 +56,19 @@ class Topic(aws_sns.Topic):
 
         super().__init__(scope, id, **kwargs)
         env_var_name = env_var_name or id
+        self.is_fifo = kwargs.get("fifo", False)
+
+        self.payload_bucket: Bucket = None
+        self.payload_env_var_name = f"{env_var_name}_PAYLOAD_BUCKET"
+        if claim_check:
+            self.payload_bucket = payload_bucket(
+                scope,
+                f"{id}_payloads",
+                env_var_name=self.payload_env_var_name,
+                expiration=claim_check_expiration,
+            )
+            self.grant_payload_access(publishers, write=True)
+            self.grant_payload_access(subscribers)
         for fn in subscribers:
             self.add_subscription(aws_sns_subscriptions.LambdaSubscription(fn))
         for grantee in publishers:
@@ -40,3 +77,55 @@ class Topic(aws_sns.Topic):
         self.update_environment(env_var_name, subscribers)
         self.update_environment(env_var_name, publishers)
         generate_output(self, env_var_name, self.topic_arn)
+
+    def add_queue_subscriber(
+        self,
+        id: str,
+        handler: aws_lambda.IFunction = None,
+        *,
+        filter_policy: Dict[str, aws_sns.SubscriptionFilter] = None,
+        filter_policy_with_message_body: Dict[str, aws_sns.FilterOrPolicy] = None,
+        raw_message_delivery: bool = True,
+        **kwargs,
+    ) -> Queue:
+        """
+        Subscribe a new Queue "{topic id}_{id}" to the topic, optionally
+        consumed in batches by handler.
+
+        Messages are buffered in the queue, so handler is invoked with batches
+        instead of once per message. Filtering is done by SNS, so the queue
+        only receives, and handler is only invoked for, matching messages.
+
+        - filter_policy: filter on message attributes.
+        - filter_policy_with_message_body: filter on the (JSON) message body.
+          Only one of the filter policies may be given.
+        - raw_message_delivery: deliver the message as is, with message
+          attributes as SQS message attributes, instead of the SNS envelope.
+
+        Other arguments are sent to Queue, e.g. dlq_max_receive_count or
+        consumer_batch_size and consumer_max_batching_window to tune
+        batching for this subscriber. A FIFO topic gets a FIFO queue.
+        """
+        if filter_policy and filter_policy_with_message_body:
+            raise ValueError(
+                f"{type(self).__name__}('{self.node.id}'): only one of filter_policy and filter_policy_with_message_body may be set."
+            )
+        if self.is_fifo:
+            kwargs.setdefault("fifo", True)
+        queue = Queue(
+            self.node.scope,
+            f"{self.node.id}_{id}",
+            handlers=[handler] if handler else None,
+            **kwargs,
+        )
+        self.add_subscription(
+            aws_sns_subscriptions.SqsSubscription(
+                queue,
+                raw_message_delivery=raw_message_delivery,
+                filter_policy=filter_policy,
+                filter_policy_with_message_body=filter_policy_with_message_body,
+            )
+        )
+        if handler:
+            self.grant_payload_access([handler])
+        return queue
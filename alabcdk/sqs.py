@@ -1,7 +1,17 @@
 from typing import Sequence
-from .utils import gen_name
+from .utils import gen_name, filter_kwargs, generate_output
+from .s3 import Bucket, grant_payload_access, payload_bucket
 from constructs import Construct
-from aws_cdk import aws_iam, aws_lambda, aws_sqs
+from aws_cdk import (
+    Duration,
+    aws_iam,
+    aws_lambda,
+    aws_lambda_event_sources,
+    aws_sqs,
+)
+
+# Maximum visibility timeout allowed by SQS
+_MAX_VISIBILITY_TIMEOUT = 12 * 60 * 60
 
 
 class Queue(aws_sqs.Queue):
@@ -9,7 +19,7 @@ class Queue(aws_sqs.Queue):
         for grantee in grantees:
             grantfunc(grantee)
             if isinstance(grantee, aws_lambda.Function):
-                grantee.add_environment(env_var_name, self.table_name)
+                grantee.add_environment(env_var_name, self.queue_url)
 
     def __init__(
         self,
@@ -18,17 +28,80 @@ class Queue(aws_sqs.Queue):
         senders: Sequence[aws_iam.IGrantable] = None,
         consumers: Sequence[aws_iam.IGrantable] = None,
         env_var_name: str = None,
-        **kwargs
+        *,
+        handlers: Sequence[aws_lambda.IFunction] = None,
+        dlq_max_receive_count: int = None,
+        high_throughput_fifo: bool = True,
+        claim_check: bool = False,
+        claim_check_expiration: Duration = Duration.days(14),
+        **kwargs,
     ):
         """
         Creates a Queue
 
         defaults:
         - queue_name - defaults to gen_name(scope, id) if not set.
+        - receive_message_wait_time - defaults to 20 seconds (long polling).
+
+        - handlers: functions consuming the queue, see add_consumer().
+          Arguments prefixed with consumer_ are sent to add_consumer().
+        - dlq_max_receive_count: if set (and dead_letter_queue is not), messages
+          failing this many times are moved to a new queue "{id}_dlq", from
+          where they can be redriven.
+        - fifo: creates a FIFO queue, named gen_name(scope, id) + ".fifo".
+        - high_throughput_fifo: for FIFO queues, deduplicate and limit
+          throughput per message group instead of per queue, which lifts the
+          default 300 TPS limit. Spread messages over many message groups to
+          benefit, as consumers scale out by message group.
+          Combine with content_based_deduplication to deduplicate on the body.
+        - claim_check: creates the bucket "{id}_payloads" where
+          alabcdk_runtime.claim_check stores bodies too large for SQS.
+          Senders get write access, consumers and handlers read access, and
+          all get the bucket name in "{env_var_name}_PAYLOAD_BUCKET" and
+          runtime_layer(). Payloads expire after claim_check_expiration,
+          which should be at least the retention period of the queue.
         """
-        kwargs.setdefault("queue_name", gen_name(scope, id))
+        consumer_kwargs = filter_kwargs(kwargs, "consumer_")
+        kwargs = {k: v for (k, v) in kwargs.items() if not k.startswith("consumer_")}
+        fifo = kwargs.get("fifo", False)
+        kwargs.setdefault("queue_name", gen_name(scope, id) + (".fifo" if fifo else ""))
+        kwargs.setdefault("receive_message_wait_time", Duration.seconds(20))
+        if fifo and high_throughput_fifo:
+            kwargs.setdefault(
+                "deduplication_scope", aws_sqs.DeduplicationScope.MESSAGE_GROUP
+            )
+            kwargs.setdefault(
+                "fifo_throughput_limit",
+                aws_sqs.FifoThroughputLimit.PER_MESSAGE_GROUP_ID,
+            )
+
+        if dlq_max_receive_count is not None and "dead_letter_queue" not in kwargs:
+            # The dead letter queue of a FIFO queue must be FIFO as well
+            kwargs["dead_letter_queue"] = aws_sqs.DeadLetterQueue(
+                max_receive_count=dlq_max_receive_count,
+                queue=Queue(
+                    scope,
+                    f"{id}_dlq",
+                    retention_period=Duration.days(14),
+                    fifo=fifo or None,
+                ),
+            )
 
         super().__init__(scope, id, **kwargs)
+        env_var_name = env_var_name or id
+        generate_output(self, env_var_name, self.queue_url)
+
+        self.payload_bucket: Bucket = None
+        self.payload_env_var_name = f"{env_var_name}_PAYLOAD_BUCKET"
+        if claim_check:
+            self.payload_bucket = payload_bucket(
+                scope,
+                f"{id}_payloads",
+                env_var_name=self.payload_env_var_name,
+                expiration=claim_check_expiration,
+            )
+            self.grant_payload_access(senders or [], write=True)
+            self.grant_payload_access(consumers or [])
 
         self.grant_access(
             grantees=senders or [],
@@ -40,3 +113,75 @@ class Queue(aws_sqs.Queue):
             grantfunc=self.grant_consume_messages,
             env_var_name=env_var_name,
         )
+        for handler in handlers or []:
+            self.add_consumer(handler, **consumer_kwargs)
+
+    def grant_payload_access(
+        self, grantees: Sequence[aws_iam.IGrantable], *, write: bool = False
+    ) -> None:
+        """
+        Grant grantees access to offloaded payloads, see s3.grant_payload_access().
+        """
+        grant_payload_access(
+            self.payload_bucket,
+            grantees,
+            env_var_name=self.payload_env_var_name,
+            write=write,
+        )
+
+    def add_consumer(
+        self,
+        handler: aws_lambda.IFunction,
+        *,
+        batch_size: int = 10,
+        max_batching_window: Duration = None,
+        max_concurrency: int = None,
+        report_batch_item_failures: bool = True,
+    ) -> aws_lambda_event_sources.SqsEventSource:
+        """
+        Invoke handler with batches of messages from the queue.
+
+        - batch_size: messages per invocation, above 10 requires max_batching_window.
+        - max_batching_window: how long to gather messages before invoking, up to 5 minutes.
+        - max_concurrency: cap on concurrent invocations (2-1000).
+        - report_batch_item_failures: handler returns the failed messages, see
+          alabcdk_runtime.batch.process_batch(), and only those are retried.
+
+        For FIFO queues Lambda processes one batch per message group at a time,
+        so concurrency grows with the number of active message groups, up to
+        max_concurrency. FIFO queues do not support max_batching_window.
+
+        The visibility timeout of the queue is raised to six times the timeout
+        of handler plus max_batching_window, as recommended by AWS, so messages
+        are not redelivered while they are being processed.
+        """
+        if self.fifo and max_batching_window is not None:
+            raise ValueError(
+                f"{type(self).__name__}('{self.node.id}'): max_batching_window is not supported for FIFO queues."
+            )
+        if self.fifo and batch_size > 10:
+            raise ValueError(
+                f"{type(self).__name__}('{self.node.id}'): batch_size must be at most 10 for FIFO queues."
+            )
+
+        timeout = getattr(handler, "timeout", None)
+        if timeout is not None:
+            window = (
+                0 if max_batching_window is None else max_batching_window.to_seconds()
+            )
+            needed = min(6 * timeout.to_seconds() + window, _MAX_VISIBILITY_TIMEOUT)
+            cfn_queue: aws_sqs.CfnQueue = self.node.default_child
+            current = cfn_queue.visibility_timeout or 30
+            if isinstance(current, (int, float)) and needed > current:
+                cfn_queue.visibility_timeout = int(needed)
+
+        source = aws_lambda_event_sources.SqsEventSource(
+            self,
+            batch_size=batch_size,
+            max_batching_window=max_batching_window,
+            max_concurrency=max_concurrency,
+            report_batch_item_failures=report_batch_item_failures,
+        )
+        handler.add_event_source(source)
+        self.grant_payload_access([handler])
+        return source
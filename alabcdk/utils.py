@@ -9,6 +9,9 @@ from constructs import Construct
 from aws_cdk import Stack
 
 _DEFAULT_LOGLEVEL = "INFO"
+# Days to keep noncurrent object versions, by stage
+_stage_to_noncurrent_days = {"PROD": 90, "TEST": 30, "DEV": 7}
+_DEFAULT_NONCURRENT_DAYS = 7
 
 
 def gen_name(
@@ -49,6 +52,13 @@ def stage_based_removal_policy(scope) -> cdk.RemovalPolicy:
     return cdk.RemovalPolicy.DESTROY
 
 
+def stage_based_noncurrent_version_expiration(scope) -> cdk.Duration:
+    stage = getattr(Stack.of(scope), "stage", None)
+    return cdk.Duration.days(
+        _stage_to_noncurrent_days.get(stage, _DEFAULT_NONCURRENT_DAYS)
+    )
+
+
 def get_params(allvars: dict) -> dict:
     """
     Filters all parameters that are KEYWORD_ONLY from allvars (retrieved by locals()),
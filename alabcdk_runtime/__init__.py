@@ -0,0 +1,7 @@
+"""
+Runtime helpers for alabcdk constructs.
+
+The modules in this package run inside Lambda functions (or deployment jobs)
+and depend only on the standard library and boto3. Constructs ship them with
+alabcdk.lambdas.runtime_code() or alabcdk.lambdas.runtime_layer().
+"""
@@ -0,0 +1,56 @@
+"""
+Partial batch failure reporting for Lambda event sources.
+
+Use with event sources configured with report_batch_item_failures, so a
+failing record does not make the whole batch be retried:
+
+    from alabcdk_runtime.batch import process_batch
+
+    def main(event, context):
+        return process_batch(event, handle_record)
+"""
+
+import logging
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+
+def _identifier(record: dict) -> str:
+    if "messageId" in record:  # SQS
+        return record["messageId"]
+    if "dynamodb" in record:  # DynamoDB Streams
+        return record["dynamodb"]["SequenceNumber"]
+    if "kinesis" in record:  # Kinesis Data Streams
+        return record["kinesis"]["sequenceNumber"]
+    raise ValueError(f"Unsupported record type: {sorted(record)}")
+
+
+def process_batch(event: dict, record_handler: Callable[[dict], None]) -> dict:
+    """
+    Call record_handler for every record in event and return the
+    batchItemFailures response.
+
+    For ordered sources (streams) processing stops at the first failure,
+    since Lambda retries the batch from the failed record anyway. For SQS
+    all records are processed and every failure is reported, except that for
+    FIFO queues the records following a failure in the same message group
+    are reported as failed without being processed, to keep the group in order.
+    """
+    failures = []
+    failed_groups = set()
+    for record in event.get("Records", []):
+        group = record.get("attributes", {}).get("MessageGroupId")
+        if group is not None and group in failed_groups:
+            failures.append({"itemIdentifier": _identifier(record)})
+            continue
+        try:
+            record_handler(record)
+        except Exception as e:
+            logger.exception(f"Failed to process record: {e}")
+            failures.append({"itemIdentifier": _identifier(record)})
+            if "messageId" not in record:
+                break
+            if group is not None:
+                failed_groups.add(group)
+    return {"batchItemFailures": failures}
@@ -0,0 +1,181 @@
+"""
+Claim-check for SQS and SNS messages larger than the 256 KB limit.
+
+Bodies above the threshold are stored, gzip compressed, in the payload bucket
+of a claim_check enabled Queue or Topic, and the message carries a pointer
+instead. The pointer uses the format of the AWS extended client libraries:
+
+    ["software.amazon.payloadoffloading.PayloadS3Pointer",
+     {"s3BucketName": "...", "s3Key": "..."}]
+
+with the original size in the "ExtendedPayloadSize" message attribute, so
+the extended clients can read messages sent without compression (compress=False).
+
+Producer:
+
+    check = ClaimCheck.from_env("orders")  # reads orders_PAYLOAD_BUCKET
+    check.send_message(sqs, queue_url, body)
+
+Consumer, for SQS records or SNS records delivered to Lambda:
+
+    body = check.unwrap_record(record)
+"""
+
+import gzip
+import io
+import json
+import os
+import shutil
+import uuid
+from typing import IO, Dict, Optional, Tuple
+
+POINTER_CLASS = "software.amazon.payloadoffloading.PayloadS3Pointer"
+SIZE_ATTRIBUTE = "ExtendedPayloadSize"
+# Maximum message size, including message attributes, for SQS and SNS
+MAX_MESSAGE_SIZE = 256 * 1024
+
+
+def _attributes_size(attributes: Dict[str, dict]) -> int:
+    size = 0
+    for name, value in attributes.items():
+        size += len(name.encode()) + len(value.get("DataType", "").encode())
+        if "StringValue" in value:
+            size += len(value["StringValue"].encode())
+        if "BinaryValue" in value:
+            size += len(value["BinaryValue"])
+    return size
+
+
+def parse_pointer(body: str) -> Optional[Tuple[str, str]]:
+    """Return (bucket, key) if body is a claim-check pointer, else None."""
+    if not body.startswith(f'["{POINTER_CLASS}"'):
+        return None
+    pointer = json.loads(body)[1]
+    return pointer["s3BucketName"], pointer["s3Key"]
+
+
+class ClaimCheck:
+    def __init__(
+        self,
+        bucket: str,
+        *,
+        s3=None,
+        threshold: int = MAX_MESSAGE_SIZE,
+        compress: bool = True,
+        prefix: str = "",
+        always: bool = False,
+    ):
+        """
+        - threshold: message size, body plus attributes, above which the body
+          is offloaded.
+        - compress: gzip payloads. Disable when consumers use the extended
+          client libraries, which do not decompress.
+        - always: offload every body, regardless of size.
+        """
+        if s3 is None:
+            import boto3
+
+            s3 = boto3.client("s3")
+        self.bucket = bucket
+        self.s3 = s3
+        self.threshold = threshold
+        self.compress = compress
+        self.prefix = prefix
+        self.always = always
+
+    @classmethod
+    def from_env(cls, env_var_name: str, **kwargs) -> "ClaimCheck":
+        """Create from the bucket name set in {env_var_name}_PAYLOAD_BUCKET."""
+        return cls(os.environ[f"{env_var_name}_PAYLOAD_BUCKET"], **kwargs)
+
+    def wrap(
+        self, body: str, attributes: Dict[str, dict] = None
+    ) -> Tuple[str, Dict[str, dict]]:
+        """
+        Return (body, attributes) to send. Bodies too large to send are
+        stored in S3 and replaced by a pointer.
+        """
+        attributes = dict(attributes or {})
+        data = body.encode()
+        if (
+            not self.always
+            and len(data) + _attributes_size(attributes) <= self.threshold
+        ):
+            return body, attributes
+
+        key = f"{self.prefix}{uuid.uuid4()}"
+        extra = {}
+        if self.compress:
+            data = gzip.compress(data)
+            extra["ContentEncoding"] = "gzip"
+        self.s3.put_object(Bucket=self.bucket, Key=key, Body=data, **extra)
+
+        attributes[SIZE_ATTRIBUTE] = {
+            "DataType": "Number",
+            "StringValue": str(len(body.encode())),
+        }
+        pointer = json.dumps(
+            [POINTER_CLASS, {"s3BucketName": self.bucket, "s3Key": key}]
+        )
+        return pointer, attributes
+
+    def open(self, body: str) -> IO[bytes]:
+        """
+        Return a stream of the payload, decompressed on the fly, so large
+        payloads need not be held in memory. Plain bodies are returned as is.
+        """
+        pointer = parse_pointer(body)
+        if pointer is None:
+            return io.BytesIO(body.encode())
+        bucket, key = pointer
+        response = self.s3.get_object(Bucket=bucket, Key=key)
+        stream = response["Body"]
+        if response.get("ContentEncoding") == "gzip":
+            return gzip.GzipFile(fileobj=stream, mode="rb")
+        return stream
+
+    def unwrap(self, body: str) -> str:
+        """Return the original body, fetching it from S3 if offloaded."""
+        if parse_pointer(body) is None:
+            return body
+        with self.open(body) as stream:
+            buffer = io.BytesIO()
+            shutil.copyfileobj(stream, buffer)
+        return buffer.getvalue().decode()
+
+    def unwrap_record(self, record: dict) -> str:
+        """
+        Return the original body of an SQS or SNS Lambda event record,
+        including SNS notifications delivered to SQS without raw delivery.
+        """
+        if "Sns" in record:
+            return self.unwrap(record["Sns"]["Message"])
+        body = record["body"]
+        if body.startswith("{"):
+            try:
+                envelope = json.loads(body)
+            except ValueError:
+                envelope = None
+            if isinstance(envelope, dict) and envelope.get("Type") == "Notification":
+                return self.unwrap(envelope["Message"])
+        return self.unwrap(body)
+
+    def delete(self, body: str) -> None:
+        """Delete the payload of body, if offloaded, e.g. once it is processed."""
+        pointer = parse_pointer(body)
+        if pointer is not None:
+            self.s3.delete_object(Bucket=pointer[0], Key=pointer[1])
+
+    def send_message(self, sqs, queue_url: str, body: str, **kwargs) -> dict:
+        """sqs.send_message() with body offloaded if needed."""
+        body, attributes = self.wrap(body, kwargs.pop("MessageAttributes", None))
+        if attributes:
+            kwargs["MessageAttributes"] = attributes
+        return sqs.send_message(QueueUrl=queue_url, MessageBody=body, **kwargs)
+
+    def publish(self, sns, topic_arn: str, message: str, **kwargs) -> dict:
+        """sns.publish() with message offloaded if needed."""
+        message, attributes = self.wrap(message, kwargs.pop("MessageAttributes", None))
+        if attributes:
+            kwargs["MessageAttributes"] = attributes
+        return sns.publish(TopicArn=topic_arn, Message=message, **kwargs)
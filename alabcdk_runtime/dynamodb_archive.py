@@ -0,0 +1,133 @@
+"""
+Archive of DynamoDB items removed by TTL.
+
+This is the handler of the function created by alabcdk's Table when
+archive_expired_items is set. It receives batches of stream REMOVE records
+made by the TTL process and writes the old item images as gzipped JSON
+lines to S3, partitioned by the expiry date of the items:
+
+    <ARCHIVE_PREFIX>year=YYYY/month=MM/day=DD/<sequence number>.json.gz
+
+Records are written in stream order, one object per run of consecutive
+records with the same partition, named after the sequence number of the
+first record of the run. A retried (or bisected) batch starts a run at the
+same record, so it overwrites its own objects instead of duplicating them.
+When a run fails, the records from it on are reported as failed, and the
+runs before it are not retried.
+
+Binary attributes are written base64 encoded, as they are in the stream.
+
+Environment:
+- ARCHIVE_BUCKET, ARCHIVE_PREFIX
+- TTL_ATTRIBUTE: attribute with the expiry time (epoch seconds). Items
+  without it are partitioned on the time of removal.
+"""
+
+import datetime
+import gzip
+import json
+import logging
+import os
+from decimal import Decimal
+from typing import List, Tuple
+
+logger = logging.getLogger(__name__)
+logger.setLevel(os.environ.get("LOGLEVEL", "INFO"))
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    raise TypeError(f"Cannot serialize {type(value)}")
+
+
+def _deserialize(deserializer, value: dict):
+    # Binary values are base64 encoded in stream records, keep them that way
+    kind, data = next(iter(value.items()))
+    if kind == "B":
+        return data
+    if kind == "BS":
+        return set(data)
+    if kind == "M":
+        return {k: _deserialize(deserializer, v) for (k, v) in data.items()}
+    if kind == "L":
+        return [_deserialize(deserializer, v) for v in data]
+    return deserializer.deserialize(value)
+
+
+def partition_of(record: dict, item: dict, ttl_attribute: str = None) -> str:
+    expires = item.get(ttl_attribute) if ttl_attribute else None
+    try:
+        timestamp = float(expires)
+    except (TypeError, ValueError):
+        timestamp = record["dynamodb"]["ApproximateCreationDateTime"]
+    ts = datetime.datetime.fromtimestamp(timestamp, tz=datetime.timezone.utc)
+    return f"year={ts:%Y}/month={ts:%m}/day={ts:%d}"
+
+
+def runs(records: List[dict], ttl_attribute: str = None) -> List[Tuple[str, str, list]]:
+    """
+    Split the expired items in records into runs of consecutive records with
+    the same partition, as (partition, first sequence number, items).
+    """
+    from boto3.dynamodb.types import TypeDeserializer
+
+    deserializer = TypeDeserializer()
+    result = []
+    for record in records:
+        image = record["dynamodb"].get("OldImage")
+        if record.get("eventName") != "REMOVE" or not image:
+            continue
+        item = {k: _deserialize(deserializer, v) for (k, v) in image.items()}
+        partition = partition_of(record, item, ttl_attribute)
+        if not result or result[-1][0] != partition:
+            result.append((partition, record["dynamodb"]["SequenceNumber"], []))
+        result[-1][2].append(item)
+    return result
+
+
+def archive(
+    records: List[dict], *, s3, bucket: str, prefix: str, ttl_attribute: str = None
+) -> List[str]:
+    """
+    Write the expired items in records to S3, return the sequence numbers
+    of the records that failed: all from the first failing run on.
+    """
+    for partition, first, items in runs(records, ttl_attribute):
+        body = "\n".join(json.dumps(item, default=_json_default) for item in items)
+        key = f"{prefix}{partition}/{first}.json.gz"
+        try:
+            s3.put_object(
+                Bucket=bucket,
+                Key=key,
+                Body=gzip.compress(body.encode()),
+                ContentType="application/x-ndjson",
+                ContentEncoding="gzip",
+            )
+        except Exception as e:
+            logger.error(f"Failed to archive to s3://{bucket}/{key}: {e}")
+            return [first]
+        logger.info(f"Archived {len(items)} items to s3://{bucket}/{key}.")
+    return []
+
+
+_s3 = None
+
+
+def handler(event, context):
+    global _s3
+    if _s3 is None:
+        import boto3
+
+        _s3 = boto3.client("s3")
+    failed = archive(
+        event.get("Records", []),
+        s3=_s3,
+        bucket=os.environ["ARCHIVE_BUCKET"],
+        prefix=os.environ.get("ARCHIVE_PREFIX", ""),
+        ttl_attribute=os.environ.get("TTL_ATTRIBUTE"),
+    )
+    # Retried from the first failure on, the records before it are done
+    return {"batchItemFailures": [{"itemIdentifier": f} for f in failed]}
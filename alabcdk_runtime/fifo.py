@@ -0,0 +1,162 @@
+"""
+In-memory model of an SQS FIFO queue, to test producers and consumers
+against its ordering and deduplication semantics without AWS:
+
+- messages with the same deduplication id sent within five minutes are
+  accepted but only delivered once. The deduplication id is scoped to the
+  queue, or to the message group in high throughput mode.
+- messages of a message group are delivered in order, and no further
+  messages of a group are delivered while some are in flight.
+- a received message not deleted within the visibility timeout becomes
+  visible again, ahead of the rest of its group.
+
+The clock is injectable, so tests can advance time:
+
+    now = [0.0]
+    queue = FifoQueueSimulator(clock=lambda: now[0])
+    queue.send_message("a", message_group_id="g1", deduplication_id="1")
+    [message] = queue.receive_messages()
+    now[0] += 31  # visibility timeout passed, "a" is delivered again
+"""
+
+import hashlib
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Callable, Deque, Dict, List, NamedTuple, Optional, Tuple
+
+DEDUPLICATION_INTERVAL = 5 * 60
+
+
+class Message(NamedTuple):
+    message_id: str
+    receipt_handle: str
+    body: str
+    message_group_id: str
+    deduplication_id: str
+    receive_count: int
+
+
+class _Stored:
+    def __init__(self, body: str, group: str, deduplication_id: str):
+        self.message_id = str(uuid.uuid4())
+        self.body = body
+        self.group = group
+        self.deduplication_id = deduplication_id
+        self.receive_count = 0
+        self.receipt_handle: Optional[str] = None
+        self.visible_at = 0.0
+
+
+class FifoQueueSimulator:
+    def __init__(
+        self,
+        *,
+        high_throughput: bool = True,
+        content_based_deduplication: bool = False,
+        visibility_timeout: float = 30,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.high_throughput = high_throughput
+        self.content_based_deduplication = content_based_deduplication
+        self.visibility_timeout = visibility_timeout
+        self.clock = clock
+        # Message groups in the order they first got messages
+        self._groups: "OrderedDict[str, Deque[_Stored]]" = OrderedDict()
+        self._in_flight: Dict[str, _Stored] = {}
+        self._deduplication: Dict[Tuple[str, str], Tuple[float, str]] = {}
+
+    def _deduplication_key(self, group: str, deduplication_id: str) -> Tuple[str, str]:
+        return (group if self.high_throughput else "", deduplication_id)
+
+    def send_message(
+        self,
+        body: str,
+        *,
+        message_group_id: str,
+        deduplication_id: str = None,
+    ) -> str:
+        """
+        Queue body in message_group_id and return its message id.
+        A duplicate returns the message id of the original, and is not queued.
+        """
+        if deduplication_id is None:
+            if not self.content_based_deduplication:
+                raise ValueError(
+                    "deduplication_id is needed unless content_based_deduplication is enabled."
+                )
+            deduplication_id = hashlib.sha256(body.encode()).hexdigest()
+
+        now = self.clock()
+        key = self._deduplication_key(message_group_id, deduplication_id)
+        previous = self._deduplication.get(key)
+        if previous is not None and now - previous[0] < DEDUPLICATION_INTERVAL:
+            return previous[1]
+
+        message = _Stored(body, message_group_id, deduplication_id)
+        self._deduplication[key] = (now, message.message_id)
+        self._groups.setdefault(message_group_id, deque()).append(message)
+        return message.message_id
+
+    def _expire_visibility(self, now: float) -> None:
+        for handle, message in list(self._in_flight.items()):
+            if message.visible_at <= now:
+                del self._in_flight[handle]
+                message.receipt_handle = None
+
+    def _group_locked(self, group: str) -> bool:
+        return any(m.group == group for m in self._in_flight.values())
+
+    def receive_messages(self, max_messages: int = 10) -> List[Message]:
+        """
+        Receive up to max_messages, taken from the first group that has no
+        messages in flight and continuing with the next, like SQS does.
+        """
+        if not 1 <= max_messages <= 10:
+            raise ValueError("max_messages must be between 1 and 10.")
+        now = self.clock()
+        self._expire_visibility(now)
+
+        received = []
+        for group, messages in self._groups.items():
+            if len(received) == max_messages:
+                break
+            if self._group_locked(group):
+                continue
+            for message in list(messages)[: max_messages - len(received)]:
+                message.receive_count += 1
+                message.receipt_handle = str(uuid.uuid4())
+                message.visible_at = now + self.visibility_timeout
+                self._in_flight[message.receipt_handle] = message
+                received.append(
+                    Message(
+                        message.message_id,
+                        message.receipt_handle,
+                        message.body,
+                        message.group,
+                        message.deduplication_id,
+                        message.receive_count,
+                    )
+                )
+        return received
+
+    def delete_message(self, receipt_handle: str) -> None:
+        message = self._in_flight.pop(receipt_handle, None)
+        if message is None:
+            raise KeyError(f"Unknown or expired receipt handle: {receipt_handle}")
+        group = self._groups[message.group]
+        group.remove(message)
+        if not group:
+            del self._groups[message.group]
+
+    def change_message_visibility(self, receipt_handle: str, timeout: float) -> None:
+        """Make a received message visible again after timeout seconds (0 releases it)."""
+        message = self._in_flight.get(receipt_handle)
+        if message is None:
+            raise KeyError(f"Unknown or expired receipt handle: {receipt_handle}")
+        message.visible_at = self.clock() + timeout
+        if timeout == 0:
+            self._expire_visibility(self.clock())
+
+    def __len__(self) -> int:
+        return sum(len(messages) for messages in self._groups.values())
@@ -0,0 +1,212 @@
+"""
+Micro-batched, manifest driven COPY of S3 objects into Redshift.
+
+This is the handler of the function created by alabcdk's RedshiftIngestion.
+It receives batches of S3 notifications from SQS, groups the objects into
+batches limited by size and count, writes a manifest per batch and loads it
+with a single COPY through the Data API.
+
+Loads are idempotent: every loaded object is recorded in a log table in the
+same transaction as the COPY, and objects already in the log are skipped
+when SQS redelivers a message.
+
+Environment:
+- COPY_TABLE: target table, e.g. "staging.events"
+- COPY_OPTIONS: format options, e.g. "FORMAT AS JSON 'auto' GZIP"
+- COPY_IAM_ROLE_ARN: role Redshift assumes to read the objects
+- COPY_LOG_TABLE: defaults to "public.alabcdk_copy_log"
+- MANIFEST_BUCKET, MANIFEST_PREFIX: where manifests are written
+- MAX_BATCH_BYTES, MAX_BATCH_FILES: limits of a single COPY
+- Data API settings, see redshift_data.
+"""
+
+import hashlib
+import json
+import logging
+import os
+from typing import Iterable, List
+
+from .redshift_data import DataApi
+from .s3_events import S3Object, iter_s3_objects
+
+logger = logging.getLogger(__name__)
+logger.setLevel(os.environ.get("LOGLEVEL", "INFO"))
+
+_DEFAULT_LOG_TABLE = "public.alabcdk_copy_log"
+
+
+def _url(obj: S3Object) -> str:
+    return f"s3://{obj.bucket}/{obj.key}"
+
+
+def _quote(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def plan_batches(
+    objects: Iterable[S3Object], *, max_bytes: int, max_files: int
+) -> List[List[S3Object]]:
+    """
+    Split objects into batches of at most max_files objects and max_bytes
+    bytes. Duplicates are dropped. An object larger than max_bytes gets a
+    batch of its own.
+    """
+    unique = {_url(obj): obj for obj in objects}
+    batches = []
+    batch, batch_bytes = [], 0
+    for url in sorted(unique):
+        obj = unique[url]
+        if batch and (len(batch) >= max_files or batch_bytes + obj.size > max_bytes):
+            batches.append(batch)
+            batch, batch_bytes = [], 0
+        batch.append(obj)
+        batch_bytes += obj.size
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def manifest(objects: List[S3Object]) -> dict:
+    # content_length is required for columnar formats
+    return {
+        "entries": [
+            {"url": _url(obj), "mandatory": True, "meta": {"content_length": obj.size}}
+            for obj in objects
+        ]
+    }
+
+
+def manifest_id(objects: List[S3Object]) -> str:
+    """Content based id, so a retried batch maps to the same manifest."""
+    digest = hashlib.sha256("\n".join(sorted(map(_url, objects))).encode())
+    return digest.hexdigest()[:32]
+
+
+class CopyLoader:
+    def __init__(
+        self,
+        *,
+        data_api,
+        s3,
+        table: str,
+        iam_role_arn: str,
+        manifest_bucket: str,
+        copy_options: str = "",
+        manifest_prefix: str = "_manifests/",
+        log_table: str = _DEFAULT_LOG_TABLE,
+        max_batch_bytes: int = 1024**3,
+        max_batch_files: int = 200,
+    ):
+        self.data_api = data_api
+        self.s3 = s3
+        self.table = table
+        self.iam_role_arn = iam_role_arn
+        self.copy_options = copy_options
+        self.manifest_bucket = manifest_bucket
+        self.manifest_prefix = manifest_prefix
+        self.log_table = log_table
+        self.max_batch_bytes = max_batch_bytes
+        self.max_batch_files = max_batch_files
+        self._log_table_created = False
+
+    @classmethod
+    def from_env(cls, *, data_api=None, s3=None) -> "CopyLoader":
+        if s3 is None:
+            import boto3
+
+            s3 = boto3.client("s3")
+        return cls(
+            data_api=data_api or DataApi.from_env(),
+            s3=s3,
+            table=os.environ["COPY_TABLE"],
+            iam_role_arn=os.environ["COPY_IAM_ROLE_ARN"],
+            copy_options=os.environ.get("COPY_OPTIONS", ""),
+            manifest_bucket=os.environ["MANIFEST_BUCKET"],
+            manifest_prefix=os.environ.get("MANIFEST_PREFIX", "_manifests/"),
+            log_table=os.environ.get("COPY_LOG_TABLE", _DEFAULT_LOG_TABLE),
+            max_batch_bytes=int(os.environ.get("MAX_BATCH_BYTES", 1024**3)),
+            max_batch_files=int(os.environ.get("MAX_BATCH_FILES", 200)),
+        )
+
+    def ensure_log_table(self) -> None:
+        if self._log_table_created:
+            return
+        self.data_api.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.log_table} ("
+            "url VARCHAR(1024) NOT NULL, target VARCHAR(256) NOT NULL, "
+            "manifest_id VARCHAR(32) NOT NULL, loaded_at TIMESTAMP DEFAULT GETDATE())"
+        )
+        self._log_table_created = True
+
+    def already_loaded(self, objects: List[S3Object]) -> set:
+        if not objects:
+            return set()
+        urls = ", ".join(_quote(_url(obj)) for obj in objects)
+        rows = self.data_api.query(
+            f"SELECT url FROM {self.log_table} "
+            f"WHERE target = {_quote(self.table)} AND url IN ({urls})"
+        )
+        return {row["url"] for row in rows}
+
+    def copy_statements(self, objects: List[S3Object], manifest_url: str) -> List[str]:
+        mid = manifest_id(objects)
+        values = ", ".join(
+            f"({_quote(_url(obj))}, {_quote(self.table)}, {_quote(mid)})"
+            for obj in objects
+        )
+        return [
+            f"COPY {self.table} FROM {_quote(manifest_url)} "
+            f"IAM_ROLE {_quote(self.iam_role_arn)} MANIFEST {self.copy_options}".strip(),
+            f"INSERT INTO {self.log_table} (url, target, manifest_id) VALUES {values}",
+        ]
+
+    def load_batch(self, objects: List[S3Object]) -> None:
+        mid = manifest_id(objects)
+        key = f"{self.manifest_prefix}{mid}.manifest"
+        self.s3.put_object(
+            Bucket=self.manifest_bucket,
+            Key=key,
+            Body=json.dumps(manifest(objects)).encode(),
+            ContentType="application/json",
+        )
+        manifest_url = f"s3://{self.manifest_bucket}/{key}"
+        logger.info(
+            f"Loading {len(objects)} objects into {self.table} ({manifest_url})."
+        )
+        self.data_api.batch_execute(self.copy_statements(objects, manifest_url))
+
+    def load(self, objects: Iterable[S3Object]) -> List[S3Object]:
+        """Load objects and return the ones that failed."""
+        objects = [
+            obj for obj in objects if not obj.key.startswith(self.manifest_prefix)
+        ]
+        self.ensure_log_table()
+        failed = []
+        for batch in plan_batches(
+            objects, max_bytes=self.max_batch_bytes, max_files=self.max_batch_files
+        ):
+            try:
+                loaded = self.already_loaded(batch)
+                batch = [obj for obj in batch if _url(obj) not in loaded]
+                if loaded:
+                    logger.info(f"Skipping {len(loaded)} objects already loaded.")
+                if batch:
+                    self.load_batch(batch)
+            except Exception as e:
+                logger.error(f"Failed to load batch: {e}")
+                failed.extend(batch)
+        return failed
+
+    def handle(self, event: dict) -> dict:
+        failed = self.load(iter_s3_objects(event))
+        message_ids = sorted({obj.message_id for obj in failed if obj.message_id})
+        return {"batchItemFailures": [{"itemIdentifier": m} for m in message_ids]}
+
+
+_loader = None
+
+
+def handler(event, context):
+    global _loader
+    _loader = _loader or CopyLoader.from_env()
+    return _loader.handle(event)
@@ -0,0 +1,161 @@
+"""
+Thin wrapper around the Redshift Data API, plus an in-memory stand-in
+to exercise code that issues SQL without a cluster.
+
+Connection details are read from the environment variables set by
+RedshiftBase.grant_data_api():
+
+- REDSHIFT_CLUSTER_IDENTIFIER or REDSHIFT_WORKGROUP_NAME
+- REDSHIFT_DATABASE
+- REDSHIFT_SECRET_ARN or REDSHIFT_DB_USER (provisioned clusters only)
+"""
+
+import os
+import time
+import uuid
+from typing import Callable, Dict, List, Optional, Sequence
+
+_FINISHED = "FINISHED"
+_FAILED = ["FAILED", "ABORTED"]
+
+
+class StatementError(Exception):
+    pass
+
+
+class DataApi:
+    def __init__(
+        self,
+        *,
+        database: str,
+        cluster_identifier: str = None,
+        workgroup_name: str = None,
+        secret_arn: str = None,
+        db_user: str = None,
+        client=None,
+        poll_interval: float = 1.0,
+    ):
+        if not any([cluster_identifier, workgroup_name]):
+            raise ValueError("Either cluster_identifier or workgroup_name is needed.")
+        self.target = {"Database": database}
+        if cluster_identifier:
+            self.target["ClusterIdentifier"] = cluster_identifier
+        if workgroup_name:
+            self.target["WorkgroupName"] = workgroup_name
+        if secret_arn:
+            self.target["SecretArn"] = secret_arn
+        elif db_user:
+            self.target["DbUser"] = db_user
+        self.poll_interval = poll_interval
+        if client is None:
+            import boto3
+
+            client = boto3.client("redshift-data")
+        self.client = client
+
+    @classmethod
+    def from_env(cls, client=None) -> "DataApi":
+        return cls(
+            database=os.environ["REDSHIFT_DATABASE"],
+            cluster_identifier=os.environ.get("REDSHIFT_CLUSTER_IDENTIFIER"),
+            workgroup_name=os.environ.get("REDSHIFT_WORKGROUP_NAME"),
+            secret_arn=os.environ.get("REDSHIFT_SECRET_ARN"),
+            db_user=os.environ.get("REDSHIFT_DB_USER"),
+            client=client,
+        )
+
+    def execute(
+        self, sql: str, *, parameters: Dict[str, str] = None, wait: bool = True
+    ) -> str:
+        """Execute a statement and return its id."""
+        kwargs = dict(self.target, Sql=sql)
+        if parameters:
+            kwargs["Parameters"] = [
+                {"name": k, "value": str(v)} for (k, v) in parameters.items()
+            ]
+        statement_id = self.client.execute_statement(**kwargs)["Id"]
+        if wait:
+            self.wait(statement_id)
+        return statement_id
+
+    def batch_execute(self, sqls: Sequence[str], *, wait: bool = True) -> str:
+        """Execute statements in a single transaction and return the batch id."""
+        statement_id = self.client.batch_execute_statement(
+            **dict(self.target, Sqls=list(sqls))
+        )["Id"]
+        if wait:
+            self.wait(statement_id)
+        return statement_id
+
+    def wait(self, statement_id: str) -> dict:
+        while True:
+            description = self.client.describe_statement(Id=statement_id)
+            if description["Status"] == _FINISHED:
+                return description
+            if description["Status"] in _FAILED:
+                raise StatementError(
+                    f"Statement {statement_id} {description['Status']}: {description.get('Error')}"
+                )
+            time.sleep(self.poll_interval)
+
+    def query(self, sql: str, *, parameters: Dict[str, str] = None) -> List[dict]:
+        """Execute a statement and return the result rows as dictionaries."""
+        statement_id = self.execute(sql, parameters=parameters)
+        result = self.client.get_statement_result(Id=statement_id)
+        columns = [c["name"] for c in result["ColumnMetadata"]]
+        return [
+            dict(zip(columns, [next(iter(v.values())) for v in record]))
+            for record in result["Records"]
+        ]
+
+
+class LocalDataApi:
+    """
+    In-memory stand-in for the boto3 "redshift-data" client.
+
+    Every statement is recorded in .statements and finishes immediately.
+    Pass responder to return rows for queries; it receives the SQL and
+    returns a list of dictionaries, or raises to make the statement fail.
+
+    Example:
+    >>>local = LocalDataApi()
+    >>>api = DataApi(database="dev", workgroup_name="wg", client=local)
+    >>>api.execute("select 1")
+    >>>local.statements
+    ['select 1']
+    """
+
+    def __init__(self, responder: Optional[Callable[[str], List[dict]]] = None):
+        self.responder = responder or (lambda sql: [])
+        self.statements: List[str] = []
+        self._results: Dict[str, dict] = {}
+
+    def _run(self, sqls: List[str]) -> dict:
+        statement_id = str(uuid.uuid4())
+        self.statements.extend(sqls)
+        try:
+            rows = []
+            for sql in sqls:
+                rows = self.responder(sql)
+            self._results[statement_id] = {"Status": _FINISHED, "rows": rows or []}
+        except Exception as e:
+            self._results[statement_id] = {"Status": "FAILED", "Error": str(e)}
+        return {"Id": statement_id}
+
+    def execute_statement(self, *, Sql: str, **kwargs) -> dict:
+        return self._run([Sql])
+
+    def batch_execute_statement(self, *, Sqls: List[str], **kwargs) -> dict:
+        return self._run(Sqls)
+
+    def describe_statement(self, *, Id: str) -> dict:
+        result = self._results[Id]
+        return {"Id": Id, "Status": result["Status"], "Error": result.get("Error")}
+
+    def get_statement_result(self, *, Id: str) -> dict:
+        rows = self._results[Id]["rows"]
+        columns = list(rows[0]) if rows else []
+        return {
+            "ColumnMetadata": [{"name": c} for c in columns],
+            "Records": [[{"stringValue": row[c]} for c in columns] for row in rows],
+        }
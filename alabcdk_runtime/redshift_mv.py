@@ -0,0 +1,89 @@
+"""
+Refresh of Redshift materialized views.
+
+handler() is invoked by the state machine created by alabcdk's
+MaterializedViewRefresher, once per view, with the event
+{"view": "<schema>.<name>"}. The refresh is skipped unless Redshift reports
+the view as stale, i.e. its base tables changed since the last refresh.
+
+refresh_levels() orders views for refresh and is used at synth time.
+"""
+
+import logging
+import os
+from typing import Collection, Dict, List, Sequence
+
+from .redshift_data import DataApi
+
+logger = logging.getLogger(__name__)
+logger.setLevel(os.environ.get("LOGLEVEL", "INFO"))
+
+
+def refresh_levels(
+    dependencies: Dict[str, Sequence[str]], skip: Collection[str] = ()
+) -> List[List[str]]:
+    """
+    Group views into levels that can be refreshed in parallel. Every view
+    comes after the views it depends on. Dependencies outside of the
+    dictionary are ignored. Views in skip (e.g. auto refreshed views) keep
+    the views around them in order, but are left out of the levels.
+
+    Example:
+    >>>refresh_levels({"a": [], "b": ["a"], "c": ["a"], "d": ["b", "c"]})
+    [['a'], ['b', 'c'], ['d']]
+    >>>refresh_levels({"a": [], "b": ["a"], "c": ["b"]}, skip=["b"])
+    [['a'], ['c']]
+
+    :raises ValueError: if the dependencies contain a cycle.
+    """
+    remaining = {
+        view: {d for d in deps if d in dependencies}
+        for (view, deps) in dependencies.items()
+    }
+    levels = []
+    while remaining:
+        level = sorted(view for (view, deps) in remaining.items() if not deps)
+        if not level:
+            raise ValueError(
+                f"Circular dependency between materialized views: {sorted(remaining)}"
+            )
+        levels.append([view for view in level if view not in skip])
+        remaining = {
+            view: deps - set(level)
+            for (view, deps) in remaining.items()
+            if view not in level
+        }
+    return [level for level in levels if level]
+
+
+def is_stale(data_api: DataApi, view: str) -> bool:
+    schema, _, name = view.rpartition(".")
+    rows = data_api.query(
+        "SELECT is_stale FROM svv_mv_info WHERE schema_name = :schema AND name = :name",
+        parameters={"schema": schema or "public", "name": name},
+    )
+    # Refresh views we know nothing about rather than skip them
+    return not rows or rows[0]["is_stale"] != "f"
+
+
+def refresh(data_api: DataApi, view: str, *, force: bool = False) -> bool:
+    """Refresh view if stale (or forced). Returns True if it was refreshed."""
+    if not force and not is_stale(data_api, view):
+        logger.info(f"{view} is up to date, skipping refresh.")
+        return False
+    logger.info(f"Refreshing {view}.")
+    data_api.execute(f"REFRESH MATERIALIZED VIEW {view}")
+    return True
+
+
+_data_api = None
+
+
+def handler(event, context):
+    global _data_api
+    _data_api = _data_api or DataApi.from_env()
+    view = event["view"]
+    return {
+        "view": view,
+        "refreshed": refresh(_data_api, view, force=event.get("force", False)),
+    }
@@ -0,0 +1,104 @@
+"""
+Helpers for Lambda functions receiving S3 object notifications, either
+directly from S3 or through EventBridge, buffered in SQS or not.
+
+Handle many objects per invocation by grouping them on prefix:
+
+    from alabcdk_runtime.s3_events import iter_s3_objects, group_keys_by_prefix
+
+    def main(event, context):
+        for (bucket, prefix), objects in group_keys_by_prefix(iter_s3_objects(event)).items():
+            load(bucket, prefix, [o.key for o in objects])
+"""
+
+import json
+import urllib.parse
+from collections import defaultdict
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Tuple
+
+
+class S3Object(NamedTuple):
+    bucket: str
+    key: str
+    size: int
+    message_id: str = None
+    event_name: str = None
+
+
+def _from_notification(s3_record: dict, message_id: str) -> S3Object:
+    s3 = s3_record["s3"]
+    return S3Object(
+        bucket=s3["bucket"]["name"],
+        key=urllib.parse.unquote_plus(s3["object"]["key"]),
+        size=s3["object"].get("size", 0),
+        message_id=message_id,
+        event_name=s3_record.get("eventName"),
+    )
+
+
+def _from_eventbridge(event: dict, message_id: str) -> S3Object:
+    detail = event["detail"]
+    return S3Object(
+        bucket=detail["bucket"]["name"],
+        key=urllib.parse.unquote_plus(detail["object"]["key"]),
+        size=detail["object"].get("size", 0),
+        message_id=message_id,
+        event_name=event.get("detail-type"),
+    )
+
+
+def _iter_body(body: dict, message_id: str) -> Iterator[S3Object]:
+    if body.get("source") == "aws.s3" and "detail" in body:
+        yield _from_eventbridge(body, message_id)
+        return
+    # S3 notifications; the s3:TestEvent sent on configuration has no Records
+    for s3_record in body.get("Records", []):
+        yield _from_notification(s3_record, message_id)
+
+
+def iter_s3_objects(event: dict) -> Iterator[S3Object]:
+    """
+    Yield the objects referenced by an event. Supported events are SQS events
+    carrying S3 notifications or EventBridge events, and S3 notifications or
+    EventBridge events invoking the function directly.
+
+    message_id is the id of the SQS message the object came from, to be used
+    when reporting partial batch failures.
+    """
+    if event.get("source") == "aws.s3":
+        yield from _iter_body(event, None)
+        return
+    for record in event.get("Records", []):
+        if "body" in record:
+            yield from _iter_body(json.loads(record["body"]), record.get("messageId"))
+        elif "s3" in record:
+            yield _from_notification(record, None)
+
+
+def key_prefix(key: str, depth: int = 1, delimiter: str = "/") -> str:
+    """
+    Return the first depth levels of key, including the trailing delimiter,
+    e.g. key_prefix("a/b/c.json", 1) == "a/". Keys with fewer levels give
+    all their levels, e.g. key_prefix("a/b.json", 2) == "a/", and keys
+    without any level give "".
+    """
+    parts = key.split(delimiter)[:-1][:depth]
+    return delimiter.join(parts) + delimiter if parts else ""
+
+
+def group_keys_by_prefix(
+    objects: Iterable[S3Object], depth: int = 1, delimiter: str = "/"
+) -> Dict[Tuple[str, str], List[S3Object]]:
+    """
+    Group objects on (bucket, key prefix), see key_prefix(), keeping the
+    order of arrival within each group. Duplicate notifications of the same
+    object are dropped.
+    """
+    groups = defaultdict(list)
+    seen = set()
+    for obj in objects:
+        if (obj.bucket, obj.key, obj.event_name) in seen:
+            continue
+        seen.add((obj.bucket, obj.key, obj.event_name))
+        groups[(obj.bucket, key_prefix(obj.key, depth, delimiter))].append(obj)
+    return dict(groups)
@@ -0,0 +1,166 @@
+"""
+Read S3 Inventory reports instead of paging through ListObjectsV2.
+
+Bucket(inventory=True) delivers a daily report to an inventory bucket, and
+sets the location in "{env_var_name}_INVENTORY" of its readers:
+
+    reader = InventoryReader.from_env("datalake")
+    for key in reader.iter_keys():
+        ...
+    summary = reader.partition_summary(depth=2)
+
+CSV reports are read with the standard library. Parquet and ORC reports
+need pyarrow, e.g. from a PipLayers layer.
+"""
+
+import csv
+import gzip
+import io
+import json
+import os
+import re
+import tempfile
+import urllib.parse
+from collections import defaultdict
+from typing import Dict, Iterator, List, Sequence
+
+from .s3_events import key_prefix
+
+# Report delivery folders are named like 2024-05-17T01-00Z
+_DELIVERY_FOLDER = re.compile(r"\d{4}-\d{2}-\d{2}T\d{2}-\d{2}Z/$")
+
+
+def _snake_case(name: str) -> str:
+    return re.sub(r"(?<!^)(?=[A-Z])", "_", name.strip()).lower()
+
+
+def _pyarrow_reader(file_format: str):
+    try:
+        if file_format == "Parquet":
+            import pyarrow.parquet as reader
+        else:
+            import pyarrow.orc as reader
+    except ImportError as e:
+        raise ImportError(
+            f"Reading {file_format} inventory reports needs pyarrow."
+        ) from e
+    return reader
+
+
+class InventoryReader:
+    def __init__(self, bucket: str, prefix: str, *, s3=None):
+        """
+        - bucket: the bucket holding the reports.
+        - prefix: the report location, "{destination prefix}/{source bucket}/{inventory id}/".
+        """
+        if s3 is None:
+            import boto3
+
+            s3 = boto3.client("s3")
+        self.bucket = bucket
+        self.prefix = prefix if prefix.endswith("/") else prefix + "/"
+        self.s3 = s3
+
+    @classmethod
+    def from_env(cls, env_var_name: str, **kwargs) -> "InventoryReader":
+        """Create from the location set by Bucket in {env_var_name}_INVENTORY."""
+        location = json.loads(os.environ[f"{env_var_name}_INVENTORY"])
+        return cls(location["bucket"], location["prefix"], **kwargs)
+
+    def deliveries(self) -> List[str]:
+        """Prefixes of the delivered reports, oldest first."""
+        paginator = self.s3.get_paginator("list_objects_v2")
+        folders = []
+        for page in paginator.paginate(
+            Bucket=self.bucket, Prefix=self.prefix, Delimiter="/"
+        ):
+            folders += [
+                p["Prefix"]
+                for p in page.get("CommonPrefixes", [])
+                if _DELIVERY_FOLDER.search(p["Prefix"])
+            ]
+        return sorted(folders)
+
+    def manifest(self, delivery: str = None) -> dict:
+        """The manifest of delivery, defaults to the latest delivery."""
+        if delivery is None:
+            deliveries = self.deliveries()
+            if not deliveries:
+                raise FileNotFoundError(
+                    f"No inventory reports in s3://{self.bucket}/{self.prefix}"
+                )
+            delivery = deliveries[-1]
+        response = self.s3.get_object(
+            Bucket=self.bucket, Key=f"{delivery}manifest.json"
+        )
+        return json.loads(response["Body"].read())
+
+    def _iter_csv(self, key: str, columns: List[str]) -> Iterator[dict]:
+        body = self.s3.get_object(Bucket=self.bucket, Key=key)["Body"]
+        with gzip.GzipFile(fileobj=body) as f:
+            for row in csv.reader(io.TextIOWrapper(f, encoding="utf-8")):
+                record = dict(zip(columns, row))
+                # Keys are URL encoded in CSV reports only
+                if "key" in record:
+                    record["key"] = urllib.parse.unquote_plus(record["key"])
+                if record.get("size"):
+                    record["size"] = int(record["size"])
+                yield record
+
+    def _iter_columnar(
+        self, key: str, file_format: str, columns: Sequence[str]
+    ) -> Iterator[dict]:
+        reader = _pyarrow_reader(file_format)
+        # Both formats need a seekable file, spooled to disk when large
+        with tempfile.SpooledTemporaryFile(max_size=64 * 1024**2) as f:
+            self.s3.download_fileobj(self.bucket, key, f)
+            f.seek(0)
+            if file_format == "Parquet":
+                batches = reader.ParquetFile(f).iter_batches(columns=columns)
+            else:
+                orc = reader.ORCFile(f)
+                batches = (
+                    orc.read_stripe(i, columns=columns) for i in range(orc.nstripes)
+                )
+            for batch in batches:
+                yield from batch.to_pylist()
+
+    def iter_rows(
+        self, manifest: dict = None, columns: Sequence[str] = None
+    ) -> Iterator[dict]:
+        """
+        Yield the rows of the report as dicts with snake_case column names,
+        e.g. bucket, key, size, last_modified_date, storage_class.
+        Only columns are read from columnar reports, if given.
+        """
+        manifest = manifest or self.manifest()
+        file_format = manifest["fileFormat"]
+        schema = [_snake_case(c) for c in manifest["fileSchema"].split(",")]
+        for file in manifest["files"]:
+            if file_format == "CSV":
+                rows = self._iter_csv(file["key"], schema)
+                if columns:
+                    rows = ({c: row.get(c) for c in columns} for row in rows)
+                yield from rows
+            else:
+                yield from self._iter_columnar(file["key"], file_format, columns)
+
+    def iter_keys(self, manifest: dict = None, prefix: str = "") -> Iterator[str]:
+        """Yield the keys in the report starting with prefix."""
+        for row in self.iter_rows(manifest, columns=["key"]):
+            if row["key"].startswith(prefix):
+                yield row["key"]
+
+    def partition_summary(
+        self, manifest: dict = None, depth: int = 1, delimiter: str = "/"
+    ) -> Dict[str, Dict[str, int]]:
+        """
+        Number of objects and bytes per key prefix of depth levels, e.g.
+        {"raw/": {"objects": 12000, "bytes": 3400000}}.
+        """
+        summary = defaultdict(lambda: {"objects": 0, "bytes": 0})
+        for row in self.iter_rows(manifest, columns=["key", "size"]):
+            prefix = key_prefix(row["key"], depth, delimiter)
+            summary[prefix]["objects"] += 1
+            summary[prefix]["bytes"] += row.get("size") or 0
+        return dict(summary)
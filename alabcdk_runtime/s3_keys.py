@@ -0,0 +1,187 @@
+"""
+Partitioned S3 key layout for high request rates.
+
+S3 scales request rates per prefix (3,500 writes and 5,500 reads per second),
+so keys written under a single date prefix are throttled (503 SlowDown) under
+bursty load. KeyScheme puts a hash shard first, then Hive-style date partitions:
+
+    raw/a/year=2024/month=05/day=17/order-123.json
+
+Declare the scheme on the Bucket (key_scheme=...) and read it in functions with
+
+    scheme = KeyScheme.from_env("orders")  # reads orders_KEY_SCHEME
+    key = scheme.key("order-123.json", partition_key="order-123")
+
+List in parallel with one worker per prefix from scheme.prefixes(start, end).
+
+Run "python -m alabcdk_runtime.s3_keys --help" to simulate the request
+distribution across prefixes for a given request rate.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import uuid
+from collections import Counter
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Iterator, List
+
+# Request rates S3 supports per prefix
+PUT_RATE_PER_PREFIX = 3500
+GET_RATE_PER_PREFIX = 5500
+
+_GRANULARITIES = ["year", "month", "day", "hour"]
+_FORMATS = {"year": "year=%Y", "month": "month=%m", "day": "day=%d", "hour": "hour=%H"}
+
+
+@dataclass(frozen=True)
+class KeyScheme:
+    """
+    - base_prefix: prefix of all keys, e.g. "raw/".
+    - shards: number of hash shards, each a prefix of its own. Size it for
+      the peak request rate divided by the per prefix rate, with headroom.
+    - granularity: finest date partition, "year", "month", "day" or "hour".
+    """
+
+    base_prefix: str = ""
+    shards: int = 16
+    granularity: str = "day"
+
+    def __post_init__(self):
+        if self.shards < 1:
+            raise ValueError("shards must be at least 1.")
+        if self.granularity not in _GRANULARITIES:
+            raise ValueError(f"granularity must be one of {_GRANULARITIES}.")
+
+    @property
+    def shard_width(self) -> int:
+        return len(f"{self.shards - 1:x}")
+
+    def shard(self, partition_key: str) -> str:
+        """Shard of partition_key, stable across processes."""
+        if self.shards == 1:
+            return ""
+        digest = int(hashlib.md5(partition_key.encode()).hexdigest(), 16)
+        return f"{digest % self.shards:0{self.shard_width}x}/"
+
+    def date_partitions(self, timestamp: datetime) -> str:
+        levels = _GRANULARITIES[: _GRANULARITIES.index(self.granularity) + 1]
+        return "/".join(timestamp.strftime(_FORMATS[level]) for level in levels) + "/"
+
+    def key(
+        self, name: str, *, partition_key: str = None, timestamp: datetime = None
+    ) -> str:
+        """
+        Key of name, sharded on partition_key (defaults to name) and
+        partitioned on timestamp (defaults to now, UTC).
+        """
+        timestamp = timestamp or datetime.now(timezone.utc)
+        shard = self.shard(name if partition_key is None else partition_key)
+        return f"{self.base_prefix}{shard}{self.date_partitions(timestamp)}{name}"
+
+    def shard_prefixes(self) -> List[str]:
+        if self.shards == 1:
+            return [self.base_prefix]
+        return [
+            f"{self.base_prefix}{n:0{self.shard_width}x}/" for n in range(self.shards)
+        ]
+
+    def prefixes(self, start: datetime, end: datetime = None) -> Iterator[str]:
+        """
+        Yield every prefix holding keys from start to end (inclusive, defaults
+        to start), one per shard and date partition, to list in parallel.
+        """
+        end = end or start
+        step = timedelta(hours=1) if self.granularity == "hour" else timedelta(days=1)
+        partitions = []
+        timestamp = start
+        while timestamp <= end:
+            partition = self.date_partitions(timestamp)
+            if not partitions or partitions[-1] != partition:
+                partitions.append(partition)
+            timestamp += step
+        if self.date_partitions(end) not in partitions:
+            partitions.append(self.date_partitions(end))
+        for shard_prefix in self.shard_prefixes():
+            for partition in partitions:
+                yield f"{shard_prefix}{partition}"
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self))
+
+    @classmethod
+    def from_json(cls, value: str) -> "KeyScheme":
+        return cls(**json.loads(value))
+
+    @classmethod
+    def from_env(cls, env_var_name: str) -> "KeyScheme":
+        """Read the scheme set by Bucket in {env_var_name}_KEY_SCHEME."""
+        return cls.from_json(os.environ[f"{env_var_name}_KEY_SCHEME"])
+
+
+def request_distribution(
+    scheme: KeyScheme, keys: Iterable[str], depth: int = None
+) -> Counter:
+    """
+    Count keys per prefix that S3 scales independently, i.e. the base prefix
+    plus the shard (or the first date partition when there is one shard).
+    """
+    depth = depth or len(scheme.base_prefix.split("/")[:-1]) + 1
+    return Counter("/".join(key.split("/")[:depth]) + "/" for key in keys)
+
+
+def simulate(
+    scheme: KeyScheme,
+    *,
+    rate: int,
+    requests: int = 100_000,
+    limit: int = PUT_RATE_PER_PREFIX,
+    seed: int = 0,
+) -> Dict[str, float]:
+    """
+    Simulate a burst of rate requests per second, for random objects written
+    at the same time, and estimate the per-prefix rate against limit.
+    """
+    rng = random.Random(seed)
+    timestamp = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    keys = (
+        scheme.key(f"{uuid.UUID(int=rng.getrandbits(128))}.json", timestamp=timestamp)
+        for _ in range(requests)
+    )
+    distribution = request_distribution(scheme, keys)
+    busiest = max(distribution.values()) / requests
+    peak_rate = busiest * rate
+    return {
+        "prefixes": len(distribution),
+        "busiest_share": busiest,
+        "peak_rate_per_prefix": peak_rate,
+        "throttled_share": max(0.0, 1 - limit / peak_rate),
+    }
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Simulate the request distribution of a key scheme."
+    )
+    parser.add_argument("--rate", type=int, default=20_000, help="requests/second")
+    parser.add_argument("--requests", type=int, default=100_000)
+    parser.add_argument("--base-prefix", default="raw/")
+    parser.add_argument("--granularity", default="day", choices=_GRANULARITIES)
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 4, 16, 64, 256])
+    args = parser.parse_args(argv)
+
+    print(f"{'shards':>7} {'prefixes':>9} {'peak req/s':>11} {'throttled':>10}")
+    for shards in args.shards:
+        scheme = KeyScheme(args.base_prefix, shards, args.granularity)
+        result = simulate(scheme, rate=args.rate, requests=args.requests)
+        print(
+            f"{shards:>7} {result['prefixes']:>9} "
+            f"{result['peak_rate_per_prefix']:>11.0f} {result['throttled_share']:>10.1%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,417 @@
+"""
+Incremental deployment of a static website build to S3 and CloudFront.
+
+A manifest of content hashes is kept in the bucket. A deployment hashes the
+local build, uploads only new or changed files (in parallel), and invalidates
+only changed paths that CloudFront may have cached:
+
+- hashed assets (e.g. main.3f2a9c1b.js) get a new path when they change, so
+  they are cached for a year as immutable, and never need invalidation.
+- the index document and other HTML get "no-cache", so browsers always
+  revalidate them and pick up new asset paths.
+- other files get default_cache_control.
+
+Precompressed siblings (app.js.br, app.js.gz) in the build are uploaded with
+Content-Encoding, and the Content-Type and Cache-Control of the original.
+Missing siblings are created for the encodings given in precompress; "br"
+needs the brotli package, which the WebsiteDeployment function does not
+have, so only the command line can create .br files.
+
+Used by the WebsiteDeployment construct (see handler()), and from the
+command line, e.g. in a pipeline:
+
+    python -m alabcdk_runtime.website_deploy build/ --bucket my-bucket --distribution-id E123
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import re
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Pattern, Sequence, Union
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_KEY = ".deploy-manifest.json"
+IMMUTABLE = "public, max-age=31536000, immutable"
+NO_CACHE = "no-cache"
+DEFAULT_CACHE_CONTROL = "public, max-age=3600"
+# A content hash before the extensions, e.g. main.3f2a9c1b.js (webpack) or
+# index-BfXk3a9Q.js (Vite). Conservative, as a file taken for a hashed asset
+# is cached for a year: hex needs both digits and letters (not a date), and
+# base64url digits and letters of both cases, without being words followed
+# by digits (e.g. hero-Desktop1.jpg). Hashes missed get default_cache_control.
+HASHED_ASSET = re.compile(
+    r"""[.-](
+        (?=[0-9a-f]*[0-9])(?=[0-9a-f]*[a-f])[0-9a-f]{8,}
+        |
+        (?=[A-Za-z0-9_]*[0-9])(?=[A-Za-z0-9_]*[a-z])(?=[A-Za-z0-9_]*[A-Z])
+        (?!(?:[A-Z]?[a-z]+)+[0-9]+[a-z]*\.)
+        [A-Za-z0-9_]{8}
+    )(\.[A-Za-z0-9]+)+$""",
+    re.VERBOSE,
+)
+# Beyond this many paths, invalidate everything instead
+MAX_INVALIDATION_PATHS = 100
+# Types worth compressing; images, fonts (woff/woff2) and archives already are.
+# Also used by the viewer request function of Website, so they agree.
+COMPRESSIBLE_EXTENSIONS = [
+    "html",
+    "js",
+    "mjs",
+    "css",
+    "json",
+    "map",
+    "svg",
+    "txt",
+    "xml",
+    "wasm",
+    "ico",
+]
+# Precompressed sibling suffixes and their Content-Encoding
+_SUFFIX_TO_ENCODING = {".br": "br", ".gz": "gzip"}
+_ENCODING_TO_SUFFIX = {v: k for (k, v) in _SUFFIX_TO_ENCODING.items()}
+
+
+def is_hashed_asset(path: str, pattern: Union[str, Pattern] = HASHED_ASSET) -> bool:
+    return bool(re.search(pattern, path))
+
+
+def cache_control(
+    path: str,
+    index_document: str,
+    default: str = DEFAULT_CACHE_CONTROL,
+    hashed_asset_pattern: Union[str, Pattern] = HASHED_ASSET,
+) -> str:
+    if path == index_document or path.endswith(".html"):
+        return NO_CACHE
+    if is_hashed_asset(path, hashed_asset_pattern):
+        return IMMUTABLE
+    return default
+
+
+def _split_sibling(path: str):
+    """Return (original path, content encoding) of a precompressed sibling."""
+    base, suffix = os.path.splitext(path)
+    if suffix in _SUFFIX_TO_ENCODING and _compressible(base):
+        return base, _SUFFIX_TO_ENCODING[suffix]
+    return path, None
+
+
+def _compressible(path: str) -> bool:
+    return os.path.splitext(path)[1].lstrip(".") in COMPRESSIBLE_EXTENSIONS
+
+
+def _compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    try:
+        import brotli
+    except ImportError as e:
+        raise ImportError(
+            "Creating .br files needs brotli, or create them in the build."
+        ) from e
+    return brotli.compress(data, quality=11)
+
+
+def precompress(root: str, encodings: Sequence[str]) -> List[str]:
+    """
+    Create the missing precompressed siblings of compressible files under
+    root, for each of encodings ("br", "gzip"). Returns the created files.
+    """
+    created = []
+    for directory, _, files in os.walk(root):
+        for name in files:
+            filename = os.path.join(directory, name)
+            if not _compressible(filename):
+                continue
+            for encoding in encodings:
+                sibling = filename + _ENCODING_TO_SUFFIX[encoding]
+                if os.path.exists(sibling):
+                    continue
+                with open(filename, "rb") as f:
+                    data = _compress(f.read(), encoding)
+                with open(sibling, "wb") as f:
+                    f.write(data)
+                created.append(sibling)
+    return created
+
+
+def _sha256(filename: str) -> str:
+    digest = hashlib.sha256()
+    with open(filename, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def build_manifest(
+    root: str,
+    index_document: str,
+    default_cache_control: str = DEFAULT_CACHE_CONTROL,
+    hashed_asset_pattern: Union[str, Pattern] = HASHED_ASSET,
+) -> Dict[str, dict]:
+    """Hash and Cache-Control of every file under root, keyed on relative path."""
+    manifest = {}
+    for directory, _, files in os.walk(root):
+        for name in files:
+            filename = os.path.join(directory, name)
+            path = os.path.relpath(filename, root).replace(os.sep, "/")
+            original, encoding = _split_sibling(path)
+            manifest[path] = {
+                "hash": _sha256(filename),
+                "cache_control": cache_control(
+                    original,
+                    index_document,
+                    default_cache_control,
+                    hashed_asset_pattern,
+                ),
+            }
+            if encoding:
+                manifest[path]["content_encoding"] = encoding
+    return manifest
+
+
+class Plan(NamedTuple):
+    uploads: List[str]
+    deletes: List[str]
+    invalidations: List[str]
+
+
+def plan(
+    local: Dict[str, dict],
+    remote: Dict[str, dict],
+    *,
+    index_document: str,
+    prune: bool = False,
+    max_invalidation_paths: int = MAX_INVALIDATION_PATHS,
+) -> Plan:
+    """
+    Compare the local and the deployed manifest. Hashed assets are never
+    invalidated, since a changed asset gets a new path.
+    """
+    uploads = sorted(p for p, entry in local.items() if remote.get(p) != entry)
+    deletes = sorted(set(remote) - set(local)) if prune else []
+
+    # New paths are invalidated too, as CloudFront may have cached an error
+    invalidations = [
+        f"/{p}"
+        for p in uploads + deletes
+        if {**remote, **local}[p]["cache_control"] != IMMUTABLE
+    ]
+    if any(_split_sibling(p[1:])[0] == index_document for p in invalidations):
+        invalidations.append("/")
+    if len(invalidations) > max_invalidation_paths:
+        invalidations = ["/*"]
+    return Plan(uploads, deletes, sorted(invalidations))
+
+
+class Deployer:
+    def __init__(
+        self,
+        bucket: str,
+        *,
+        distribution_id: str = None,
+        index_document: str = "index.html",
+        default_cache_control: str = DEFAULT_CACHE_CONTROL,
+        prune: bool = False,
+        precompress: Sequence[str] = (),
+        hashed_asset_pattern: Union[str, Pattern] = HASHED_ASSET,
+        max_workers: int = 16,
+        s3=None,
+        cloudfront=None,
+    ):
+        """
+        - prune: delete files no longer in the build. Off by default, so
+          clients running the previous version can still load its assets.
+        - hashed_asset_pattern: regular expression matching the paths of
+          hashed assets, cached as immutable and never invalidated. Set it
+          to match how the build names its assets.
+        """
+        if s3 is None or (distribution_id and cloudfront is None):
+            import boto3
+
+            s3 = s3 or boto3.client("s3")
+            cloudfront = cloudfront or boto3.client("cloudfront")
+        self.bucket = bucket
+        self.distribution_id = distribution_id
+        self.index_document = index_document
+        self.default_cache_control = default_cache_control
+        self.prune = prune
+        self.precompress = precompress
+        self.hashed_asset_pattern = hashed_asset_pattern
+        self.max_workers = max_workers
+        self.s3 = s3
+        self.cloudfront = cloudfront
+
+    def remote_manifest(self) -> Dict[str, dict]:
+        try:
+            response = self.s3.get_object(Bucket=self.bucket, Key=MANIFEST_KEY)
+        except self.s3.exceptions.NoSuchKey:
+            return {}
+        return json.loads(response["Body"].read())
+
+    def _upload(self, root: str, path: str, entry: dict) -> None:
+        original, _ = _split_sibling(path)
+        extra_args = {
+            "ContentType": mimetypes.guess_type(original)[0]
+            or "application/octet-stream",
+            "CacheControl": entry["cache_control"],
+        }
+        if "content_encoding" in entry:
+            extra_args["ContentEncoding"] = entry["content_encoding"]
+        self.s3.upload_file(
+            os.path.join(root, path), self.bucket, path, ExtraArgs=extra_args
+        )
+
+    def deploy(self, root: str) -> Plan:
+        if self.precompress:
+            precompress(root, self.precompress)
+        local = build_manifest(
+            root,
+            self.index_document,
+            self.default_cache_control,
+            self.hashed_asset_pattern,
+        )
+        remote = self.remote_manifest()
+        result = plan(
+            local, remote, index_document=self.index_document, prune=self.prune
+        )
+        logger.info(
+            f"Uploading {len(result.uploads)} of {len(local)} files, "
+            f"deleting {len(result.deletes)}"
+        )
+
+        # Upload the index document last, so it never references missing assets
+        last = [
+            p for p in result.uploads if _split_sibling(p)[0] == self.index_document
+        ]
+        assets = [p for p in result.uploads if p not in last]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            list(executor.map(lambda p: self._upload(root, p, local[p]), assets))
+            list(executor.map(lambda p: self._upload(root, p, local[p]), last))
+
+        for start in range(0, len(result.deletes), 1000):
+            self.s3.delete_objects(
+                Bucket=self.bucket,
+                Delete={
+                    "Objects": [
+                        {"Key": key} for key in result.deletes[start : start + 1000]
+                    ]
+                },
+            )
+
+        if not self.prune:
+            # Keep the entries of files left in the bucket, so a later
+            # deployment with prune can remove them
+            local = {**{p: remote[p] for p in set(remote) - set(local)}, **local}
+        self.s3.put_object(
+            Bucket=self.bucket,
+            Key=MANIFEST_KEY,
+            Body=json.dumps(local, sort_keys=True).encode(),
+            ContentType="application/json",
+            CacheControl=NO_CACHE,
+        )
+
+        if self.distribution_id and result.invalidations:
+            logger.info(f"Invalidating {result.invalidations}")
+            self.cloudfront.create_invalidation(
+                DistributionId=self.distribution_id,
+                InvalidationBatch={
+                    "Paths": {
+                        "Quantity": len(result.invalidations),
+                        "Items": result.invalidations,
+                    },
+                    "CallerReference": str(time.time()),
+                },
+            )
+        return result
+
+
+def handler(event, context):
+    """
+    Custom resource handler, deploying the zipped build in
+    SourceBucket/SourceKey. Nothing is removed on delete.
+    """
+    properties = event["ResourceProperties"]
+    physical_id = event.get("PhysicalResourceId", properties["Bucket"])
+    if event["RequestType"] == "Delete":
+        return {"PhysicalResourceId": physical_id}
+
+    deployer = Deployer(
+        properties["Bucket"],
+        distribution_id=properties.get("DistributionId") or None,
+        index_document=properties.get("IndexDocument", "index.html"),
+        default_cache_control=properties.get(
+            "DefaultCacheControl", DEFAULT_CACHE_CONTROL
+        ),
+        prune=properties.get("Prune") == "true",
+        precompress=[e for e in properties.get("Precompress", "").split(",") if e],
+        hashed_asset_pattern=properties.get("HashedAssetPattern", HASHED_ASSET),
+    )
+    with tempfile.TemporaryDirectory() as workdir:
+        archive = os.path.join(workdir, "source.zip")
+        deployer.s3.download_file(
+            properties["SourceBucket"], properties["SourceKey"], archive
+        )
+        root = os.path.join(workdir, "source")
+        with zipfile.ZipFile(archive) as z:
+            z.extractall(root)
+        result = deployer.deploy(root)
+    return {
+        "PhysicalResourceId": physical_id,
+        "Data": {
+            "Uploaded": len(result.uploads),
+            "Deleted": len(result.deletes),
+            "Invalidated": len(result.invalidations),
+        },
+    }
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Deploy changed files of a website build to S3."
+    )
+    parser.add_argument("source", help="directory with the build")
+    parser.add_argument("--bucket", required=True)
+    parser.add_argument("--distribution-id")
+    parser.add_argument("--index-document", default="index.html")
+    parser.add_argument("--default-cache-control", default=DEFAULT_CACHE_CONTROL)
+    parser.add_argument("--prune", action="store_true")
+    parser.add_argument("--precompress", nargs="*", default=[], choices=["br", "gzip"])
+    parser.add_argument("--hashed-asset-pattern", default=HASHED_ASSET)
+    parser.add_argument("--max-workers", type=int, default=16)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    result = Deployer(
+        args.bucket,
+        distribution_id=args.distribution_id,
+        index_document=args.index_document,
+        default_cache_control=args.default_cache_control,
+        prune=args.prune,
+        precompress=args.precompress,
+        hashed_asset_pattern=args.hashed_asset_pattern,
+        max_workers=args.max_workers,
+    ).deploy(args.source)
+    print(
+        json.dumps(
+            {
+                "uploaded": result.uploads,
+                "deleted": result.deletes,
+                "invalidated": result.invalidations,
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
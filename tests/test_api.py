@@ -0,0 +1,170 @@
+import aws_cdk as cdk
+from aws_cdk import aws_events, aws_kinesis, aws_lambda, aws_sqs
+from aws_cdk.assertions import Template
+
+from alabcdk import DataIngestionApi, HttpServiceIntegration
+
+
+def make_api():
+    app = cdk.App()
+    stack = cdk.Stack(app, "Stack")
+    api = DataIngestionApi(stack, "Api", name="ingest", description="Ingestion")
+    return stack, api
+
+
+def make_function(scope, id):
+    return aws_lambda.Function(
+        scope,
+        id,
+        runtime=aws_lambda.Runtime.PYTHON_3_11,
+        handler="index.main",
+        code=aws_lambda.Code.from_inline("def main(event, context): pass"),
+    )
+
+
+def integration(stack, subtype):
+    """The integration of subtype and the actions granted to its role."""
+    template = Template.from_stack(stack)
+    (props,) = [
+        r["Properties"]
+        for r in template.find_resources("AWS::ApiGatewayV2::Integration").values()
+        if r["Properties"].get("IntegrationSubtype") == subtype
+    ]
+    role = props["CredentialsArn"]["Fn::GetAtt"][0]
+    actions = set()
+    for policy in template.find_resources("AWS::IAM::Policy").values():
+        if {"Ref": role} in policy["Properties"]["Roles"]:
+            for statement in policy["Properties"]["PolicyDocument"]["Statement"]:
+                action = statement["Action"]
+                actions.update([action] if isinstance(action, str) else action)
+    return props, actions
+
+
+def test_sqs():
+    stack, api = make_api()
+    queue = aws_sqs.Queue(stack, "Queue")
+    api.add_service_ingestion_path(
+        "/events", HttpServiceIntegration.sqs("events", queue)
+    )
+
+    props, actions = integration(stack, "SQS-SendMessage")
+    assert props["IntegrationType"] == "AWS_PROXY"
+    assert props["PayloadFormatVersion"] == "1.0"
+    assert props["RequestParameters"] == {
+        "QueueUrl": stack.resolve(queue.queue_url),
+        "MessageBody": "$request.body",
+    }
+    assert "sqs:SendMessage" in actions
+
+
+def test_sqs_fifo_message_group_id():
+    stack, api = make_api()
+    queue = aws_sqs.Queue(stack, "Queue", fifo=True, content_based_deduplication=True)
+    api.add_service_ingestion_path(
+        "/events",
+        HttpServiceIntegration.sqs(
+            "events", queue, message_group_id="$request.header.x-device-id"
+        ),
+    )
+
+    props, actions = integration(stack, "SQS-SendMessage")
+    assert props["RequestParameters"] == {
+        "QueueUrl": stack.resolve(queue.queue_url),
+        "MessageBody": "$request.body",
+        "MessageGroupId": "$request.header.x-device-id",
+    }
+    assert "sqs:SendMessage" in actions
+
+
+def test_kinesis():
+    stack, api = make_api()
+    stream = aws_kinesis.Stream(stack, "Stream")
+    api.add_service_ingestion_path(
+        "/records", HttpServiceIntegration.kinesis("records", stream)
+    )
+
+    props, actions = integration(stack, "Kinesis-PutRecord")
+    assert props["RequestParameters"] == {
+        "StreamName": stack.resolve(stream.stream_name),
+        "PartitionKey": "$context.requestId",
+        "Data": "$request.body",
+    }
+    assert {"kinesis:PutRecord", "kinesis:PutRecords"} <= actions
+
+
+def test_eventbridge_default_bus():
+    stack, api = make_api()
+    api.add_service_ingestion_path(
+        "/events",
+        HttpServiceIntegration.eventbridge(
+            "events", detail_type="reading", source="devices"
+        ),
+    )
+
+    props, actions = integration(stack, "EventBridge-PutEvents")
+    assert props["RequestParameters"] == {
+        "Detail": "$request.body",
+        "DetailType": "reading",
+        "Source": "devices",
+    }
+    assert actions == {"events:PutEvents"}
+
+
+def test_eventbridge_custom_bus():
+    stack, api = make_api()
+    bus = aws_events.EventBus(stack, "Bus")
+    api.add_service_ingestion_path(
+        "/events",
+        HttpServiceIntegration.eventbridge(
+            "events", detail_type="reading", source="devices", event_bus=bus
+        ),
+    )
+
+    props, actions = integration(stack, "EventBridge-PutEvents")
+    assert props["RequestParameters"] == {
+        "Detail": "$request.body",
+        "DetailType": "reading",
+        "Source": "devices",
+        "EventBusName": stack.resolve(bus.event_bus_name),
+    }
+    assert actions == {"events:PutEvents"}
+
+
+def test_authorizer_shared_per_handler():
+    stack, api = make_api()
+    auth_handler = make_function(stack, "Auth")
+    queue = aws_sqs.Queue(stack, "Queue")
+    for path in ("/a", "/b"):
+        api.add_service_ingestion_path(
+            path,
+            HttpServiceIntegration.sqs(path.strip("/"), queue),
+            auth_name="auth",
+            auth_handler=auth_handler,
+        )
+    api.add_ingestion_path_new_data(
+        "/c",
+        make_function(stack, "Ingest"),
+        auth_name="other",
+        auth_handler=make_function(stack, "OtherAuth"),
+    )
+    api.add_ingestion_path_new_data("/open", make_function(stack, "OpenIngest"))
+
+    template = Template.from_stack(stack)
+    authorizers = {
+        id: r["Properties"]["Name"]
+        for (id, r) in template.find_resources("AWS::ApiGatewayV2::Authorizer").items()
+    }
+    assert sorted(authorizers.values()) == ["auth", "other"]
+    routes = {
+        r["Properties"]["RouteKey"]: (
+            r["Properties"]["AuthorizationType"],
+            authorizers.get(r["Properties"].get("AuthorizerId", {}).get("Ref")),
+        )
+        for r in template.find_resources("AWS::ApiGatewayV2::Route").values()
+    }
+    assert routes == {
+        "POST /a": ("CUSTOM", "auth"),
+        "POST /b": ("CUSTOM", "auth"),
+        "POST /c": ("CUSTOM", "other"),
+        "POST /open": ("NONE", None),
+    }
@@ -0,0 +1,32 @@
+import aws_cdk as cdk
+import pytest
+from aws_cdk.assertions import Match, Template
+
+from alabcdk.cloudfront import Website
+
+
+def make_stack():
+    app = cdk.App()
+    return cdk.Stack(
+        app, "Stack", env=cdk.Environment(account="123456789012", region="eu-west-1")
+    )
+
+
+def test_precompressed_gzip():
+    stack = make_stack()
+    Website(
+        stack,
+        "Web",
+        domain_name="www.example.com",
+        hosted_zone_id="Z123",
+        precompressed_encodings=["gzip"],
+    )
+    Template.from_stack(stack).has_resource_properties(
+        "AWS::CloudFront::Function",
+        {"FunctionCode": Match.string_like_regexp(r"\['gzip', '\.gz'\]")},
+    )
+
+
+def test_precompressed_brotli_is_rejected():
+    with pytest.raises(ValueError, match="only 'gzip' is supported"):
+        Website(make_stack(), "Web", precompressed_encodings=["br", "gzip"])
@@ -0,0 +1,93 @@
+import shutil
+
+import pytest
+
+from alabcdk.cloudfront_functions import (
+    header_snippet,
+    precompressed_snippet,
+    query_string_snippet,
+    run_viewer_request,
+    spa_rewrite_snippet,
+    viewer_request_code,
+)
+
+pytestmark = pytest.mark.skipif(
+    shutil.which("node") is None, reason="node is needed to run CloudFront Functions"
+)
+
+
+@pytest.mark.parametrize(
+    "uri, rewritten",
+    [
+        ("/orders/12", "/index.html"),
+        ("/", "/index.html"),
+        ("/assets/app.js", "/assets/app.js"),
+        ("/api/orders", "/api/orders"),
+    ],
+)
+def test_spa_rewrite(uri, rewritten):
+    code = viewer_request_code([spa_rewrite_snippet("index.html", ["/api/"])])
+    assert run_viewer_request(code, uri)["uri"] == rewritten
+
+
+def test_query_string_allow_list():
+    code = viewer_request_code([query_string_snippet(["page", "lang"])])
+    request = run_viewer_request(
+        code, "/", querystring={"utm_source": "mail", "page": "2", "lang": "sv"}
+    )
+    assert request["querystring"] == {"lang": {"value": "sv"}, "page": {"value": "2"}}
+    assert list(request["querystring"]) == ["lang", "page"]
+
+
+@pytest.mark.parametrize(
+    "accept_language, normalized",
+    [
+        ("sv-SE,sv;q=0.9,en;q=0.8", "sv"),
+        ("en-GB,en;q=0.9", "en"),
+        ("de-DE,de;q=0.9", "en"),
+        (None, "en"),
+    ],
+)
+def test_header_normalization(accept_language, normalized):
+    code = viewer_request_code([header_snippet("Accept-Language", ["en", "sv"])])
+    headers = {"accept-language": accept_language} if accept_language else {}
+    request = run_viewer_request(code, "/", headers=headers)
+    assert request["headers"]["accept-language"] == {"value": normalized}
+
+
+@pytest.mark.parametrize(
+    "uri, accept_encoding, rewritten",
+    [
+        ("/assets/app.js", "gzip, deflate, br", "/assets/app.js.br"),
+        ("/assets/app.js", "gzip", "/assets/app.js.gz"),
+        ("/assets/app.js", None, "/assets/app.js"),
+        ("/img/logo.png", "br", "/img/logo.png"),
+        ("/docs/", "gzip", "/docs/index.html.gz"),
+    ],
+)
+def test_precompressed(uri, accept_encoding, rewritten):
+    code = viewer_request_code([precompressed_snippet(["br", "gzip"])])
+    headers = {"accept-encoding": accept_encoding} if accept_encoding else {}
+    assert run_viewer_request(code, uri, headers=headers)["uri"] == rewritten
+
+
+def test_combined_snippets():
+    # In the order used by Website
+    code = viewer_request_code(
+        [
+            query_string_snippet(["page"]),
+            header_snippet("accept-language", ["en", "sv"]),
+            spa_rewrite_snippet("index.html"),
+            precompressed_snippet(["gzip"]),
+        ]
+    )
+    request = run_viewer_request(
+        code,
+        "/orders/12",
+        headers={"accept-encoding": "gzip", "accept-language": "sv"},
+        querystring={"page": "3", "fbclid": "x"},
+    )
+    assert request["uri"] == "/index.html.gz"
+    assert request["querystring"] == {"page": {"value": "3"}}
+    assert request["headers"]["accept-language"] == {"value": "sv"}
+    assert request["headers"]["accept-encoding"] == {"value": "gzip"}
@@ -0,0 +1,108 @@
+import aws_cdk as cdk
+import pytest
+from aws_cdk import aws_dynamodb, aws_ec2, aws_lambda
+from aws_cdk.assertions import Template
+
+from alabcdk.dynamodb import AccessPattern, Table
+
+
+def test_access_patterns_module_with_attribute_types(tmp_path):
+    app = cdk.App()
+    stack = cdk.Stack(app, "Stack")
+    module = tmp_path / "orders_keys.py"
+    Table(
+        stack,
+        "Orders",
+        access_patterns=[
+            AccessPattern("orders_by_customer", "customer_id", "order_time"),
+            AccessPattern("orders_by_status", "status", "order_time"),
+        ],
+        attribute_types={
+            "order_time": aws_dynamodb.AttributeType.NUMBER,
+            "status": aws_dynamodb.AttributeType.BINARY,
+        },
+        access_patterns_module=str(module),
+    )
+
+    source = module.read_text()
+    compile(source, str(module), "exec")
+    assert "partition: str, sort: Optional[int] = None" in source
+    assert "partition: bytes, sort: Optional[int] = None" in source
+    Template.from_stack(stack).has_resource_properties(
+        "AWS::DynamoDB::Table",
+        {
+            "AttributeDefinitions": [
+                {"AttributeName": "customer_id", "AttributeType": "S"},
+                {"AttributeName": "order_time", "AttributeType": "N"},
+                {"AttributeName": "status", "AttributeType": "B"},
+            ]
+        },
+    )
+
+
+def test_archive_keeps_failed_batches():
+    app = cdk.App()
+    stack = cdk.Stack(app, "Stack")
+    table = Table(
+        stack,
+        "Sessions",
+        time_to_live_attribute="expires",
+        archive_expired_items=True,
+    )
+
+    assert table.archive_dead_letter_queue is not None
+    template = Template.from_stack(stack)
+    template.has_resource_properties(
+        "AWS::Lambda::EventSourceMapping",
+        {
+            "BisectBatchOnFunctionError": True,
+            "MaximumRetryAttempts": 10,
+            "DestinationConfig": {
+                "OnFailure": {
+                    "Destination": stack.resolve(
+                        table.archive_dead_letter_queue.queue_arn
+                    )
+                }
+            },
+        },
+    )
+
+
+def function(scope, id, **kwargs):
+    return aws_lambda.Function(
+        scope,
+        id,
+        runtime=aws_lambda.Runtime.PYTHON_3_11,
+        handler="index.main",
+        code=aws_lambda.Code.from_inline("def main(event, context): pass"),
+        **kwargs,
+    )
+
+
+def test_dax_readers_in_vpc():
+    app = cdk.App()
+    stack = cdk.Stack(app, "Stack")
+    vpc = aws_ec2.Vpc(stack, "Vpc")
+    reader = function(stack, "Reader", vpc=vpc)
+    Table(stack, "Orders", dax=True, dax_vpc=vpc, readers=[reader])
+
+    (variables,) = [
+        r["Properties"]["Environment"]["Variables"]
+        for r in Template.from_stack(stack)
+        .find_resources("AWS::Lambda::Function")
+        .values()
+        if "Orders" in r["Properties"].get("Environment", {}).get("Variables", {})
+    ]
+    assert "Orders_DAX_ENDPOINT" in variables
+
+
+@pytest.mark.parametrize("other_vpc", [False, True])
+def test_dax_readers_outside_vpc_are_rejected(other_vpc):
+    app = cdk.App()
+    stack = cdk.Stack(app, "Stack")
+    vpc = aws_ec2.Vpc(stack, "Vpc")
+    reader = function(
+        stack, "Reader", vpc=aws_ec2.Vpc(stack, "Other") if other_vpc else None
+    )
+    with pytest.raises(ValueError, match="must be in the VPC of the DAX cluster"):
+        Table(stack, "Orders", dax=True, dax_vpc=vpc, readers=[reader])
@@ -0,0 +1,29 @@
+from alabcdk.dynamodb_access_patterns import AccessPattern, plan_key_schema
+
+
+def test_table_serves_patterns_on_its_partition_key():
+    plan = plan_key_schema(
+        [
+            AccessPattern("getOrder", "cust", "ts", operation="get"),
+            AccessPattern("listOrders", "cust"),
+        ]
+    )
+    assert (plan.table.partition_key, plan.table.sort_key) == ("cust", "ts")
+    assert plan.table.patterns == ["getOrder", "listOrders"]
+    assert plan.indexes == []
+
+
+def test_indexes():
+    plan = plan_key_schema(
+        [
+            AccessPattern("getOrder", "cust", "ts", operation="get"),
+            AccessPattern("ordersByStatus", "cust", "status"),
+            AccessPattern("ordersBySku", "sku", "ts"),
+            AccessPattern("ordersBySkuOnly", "sku", "ts", projection=["qty"]),
+        ]
+    )
+    assert [(i.name, i.kind, i.patterns) for i in plan.indexes] == [
+        ("ordersByStatus", "lsi", ["ordersByStatus"]),
+        ("ordersBySku", "gsi", ["ordersBySku", "ordersBySkuOnly"]),
+    ]
+    assert plan.index_for("ordersBySkuOnly").projection is None
@@ -0,0 +1,96 @@
+import base64
+import gzip
+import json
+
+from alabcdk_runtime.dynamodb_archive import archive
+
+# 2024-05-17 and 2024-05-18, 00:00 UTC
+MAY_17 = 1715904000
+MAY_18 = MAY_17 + 86400
+
+
+class FakeS3:
+    def __init__(self, fail_keys=()):
+        self.objects = {}
+        self.fail_keys = set(fail_keys)
+
+    def put_object(self, *, Bucket, Key, Body, **kwargs):
+        if Key in self.fail_keys:
+            raise RuntimeError("SlowDown")
+        self.objects[Key] = [
+            json.loads(line) for line in gzip.decompress(Body).decode().splitlines()
+        ]
+
+
+def remove_record(sequence_number, id, expires=None, removed_at=MAY_18 + 3600):
+    image = {"id": {"S": id}, "data": {"B": base64.b64encode(b"\x00\xff").decode()}}
+    if expires is not None:
+        image["expires"] = {"N": str(expires)}
+    return {
+        "eventName": "REMOVE",
+        "dynamodb": {
+            "SequenceNumber": sequence_number,
+            "ApproximateCreationDateTime": removed_at,
+            "OldImage": image,
+        },
+    }
+
+
+def run_archive(records, s3):
+    return archive(
+        records, s3=s3, bucket="archive", prefix="Sessions/", ttl_attribute="expires"
+    )
+
+
+def test_partitioned_on_expiry_time():
+    s3 = FakeS3()
+    records = [
+        remove_record("100", "a", expires=MAY_17 + 60),
+        remove_record("101", "b", expires=MAY_17 + 120),
+        remove_record("102", "c"),
+    ]
+    assert run_archive(records, s3) == []
+    assert {k: [i["id"] for i in v] for (k, v) in s3.objects.items()} == {
+        "Sessions/year=2024/month=05/day=17/100.json.gz": ["a", "b"],
+        # No expiry time, partitioned on the time of removal
+        "Sessions/year=2024/month=05/day=18/102.json.gz": ["c"],
+    }
+
+
+def test_binary_attributes_are_base64_encoded():
+    s3 = FakeS3()
+    record = remove_record("100", "a", expires=MAY_17)
+    record["dynamodb"]["OldImage"]["tags"] = {
+        "BS": [base64.b64encode(b"\x01").decode(), base64.b64encode(b"\x02").decode()]
+    }
+    record["dynamodb"]["OldImage"]["meta"] = {
+        "M": {"sig": {"B": base64.b64encode(b"\x03").decode()}}
+    }
+    run_archive([record], s3)
+    (item,) = s3.objects["Sessions/year=2024/month=05/day=17/100.json.gz"]
+    assert base64.b64decode(item["data"]) == b"\x00\xff"
+    assert sorted(base64.b64decode(t) for t in item["tags"]) == [b"\x01", b"\x02"]
+    assert base64.b64decode(item["meta"]["sig"]) == b"\x03"
+
+
+def test_retries_overwrite_instead_of_duplicating():
+    records = [
+        remove_record("100", "a", expires=MAY_17),
+        remove_record("101", "b", expires=MAY_18),
+        remove_record("102", "c", expires=MAY_18),
+        remove_record("103", "d", expires=MAY_17),
+    ]
+    s3 = FakeS3(fail_keys=["Sessions/year=2024/month=05/day=17/103.json.gz"])
+    # Runs before the failing one are kept and not retried
+    assert run_archive(records, s3) == ["103"]
+
+    # A bisected retry of the whole batch writes the same objects again
+    s3.fail_keys.clear()
+    assert run_archive(records[:2], s3) == []
+    assert run_archive(records[2:], s3) == []
+    assert sorted(i["id"] for items in s3.objects.values() for i in items) == [
+        "a",
+        "b",
+        "c",
+        "d",
+    ]
@@ -0,0 +1,93 @@
+import pytest
+
+from alabcdk_runtime.fifo import DEDUPLICATION_INTERVAL, FifoQueueSimulator
+
+
+@pytest.fixture
+def now():
+    return [0.0]
+
+
+def make_queue(now, **kwargs):
+    return FifoQueueSimulator(clock=lambda: now[0], **kwargs)
+
+
+def bodies(messages):
+    return [m.body for m in messages]
+
+
+def test_in_group_ordering(now):
+    queue = make_queue(now)
+    for i in range(3):
+        queue.send_message(f"a{i}", message_group_id="a", deduplication_id=f"a{i}")
+        queue.send_message(f"b{i}", message_group_id="b", deduplication_id=f"b{i}")
+
+    messages = queue.receive_messages(4)
+    assert bodies(messages) == ["a0", "a1", "a2", "b0"]
+    for message in messages:
+        queue.delete_message(message.receipt_handle)
+    assert bodies(queue.receive_messages()) == ["b1", "b2"]
+
+
+def test_deduplication_window(now):
+    queue = make_queue(now)
+    first = queue.send_message("x", message_group_id="g", deduplication_id="1")
+    now[0] += DEDUPLICATION_INTERVAL - 1
+    assert queue.send_message("x", message_group_id="g", deduplication_id="1") == first
+    assert len(queue) == 1
+
+    now[0] += 1
+    assert queue.send_message("x", message_group_id="g", deduplication_id="1") != first
+    assert len(queue) == 2
+
+
+@pytest.mark.parametrize("high_throughput, queued", [(True, 2), (False, 1)])
+def test_deduplication_scope(now, high_throughput, queued):
+    queue = make_queue(now, high_throughput=high_throughput)
+    queue.send_message("x", message_group_id="g1", deduplication_id="1")
+    queue.send_message("x", message_group_id="g2", deduplication_id="1")
+    assert len(queue) == queued
+
+
+def test_content_based_deduplication(now):
+    queue = make_queue(now, content_based_deduplication=True)
+    queue.send_message("x", message_group_id="g")
+    queue.send_message("x", message_group_id="g")
+    assert len(queue) == 1
+    with pytest.raises(ValueError):
+        make_queue(now).send_message("x", message_group_id="g")
+
+
+def test_group_blocks_after_in_flight_failure(now):
+    queue = make_queue(now, visibility_timeout=30)
+    for body in ["a0", "a1"]:
+        queue.send_message(body, message_group_id="a", deduplication_id=body)
+    queue.send_message("b0", message_group_id="b", deduplication_id="b0")
+
+    # The consumer fails on a0 and does not delete it
+    (a0,) = queue.receive_messages(1)
+    assert a0.body == "a0"
+
+    # Group a is locked while a0 is in flight, other groups continue
+    (b0,) = queue.receive_messages()
+    assert b0.body == "b0"
+    queue.delete_message(b0.receipt_handle)
+    assert queue.receive_messages() == []
+
+    # After the visibility timeout a0 comes back, ahead of a1
+    now[0] += 30
+    messages = queue.receive_messages()
+    assert bodies(messages) == ["a0", "a1"]
+    assert messages[0].receive_count == 2
+    with pytest.raises(KeyError):
+        queue.delete_message(a0.receipt_handle)
+
+
+def test_released_message_is_redelivered_first(now):
+    queue = make_queue(now)
+    for body in ["a0", "a1"]:
+        queue.send_message(body, message_group_id="a", deduplication_id=body)
+    a0, a1 = queue.receive_messages()
+    queue.delete_message(a0.receipt_handle)
+    queue.change_message_visibility(a1.receipt_handle, 0)
+    assert bodies(queue.receive_messages()) == ["a1"]
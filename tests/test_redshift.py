@@ -0,0 +1,92 @@
+import aws_cdk as cdk
+import pytest
+from aws_cdk import aws_ec2, aws_kms
+from aws_cdk.assertions import Template
+
+from alabcdk.redshift import (
+    NodeSizing,
+    Redshift,
+    WlmConfiguration,
+    WlmQueue,
+    suggest_node_sizing,
+)
+
+
+def synth_redshift(**kwargs) -> Template:
+    app = cdk.App()
+    stack = cdk.Stack(
+        app, "Stack", env=cdk.Environment(account="123456789012", region="eu-west-1")
+    )
+    vpc = aws_ec2.Vpc(stack, "Vpc")
+    Redshift(
+        stack,
+        "Redshift",
+        db_name="datalake",
+        master_username="admin",
+        vpc=vpc,
+        encryption_key=aws_kms.Key(stack, "Key"),
+        **kwargs,
+    )
+    return Template.from_stack(stack)
+
+
+@pytest.mark.parametrize(
+    "kwargs, node_type",
+    [
+        ({}, "dc2.large"),
+        ({"node_type": "ra3.xlplus"}, "ra3.xlplus"),
+        ({"node_type": "ra3.4xlarge", "number_of_nodes": 2}, "ra3.4xlarge"),
+    ],
+)
+def test_node_type(kwargs, node_type):
+    template = synth_redshift(**kwargs)
+    template.has_resource_properties("AWS::Redshift::Cluster", {"NodeType": node_type})
+
+
+def test_wlm_configuration():
+    template = synth_redshift(
+        node_type="ra3.xlplus",
+        wlm=WlmConfiguration(
+            queues=[WlmQueue("etl", user_groups=["etl"]), WlmQueue("default")]
+        ),
+    )
+    template.resource_count_is("AWS::Redshift::ClusterParameterGroup", 1)
+    template.has_resource_properties(
+        "AWS::Redshift::Cluster", {"NodeType": "ra3.xlplus"}
+    )
+
+
+def test_resize_and_relocation_are_opt_in():
+    cluster = synth_redshift(node_type="ra3.xlplus").find_resources(
+        "AWS::Redshift::Cluster"
+    )
+    (properties,) = [r["Properties"] for r in cluster.values()]
+    assert "Classic" not in properties
+    assert "AvailabilityZoneRelocation" not in properties
+
+    synth_redshift(
+        node_type="ra3.xlplus", elastic_resize=True, availability_zone_relocation=True
+    ).has_resource_properties(
+        "AWS::Redshift::Cluster",
+        {"Classic": False, "AvailabilityZoneRelocation": True},
+    )
+
+
+def test_availability_zone_relocation_requires_ra3():
+    with pytest.raises(ValueError, match="RA3"):
+        synth_redshift(availability_zone_relocation=True)
+
+
+def test_suggest_node_sizing():
+    assert suggest_node_sizing(data_volume_tb=10, concurrency=10) == NodeSizing(
+        "ra3.xlplus", 5
+    )
+    # Fits, but without room to grow
+    assert suggest_node_sizing(data_volume_tb=100, node_types=["ra3.xlplus"]) == (
+        NodeSizing("ra3.xlplus", 25)
+    )
+
+
+def test_suggest_node_sizing_does_not_under_provision():
+    with pytest.raises(ValueError, match="No node type"):
+        suggest_node_sizing(data_volume_tb=200, node_types=["ra3.xlplus"])
@@ -0,0 +1,147 @@
+import json
+import re
+
+import pytest
+
+from alabcdk_runtime.redshift_copy import CopyLoader, plan_batches
+from alabcdk_runtime.redshift_data import DataApi, LocalDataApi, StatementError
+from alabcdk_runtime.s3_events import S3Object
+
+
+class FakeS3:
+    def __init__(self):
+        self.objects = {}
+
+    def put_object(self, *, Bucket, Key, Body, **kwargs):
+        self.objects[(Bucket, Key)] = Body
+
+
+class FakeRedshift:
+    """Responder for LocalDataApi keeping the copy log, failing COPY on request."""
+
+    def __init__(self):
+        self.log = set()
+        self.copied = []
+        self.fail_copies = 0
+
+    def __call__(self, sql):
+        if sql.startswith("COPY"):
+            if self.fail_copies:
+                self.fail_copies -= 1
+                raise RuntimeError("S3ServiceException: SlowDown")
+            self.copied.append(re.search(r"FROM '([^']*)'", sql).group(1))
+        elif sql.startswith("INSERT INTO"):
+            self.log.update(re.findall(r"\('(s3://[^']*)'", sql))
+        elif sql.startswith("SELECT url"):
+            urls = re.findall(r"'(s3://[^']*)'", sql)
+            return [{"url": url} for url in urls if url in self.log]
+        return []
+
+
+def s3_event(*messages):
+    """SQS event with one message per list of keys."""
+    return {
+        "Records": [
+            {
+                "messageId": message_id,
+                "body": json.dumps(
+                    {
+                        "Records": [
+                            {
+                                "eventName": "ObjectCreated:Put",
+                                "s3": {
+                                    "bucket": {"name": "landing"},
+                                    "object": {"key": key, "size": 100},
+                                },
+                            }
+                            for key in keys
+                        ]
+                    }
+                ),
+            }
+            for (message_id, keys) in messages
+        ]
+    }
+
+
+def make_loader(redshift, **kwargs):
+    local = LocalDataApi(redshift)
+    loader = CopyLoader(
+        data_api=DataApi(database="dev", workgroup_name="wg", client=local),
+        s3=FakeS3(),
+        table="staging.events",
+        iam_role_arn="arn:aws:iam::123456789012:role/copy",
+        manifest_bucket="landing",
+        copy_options="FORMAT AS JSON 'auto'",
+        **kwargs,
+    )
+    return loader, local
+
+
+def test_plan_batches():
+    objects = [S3Object("b", f"k{i}", size) for (i, size) in enumerate([5, 5, 20, 1])]
+    batches = plan_batches(objects + objects[:1], max_bytes=10, max_files=2)
+    assert [[o.key for o in batch] for batch in batches] == [
+        ["k0", "k1"],
+        ["k2"],
+        ["k3"],
+    ]
+
+
+def test_redelivered_manifest_is_not_loaded_again():
+    redshift = FakeRedshift()
+    loader, local = make_loader(redshift)
+    event = s3_event(("m1", ["raw/a.json", "raw/b.json"]))
+
+    assert loader.handle(event) == {"batchItemFailures": []}
+    assert len(redshift.copied) == 1
+    assert redshift.log == {"s3://landing/raw/a.json", "s3://landing/raw/b.json"}
+
+    # SQS redelivers the same message
+    assert loader.handle(event) == {"batchItemFailures": []}
+    assert len(redshift.copied) == 1
+    assert sum(sql.startswith("CREATE TABLE") for sql in local.statements) == 1
+
+
+def test_partially_loaded_batch_only_loads_new_objects():
+    redshift = FakeRedshift()
+    loader, _ = make_loader(redshift)
+    loader.handle(s3_event(("m1", ["raw/a.json"])))
+    loader.handle(s3_event(("m1", ["raw/a.json"]), ("m2", ["raw/b.json"])))
+
+    assert len(redshift.copied) == 2
+    (manifest,) = [
+        json.loads(body)
+        for ((_, key), body) in loader.s3.objects.items()
+        if redshift.copied[1].endswith(key)
+    ]
+    assert [e["url"] for e in manifest["entries"]] == ["s3://landing/raw/b.json"]
+
+
+def test_partial_batch_failure():
+    redshift = FakeRedshift()
+    redshift.fail_copies = 1
+    loader, _ = make_loader(redshift, max_batch_files=2)
+    event = s3_event(
+        ("m1", ["raw/a.json", "raw/b.json"]), ("m2", ["raw/c.json", "raw/d.json"])
+    )
+
+    # The first batch (a, b) fails, the second is loaded and logged
+    assert loader.handle(event) == {"batchItemFailures": [{"itemIdentifier": "m1"}]}
+    assert redshift.log == {"s3://landing/raw/c.json", "s3://landing/raw/d.json"}
+
+    # The retried message only loads what failed
+    assert loader.handle(s3_event(("m1", ["raw/a.json", "raw/b.json"]))) == {
+        "batchItemFailures": []
+    }
+    assert len(redshift.log) == 4
+    assert len(redshift.copied) == 2
+
+
+def test_local_data_api_failed_statement():
+    def responder(sql):
+        raise RuntimeError("relation does not exist")
+
+    api = DataApi(database="dev", workgroup_name="wg", client=LocalDataApi(responder))
+    with pytest.raises(StatementError, match="relation does not exist"):
+        api.execute("select * from missing")
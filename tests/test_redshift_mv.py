@@ -0,0 +1,73 @@
+import aws_cdk as cdk
+import pytest
+from aws_cdk import aws_ec2, aws_kms
+
+from alabcdk.redshift import Redshift
+from alabcdk.redshift_views import MaterializedView, MaterializedViewRefresher
+from alabcdk_runtime.redshift_data import DataApi, LocalDataApi
+from alabcdk_runtime.redshift_mv import refresh, refresh_levels
+
+
+def test_refresh_levels():
+    assert refresh_levels({"a": [], "b": ["a"], "c": ["a"], "d": ["b", "c"]}) == [
+        ["a"],
+        ["b", "c"],
+        ["d"],
+    ]
+
+
+def test_refresh_levels_keep_order_through_skipped_views():
+    assert refresh_levels({"a": [], "b": ["a"], "c": ["b"]}, skip=["b"]) == [
+        ["a"],
+        ["c"],
+    ]
+
+
+def test_refresh_levels_rejects_cycles():
+    with pytest.raises(ValueError, match="Circular"):
+        refresh_levels({"a": ["b"], "b": ["a"]})
+
+
+@pytest.mark.parametrize("is_stale, refreshed", [("t", True), ("f", False)])
+def test_refresh_skips_fresh_views(is_stale, refreshed):
+    local = LocalDataApi(
+        lambda sql: [{"is_stale": is_stale}] if "svv_mv_info" in sql else []
+    )
+    api = DataApi(database="dev", workgroup_name="wg", client=local)
+    assert refresh(api, "mart.sales") == refreshed
+    assert ("REFRESH MATERIALIZED VIEW mart.sales" in local.statements) == refreshed
+
+
+def synth_refresher(views):
+    app = cdk.App()
+    stack = cdk.Stack(app, "Stack")
+    redshift = Redshift(
+        stack,
+        "Redshift",
+        db_name="datalake",
+        master_username="admin",
+        vpc=aws_ec2.Vpc(stack, "Vpc"),
+        encryption_key=aws_kms.Key(stack, "Key"),
+    )
+    return MaterializedViewRefresher(stack, "Views", redshift=redshift, views=views)
+
+
+def test_refresher_orders_views_through_auto_views():
+    refresher = synth_refresher(
+        [
+            MaterializedView("mart.c", "SELECT * FROM mart.b", depends_on=["mart.b"]),
+            MaterializedView(
+                "mart.b",
+                "SELECT * FROM mart.a",
+                depends_on=["mart.a"],
+                refresh="auto",
+            ),
+            MaterializedView("mart.a", "SELECT * FROM raw.sales"),
+        ]
+    )
+    assert refresher.levels == [["mart.a"], ["mart.c"]]
+    assert refresher.create_statements() == [
+        "CREATE MATERIALIZED VIEW mart.a AUTO REFRESH NO AS SELECT * FROM raw.sales",
+        "CREATE MATERIALIZED VIEW mart.b AUTO REFRESH YES AS SELECT * FROM mart.a",
+        "CREATE MATERIALIZED VIEW mart.c AUTO REFRESH NO AS SELECT * FROM mart.b",
+    ]
@@ -0,0 +1,72 @@
+import aws_cdk as cdk
+from aws_cdk import Duration, aws_lambda
+from aws_cdk.assertions import Template
+
+from alabcdk import ResourceWithLambda, RestApi
+
+
+def make_api():
+    app = cdk.App()
+    stack = cdk.Stack(app, "Stack")
+    api = RestApi(stack, "Api", cache_cluster_size="0.5")
+    api.root.add_method("GET")
+    return stack, api
+
+
+def method_settings(stack):
+    (stage,) = (
+        Template.from_stack(stack).find_resources("AWS::ApiGateway::Stage").values()
+    )
+    # Without the stage wide settings of deploy_options
+    return [
+        s for s in stage["Properties"]["MethodSettings"] if s["ResourcePath"] != "/*"
+    ]
+
+
+def test_method_settings_resource_path():
+    stack, api = make_api()
+    api.root.add_resource("orders").add_resource("{id}").add_method("GET")
+    api.add_method_settings("/orders/{id}", "GET", cache_ttl=Duration.minutes(5))
+    api.add_method_settings("/", "ANY", throttling_rate_limit=100)
+
+    assert method_settings(stack) == [
+        {
+            "ResourcePath": "/~1orders~1{id}",
+            "HttpMethod": "GET",
+            "CachingEnabled": True,
+            "CacheTtlInSeconds": 300,
+            "CacheDataEncrypted": True,
+        },
+        {
+            "ResourcePath": "/",
+            "HttpMethod": "*",
+            "CachingEnabled": False,
+            "ThrottlingRateLimit": 100,
+        },
+    ]
+
+
+def test_resource_with_lambda_method_settings():
+    stack, api = make_api()
+    orders = api.root.add_resource("orders")
+    ResourceWithLambda(
+        stack,
+        "order",
+        parent_resource=orders,
+        resource_name="{id}",
+        verb="GET",
+        code=aws_lambda.Code.from_inline("def main(event, context): pass"),
+        lambda_runtime=aws_lambda.Runtime.PYTHON_3_11,
+        cache_ttl=Duration.minutes(1),
+        throttling_burst_limit=20,
+    )
+    assert method_settings(stack) == [
+        {
+            "ResourcePath": "/~1orders~1{id}",
+            "HttpMethod": "GET",
+            "CachingEnabled": True,
+            "CacheTtlInSeconds": 60,
+            "CacheDataEncrypted": True,
+            "ThrottlingBurstLimit": 20,
+        }
+    ]
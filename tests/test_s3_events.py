@@ -0,0 +1,33 @@
+import pytest
+
+from alabcdk_runtime.s3_events import S3Object, group_keys_by_prefix, key_prefix
+
+
+@pytest.mark.parametrize(
+    "key, depth, prefix",
+    [
+        ("a/b/c.json", 1, "a/"),
+        ("a/b/c.json", 2, "a/b/"),
+        ("a/b/c.json", 3, "a/b/"),
+        ("a/b.json", 2, "a/"),
+        ("b.json", 1, ""),
+        ("b.json", 2, ""),
+    ],
+)
+def test_key_prefix(key, depth, prefix):
+    assert key_prefix(key, depth) == prefix
+
+
+def test_group_keys_by_prefix_with_shallow_keys():
+    objects = [
+        S3Object("bucket", "raw/2024/a.json", 1),
+        S3Object("bucket", "raw/b.json", 1),
+        S3Object("bucket", "c.json", 1),
+        S3Object("bucket", "raw/2024/a.json", 1),
+    ]
+    groups = group_keys_by_prefix(objects, depth=2)
+    assert {k: [o.key for o in v] for (k, v) in groups.items()} == {
+        ("bucket", "raw/2024/"): ["raw/2024/a.json"],
+        ("bucket", "raw/"): ["raw/b.json"],
+        ("bucket", ""): ["c.json"],
+    }
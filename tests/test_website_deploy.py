@@ -0,0 +1,67 @@
+import pytest
+
+from alabcdk_runtime.website_deploy import (
+    DEFAULT_CACHE_CONTROL,
+    IMMUTABLE,
+    NO_CACHE,
+    build_manifest,
+    cache_control,
+    is_hashed_asset,
+    plan,
+)
+
+
+@pytest.mark.parametrize(
+    "path",
+    [
+        "assets/main.3f2a9c1b.js",
+        "static/js/main.3f2a9c1b4d5e6f70.chunk.js.map",
+        "assets/index-BfXk3a9Q.js",
+        "assets/vendor-a1B2c3D4.css",
+    ],
+)
+def test_hashed_assets(path):
+    assert is_hashed_asset(path)
+
+
+@pytest.mark.parametrize(
+    "path",
+    [
+        "fonts/Inter-Variable.woff2",
+        "img/Settings-Overview.png",
+        "img/hero-Desktop1.jpg",
+        "img/icon-myLogo2x.png",
+        "reports/report-20240517.csv",
+        "assets/app.js",
+        "favicon.ico",
+    ],
+)
+def test_not_hashed_assets(path):
+    assert not is_hashed_asset(path)
+    assert cache_control(path, "index.html") == DEFAULT_CACHE_CONTROL
+
+
+def test_cache_control():
+    assert cache_control("index.html", "index.html") == NO_CACHE
+    assert cache_control("docs/guide.html", "index.html") == NO_CACHE
+    assert cache_control("assets/index-BfXk3a9Q.js", "index.html") == IMMUTABLE
+    assert (
+        cache_control(
+            "img/hero-Desktop1.jpg",
+            "index.html",
+            hashed_asset_pattern=r"-[A-Za-z0-9]{8}\.jpg$",
+        )
+        == IMMUTABLE
+    )
+
+
+def test_changed_unhashed_files_are_invalidated(tmp_path):
+    (tmp_path / "img").mkdir()
+    (tmp_path / "img" / "hero-Desktop1.jpg").write_bytes(b"new")
+    (tmp_path / "main.3f2a9c1b.js").write_bytes(b"new")
+    local = build_manifest(str(tmp_path), "index.html")
+    remote = {p: {**entry, "hash": "old"} for (p, entry) in local.items()}
+
+    result = plan(local, remote, index_document="index.html")
+    assert result.uploads == ["img/hero-Desktop1.jpg", "main.3f2a9c1b.js"]
+    assert result.invalidations == ["/img/hero-Desktop1.jpg"]